@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+并行压缩基准测试
+对比不同工作进程数下压缩同一目录的耗时
+
+用法:
+    python benchmarks/bench_compress.py [目录]
+    未指定目录时生成约 400MB 的混合测试数据（文本、CSV 与随机二进制）
+"""
+
+import sys
+import os
+import random
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.archive import build_zip, collect_members
+from src.utils.worker_pool import default_workers
+
+
+def _generate(folder: str):
+    words = [f"word{i}" for i in range(5000)]
+    for i in range(24):
+        with open(os.path.join(folder, f"report_{i}.txt"), "w", encoding="utf-8") as f:
+            f.write(" ".join(random.choice(words) for _ in range(1_000_000)))
+        with open(os.path.join(folder, f"table_{i}.csv"), "w", encoding="utf-8") as f:
+            f.writelines(f"{j},{j * 7 % 1000},{random.random():.6f}\n" for j in range(200_000))
+        with open(os.path.join(folder, f"scan_{i}.pdf"), "wb") as f:
+            f.write(os.urandom(4 * 1024 * 1024))
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = sys.argv[1] if len(sys.argv) > 1 else os.path.join(tmp, "data")
+        if len(sys.argv) <= 1:
+            os.makedirs(folder)
+            print("生成测试数据...")
+            _generate(folder)
+        members = collect_members([folder])
+        zip_path = os.path.join(tmp, "bench.zip")
+
+        worker_counts = sorted({1, 2, 4, 8, default_workers()})
+        baseline = None
+        print(f"{'进程数':>6} {'耗时(s)':>10} {'原始(MB)':>10} {'压缩后(MB)':>10} {'MB/s':>10} {'加速比':>8}")
+        for workers in worker_counts:
+            stats = build_zip(zip_path, members, max_workers=workers)
+            elapsed = stats["elapsed_seconds"]
+            baseline = baseline or elapsed
+            total_mb = stats["total_size"] / (1024 * 1024)
+            print(f"{workers:>6} {elapsed:>10.2f} {total_mb:>10.1f} "
+                  f"{stats['compressed_size'] / (1024 * 1024):>10.1f} {total_mb / elapsed:>10.1f} "
+                  f"{baseline / elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
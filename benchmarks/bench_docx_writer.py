@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+流式DOCX写入基准测试
+统计 1k / 100k / 1M 段落输入下的吞吐量（MB/s）与峰值内存（RSS）
+
+每个规模在独立子进程中运行，保证峰值RSS互不影响。
+
+用法:
+    python benchmarks/bench_docx_writer.py [段落数 ...]
+"""
+
+import sys
+import os
+import time
+import tempfile
+import multiprocessing
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.docx_writer import write_docx
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+PARAGRAPH_TEXT = "季度经营报告：本段落用于测试流式写入的吞吐量与内存占用。Quarterly report paragraph."
+
+
+def _peak_rss_mb() -> float:
+    """返回当前进程的峰值RSS（MB）"""
+    try:
+        import resource
+    except ImportError:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 返回字节，Linux 返回KB
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def _run(count: int, queue):
+    paragraphs = (f"{i} {PARAGRAPH_TEXT}" for i in range(count))
+    baseline_rss = _peak_rss_mb()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.docx")
+        start = time.perf_counter()
+        stats = write_docx(path, paragraphs)
+        elapsed = time.perf_counter() - start
+        output_size = os.path.getsize(path)
+    queue.put({
+        "paragraphs": count,
+        "seconds": elapsed,
+        "xml_mb": stats["document_xml_bytes"] / (1024 * 1024),
+        "output_mb": output_size / (1024 * 1024),
+        "baseline_rss_mb": baseline_rss,
+        "peak_rss_mb": _peak_rss_mb(),
+    })
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    ctx = multiprocessing.get_context("spawn")
+
+    print(f"{'段落数':>10} {'耗时(s)':>10} {'XML(MB)':>10} {'输出(MB)':>10} {'MB/s':>10} {'启动RSS(MB)':>12} {'峰值RSS(MB)':>12}")
+    for count in sizes:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_run, args=(count, queue))
+        proc.start()
+        result = queue.get()
+        proc.join()
+        throughput = result["xml_mb"] / result["seconds"] if result["seconds"] else float("inf")
+        print(
+            f"{result['paragraphs']:>10} {result['seconds']:>10.2f} {result['xml_mb']:>10.1f} "
+            f"{result['output_mb']:>10.1f} {throughput:>10.1f} "
+            f"{result['baseline_rss_mb']:>12.1f} {result['peak_rss_mb']:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+目录列表基准测试
+对比原 Path.iterdir() 实现与基于 os.scandir 的分页实现
+
+用法:
+    python benchmarks/bench_list_files.py [文件数]
+"""
+
+import sys
+import os
+import time
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.dir_scanner import list_directory
+
+DEFAULT_FILE_COUNT = 200_000
+REPEAT = 3
+
+
+def legacy_list_files(directory: str):
+    """原实现：每个条目调用两次 stat 并一次性返回全部结果"""
+    files = []
+    for item in Path(directory).iterdir():
+        files.append({
+            "name": item.name,
+            "is_file": item.is_file(),
+            "size": item.stat().st_size if item.is_file() else None,
+            "modified": item.stat().st_mtime
+        })
+    return files
+
+
+def _best_of(fn) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_FILE_COUNT
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"创建 {count} 个文件...")
+        for i in range(count):
+            with open(os.path.join(tmp, f"file_{i:07d}.txt"), "wb") as f:
+                f.write(b"x" * (i % 512))
+
+        cases = [
+            ("原实现 iterdir (全部)", lambda: legacy_list_files(tmp)),
+            ("scandir 全部条目", lambda: list_directory(tmp, limit=count)),
+            ("scandir 首页 (1000条, 按名称)", lambda: list_directory(tmp)),
+            ("scandir 首页 (1000条, 按大小降序)", lambda: list_directory(tmp, sort_by="-size")),
+            ("scandir 首页 (1000条, *_00*.txt 过滤)", lambda: list_directory(tmp, include=["*_00*.txt"])),
+        ]
+        print(f"{'场景':<40} {'耗时(ms)':>10}")
+        for name, fn in cases:
+            print(f"{name:<40} {_best_of(fn) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+异步模型调用基准测试
+对本地模拟的 OpenAI 兼容服务器发送一批摘要请求，对比逐个同步调用 chat_completion
+与不同并发数下 achat_many 的吞吐量
+
+用法:
+    python benchmarks/bench_llm_async.py [请求数] [服务器延迟(毫秒)]
+"""
+
+import sys
+import os
+import time
+import asyncio
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.llm import LLMManager
+from tests.mock_openai_server import MockOpenAIServer
+
+DEFAULT_REQUESTS = 200
+DEFAULT_LATENCY_MS = 50
+CONCURRENCY_LEVELS = (1, 8, 32, 64)
+
+
+def _message_sets(count: int):
+    return [
+        [
+            {"role": "system", "content": "请用一句话概括文档内容。"},
+            {"role": "user", "content": f"文档 {i}: 本季度销售额同比增长，主要来自华东地区的新客户。"},
+        ]
+        for i in range(count)
+    ]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REQUESTS
+    latency = (int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_LATENCY_MS) / 1000
+    message_sets = _message_sets(count)
+
+    with MockOpenAIServer(latency=latency) as server:
+        LLMManager.MODEL_CONFIGS["mock"] = {"base_url": server.base_url, "models": ["mock-model"]}
+        llm = LLMManager(provider="mock", model="mock-model", api_key="bench")
+        print(f"请求数: {count}, 服务器延迟: {latency * 1000:.0f} ms")
+        print(f"{'方式':>16} {'耗时(s)':>10} {'请求/秒':>10} {'加速比':>8}")
+
+        start = time.perf_counter()
+        for messages in message_sets:
+            llm.chat_completion(messages)
+        baseline = time.perf_counter() - start
+        print(f"{'同步逐个调用':>16} {baseline:>10.2f} {count / baseline:>10.1f} {1.0:>8.1f}")
+
+        for concurrency in CONCURRENCY_LEVELS:
+            start = time.perf_counter()
+            responses = asyncio.run(llm.achat_many(message_sets, concurrency=concurrency))
+            elapsed = time.perf_counter() - start
+            assert len(responses) == count
+            label = f"achat_many({concurrency})"
+            print(f"{label:>16} {elapsed:>10.2f} {count / elapsed:>10.1f} {baseline / elapsed:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
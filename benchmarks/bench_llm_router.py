@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+模型路由尾延迟基准测试
+两个本地模拟端点的延迟都有随机抖动，并有一小部分请求出现长尾；
+对比固定使用一个端点、按延迟路由、按延迟路由并开启对冲时的 p50/p95/p99 延迟
+
+用法:
+    python benchmarks/bench_llm_router.py [请求数] [长尾比例]
+"""
+
+import sys
+import os
+import time
+import random
+import asyncio
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.llm import LLMManager
+from src.core.llm_router import LLMRouter
+from tests.mock_openai_server import MockOpenAIServer
+
+DEFAULT_REQUESTS = 600
+DEFAULT_STALL_RATIO = 0.03
+CONCURRENCY = 8
+
+
+def _jitter(base: float, stall_ratio: float):
+    def latency(request):
+        if random.random() < stall_ratio:
+            return base * 20
+        return random.lognormvariate(0, 0.3) * base
+    return latency
+
+
+def _percentiles(samples):
+    ordered = sorted(samples)
+    return [ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000 for q in (0.5, 0.95, 0.99)]
+
+
+async def _run(call, count: int):
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies = []
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await call([{"role": "user", "content": f"文档 {i}"}])
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one(i) for i in range(count)))
+    return latencies
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REQUESTS
+    stall_ratio = float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_STALL_RATIO
+    random.seed(0)
+    with MockOpenAIServer(latency=_jitter(0.04, stall_ratio)) as a, \
+            MockOpenAIServer(latency=_jitter(0.05, stall_ratio)) as b:
+        LLMManager.MODEL_CONFIGS["endpoint-a"] = {"base_url": a.base_url, "models": ["m"]}
+        LLMManager.MODEL_CONFIGS["endpoint-b"] = {"base_url": b.base_url, "models": ["m"]}
+        endpoints = [("endpoint-a", "m"), ("endpoint-b", "m")]
+        keys = {"endpoint-a": "bench", "endpoint-b": "bench"}
+        cases = [
+            ("固定端点", LLMManager("endpoint-a", "m", "bench").achat_completion),
+            ("按延迟路由", LLMRouter(endpoints, keys)),
+            ("路由+对冲", LLMRouter(endpoints, keys, hedge=True)),
+        ]
+        print(f"请求数: {count}, 并发: {CONCURRENCY}, 长尾比例: {stall_ratio:.0%}")
+        print(f"{'方式':>10} {'p50(ms)':>10} {'p95(ms)':>10} {'p99(ms)':>10} {'对冲次数':>10}")
+        for label, target in cases:
+            call = target.achat_completion if isinstance(target, LLMRouter) else target
+            latencies = asyncio.run(_run(call, count))
+            p50, p95, p99 = _percentiles(latencies)
+            hedges = target.stats()["hedges"] if isinstance(target, LLMRouter) else "-"
+            print(f"{label:>10} {p50:>10.1f} {p95:>10.1f} {p99:>10.1f} {hedges:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+提示词模板渲染基准测试
+对比原实现（每次读取模板文件并用 str.format 渲染）与预编译模板目录的每秒渲染次数
+
+用法:
+    python benchmarks/bench_prompt_templates.py [渲染次数]
+"""
+
+import sys
+import os
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.prompt_templates import TEMPLATE_DIR, TemplateRegistry
+
+DEFAULT_RENDERS = 100_000
+
+CASES = [
+    ("general_template", {"question": "什么是人工智能？"}),
+    ("document_summary_template", {"document_content": "本季度销售额同比增长12%，主要来自华东地区的新客户。" * 20}),
+]
+
+
+def legacy_render(template_name: str, **kwargs) -> str:
+    """原实现：每次读取模板文件，用 str.format 渲染（{{变量}} 不会被替换）"""
+    template_path = os.path.join(TEMPLATE_DIR, f"{template_name}.txt")
+    with open(template_path, "r", encoding="utf-8") as f:
+        template_content = f.read()
+    return template_content.format(**kwargs)
+
+
+def _rate(render, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        render()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_RENDERS
+    registry = TemplateRegistry()
+    print(f"{'模板':>28} {'原实现(次/秒)':>16} {'预编译(次/秒)':>16} {'加速比':>8}")
+    for name, values in CASES:
+        legacy = _rate(lambda: legacy_render(name, **values), count)
+        compiled = _rate(lambda: registry.render(name, **values), count)
+        print(f"{name:>28} {legacy:>16,.0f} {compiled:>16,.0f} {compiled / legacy:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
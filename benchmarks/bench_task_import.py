@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+任务批量导入基准测试
+生成含少量不合格行的CSV导出文件，导入SQLite和JSON任务列表，报告每秒行数和进程内存峰值
+
+用法:
+    python benchmarks/bench_task_import.py [行数] [每批任务数]
+"""
+
+import sys
+import os
+import csv
+import random
+import resource
+import tempfile
+from datetime import date, timedelta
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.task_import import DEFAULT_IMPORT_BATCH_SIZE, import_tasks
+
+DEFAULT_ROWS = 300_000
+
+# 不合格行的比例（缺少标题或日期无法识别）
+BAD_ROW_RATIO = 0.01
+
+
+def _write_export(path: str, rows: int):
+    start = date.today() - timedelta(days=180)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "description", "priority", "status", "due_date", "owner"])
+        for i in range(rows):
+            title = f"任务 {i}" if random.random() >= BAD_ROW_RATIO else ""
+            writer.writerow([
+                i + 1,
+                title,
+                "从旧系统导出的任务描述" * 3,
+                random.choice(("High", "medium", "low", "urgent")),
+                random.choice(("pending", "in_progress", "completed")),
+                (start + timedelta(days=random.randrange(365))).strftime("%Y/%m/%d"),
+                random.choice(("张三", "李四", "王五")),
+            ])
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_IMPORT_BATCH_SIZE
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "export.csv")
+        _write_export(source, rows)
+        print(f"数据文件: {rows} 行, {os.path.getsize(source) / 1024 / 1024:.1f} MB, 每批 {batch_size} 个任务")
+        print(f"{'后端':>8} {'导入':>10} {'拒绝':>8} {'耗时(s)':>10} {'行/秒':>10} {'内存峰值(MB)':>14}")
+        for backend, ext in (("sqlite", ".db"), ("json", ".json")):
+            stats = import_tasks(os.path.join(tmp, f"tasks{ext}"), source, batch_size=batch_size)
+            # ru_maxrss 在 Linux 上以KB为单位，为整个进程至今的峰值
+            peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            print(f"{backend:>8} {stats['imported']:>10} {stats['rejected']:>8} {stats['elapsed_seconds']:>10.2f} "
+                  f"{stats['rows_per_second']:>10} {peak_mb:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
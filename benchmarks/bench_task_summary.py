@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+任务列表摘要基准测试
+对比逐个扫描任务的原实现与读取增量聚合的实现，列表规模从100到100万
+
+用法:
+    python benchmarks/bench_task_summary.py [最大任务数]
+"""
+
+import sys
+import os
+import time
+import random
+import tempfile
+import statistics
+from datetime import date, timedelta
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.office_tools import get_task_list_summary
+from src.utils.task_store import TaskStore, open_task_store
+
+DEFAULT_MAX_TASKS = 1_000_000
+REPEAT = 20
+
+# 原实现逐个扫描，只在这个规模以内运行
+LEGACY_MAX_TASKS = 100_000
+
+
+def _tasks(count: int):
+    start = date.today() - timedelta(days=180)
+    for i in range(count):
+        yield {
+            "title": f"任务 {i}",
+            "priority": random.choice(("high", "medium", "low")),
+            "status": random.choice(("pending", "pending", "in_progress", "completed")),
+            "due_date": (start + timedelta(days=random.randrange(365))).isoformat(),
+        }
+
+
+def _median_ms(fn, repeat: int = REPEAT) -> float:
+    samples = []
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - begin)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    max_tasks = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_MAX_TASKS
+    sizes = [n for n in (100, 1_000, 10_000, 100_000, 1_000_000) if n <= max_tasks]
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'任务数':>10} {'后端':>8} {'摘要工具(ms)':>14} {'逐个扫描(ms)':>14}")
+        for size in sizes:
+            for backend, ext in (("sqlite", ".db"), ("json", ".json")):
+                if backend == "json" and size > LEGACY_MAX_TASKS:
+                    continue
+                path = os.path.join(tmp, f"tasks_{size}{ext}")
+                with open_task_store(path, backend) as store:
+                    store.create(_tasks(size))
+                tool_ms = _median_ms(lambda: get_task_list_summary(path))
+                legacy = "-"
+                if size <= LEGACY_MAX_TASKS:
+                    with open_task_store(path) as store:
+                        legacy = f"{_median_ms(lambda: TaskStore.summary(store), repeat=3):.2f}"
+                print(f"{size:>10} {backend:>8} {tool_ms:>14.2f} {legacy:>14}")
+
+
+if __name__ == "__main__":
+    main()
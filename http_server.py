@@ -23,9 +23,11 @@ try:
         create_word_document,
         create_excel_spreadsheet,
         create_powerpoint_presentation,
+        create_documents_batch,
         list_files_in_directory,
         read_file_content,
         move_file,
+        move_files,
         delete_file,
         compress_files,
         extract_archive
@@ -35,9 +37,11 @@ try:
     mcp.add_tool(create_word_document)
     mcp.add_tool(create_excel_spreadsheet)
     mcp.add_tool(create_powerpoint_presentation)
+    mcp.add_tool(create_documents_batch)
     mcp.add_tool(list_files_in_directory)
     mcp.add_tool(read_file_content)
     mcp.add_tool(move_file)
+    mcp.add_tool(move_files)
     mcp.add_tool(delete_file)
     mcp.add_tool(compress_files)
     mcp.add_tool(extract_archive)
@@ -1,45 +1,81 @@
 import os
-import yaml
-from openai import OpenAI
-from typing import List, Dict, Any, Optional
+import time
+import asyncio
+import openai
+from openai import AsyncOpenAI, OpenAI
+from typing import AsyncIterator, Iterator, List, Dict, Any, Optional, Tuple
+
+from src.utils.context_budget import BudgetReport, ContextBudgeter, count_tokens
+from src.utils.llm_cache import ResponseCache, is_deterministic, request_hash
+from src.utils.llm_clients import client_key, get_async_client, get_client
+from src.utils.llm_config import LLMConfig, get_llm_config
+from src.utils.llm_stream import StreamMetrics
+from src.utils.prompt_templates import get_template_registry
+from src.utils.rate_limiter import (
+    RateLimiter,
+    acall_with_limiter,
+    call_with_limiter,
+    estimate_tokens,
+    get_rate_limiter,
+)
+from src.utils.single_flight import get_single_flight
+
+# achat_many 默认的最大并发请求数
+DEFAULT_CONCURRENCY = 8
+
+# MODEL_CONFIGS 中没有配置上下文窗口时使用的令牌数
+DEFAULT_CONTEXT_WINDOW = 8192
 
 
 class LLMManager:
     """大语言模型管理类，支持多种模型提供商"""
     
-    # 模型配置
+    # 模型配置（context_window 为提供商默认的上下文窗口令牌数，context_windows 按模型覆盖）
     MODEL_CONFIGS = {
         "openai": {
             "base_url": "https://api.openai.com/v1",
-            "models": ["gpt-4o", "gpt-4o-mini", "gpt-4-turbo", "gpt-4", "gpt-3.5-turbo"]
+            "models": ["gpt-4o", "gpt-4o-mini", "gpt-4-turbo", "gpt-4", "gpt-3.5-turbo"],
+            "context_window": 128000,
+            "context_windows": {"gpt-4": 8192, "gpt-3.5-turbo": 16385}
         },
         "qwen": {
             "base_url": "https://dashscope.aliyuncs.com/compatible-mode/v1",
-            "models": ["qwen-turbo", "qwen-plus", "qwen-max", "qwen2.5-coder-32b-instruct", "qwen3-72b-instruct"]
+            "models": ["qwen-turbo", "qwen-plus", "qwen-max", "qwen2.5-coder-32b-instruct", "qwen3-72b-instruct"],
+            "context_window": 131072,
+            "context_windows": {"qwen-max": 32768}
         },
         "deepseek": {
             "base_url": "https://api.deepseek.com/v1",
-            "models": ["deepseek-chat", "deepseek-coder"]
+            "models": ["deepseek-chat", "deepseek-coder"],
+            "context_window": 65536
         },
         "moonshot": {
             "base_url": "https://api.moonshot.cn/v1",
-            "models": ["moonshot-v1-8k", "moonshot-v1-32k", "moonshot-v1-128k"]
+            "models": ["moonshot-v1-8k", "moonshot-v1-32k", "moonshot-v1-128k"],
+            "context_window": 8192,
+            "context_windows": {"moonshot-v1-32k": 32768, "moonshot-v1-128k": 131072}
         },
         "modelscope": {
             "base_url": "https://api-inference.modelscope.cn/v1",
-            "models": ["Qwen/Qwen3-Coder-30B-A3B-Instruct", "Qwen/Qwen3-235B-A22B-Instruct-2507"]
+            "models": ["Qwen/Qwen3-Coder-30B-A3B-Instruct", "Qwen/Qwen3-235B-A22B-Instruct-2507"],
+            "context_window": 262144
         },
         "zhipu": {
             "base_url": "https://open.bigmodel.cn/api/paas/v4",
-            "models": ["glm-4", "glm-4-plus", "glm-4-air", "glm-4-airx", "glm-4-long", "glm-4-flash", "glm-4v"]
+            "models": ["glm-4", "glm-4-plus", "glm-4-air", "glm-4-airx", "glm-4-long", "glm-4-flash", "glm-4v"],
+            "context_window": 128000,
+            "context_windows": {"glm-4-airx": 8192, "glm-4-long": 1000000, "glm-4v": 8192}
         },
         "anthropic": {
             "base_url": "https://api.anthropic.com/v1",
-            "models": ["claude-3-5-sonnet-20241022", "claude-3-5-haiku-20241022", "claude-3-opus-20240229"]
+            "models": ["claude-3-5-sonnet-20241022", "claude-3-5-haiku-20241022", "claude-3-opus-20240229"],
+            "context_window": 200000
         },
         "ollama": {
             "base_url": "http://localhost:11434/v1",
-            "models": ["qwen3:8b", "nomic-embed-text:latest", "gemma3:1b"]
+            "models": ["qwen3:8b", "nomic-embed-text:latest", "gemma3:1b"],
+            "context_window": 32768,
+            "context_windows": {"qwen3:8b": 40960}
         },
         "siliconflow": {
             "base_url": "https://api.siliconflow.cn/v1",
@@ -54,11 +90,19 @@ class LLMManager:
                       "meta-llama/Meta-Llama-3.1-8B-Instruct", "meta-llama/Meta-Llama-3.1-70B-Instruct",
                       "meta-llama/Meta-Llama-3.1-405B-Instruct", "meta-llama/Meta-Llama-3-8B-Instruct",
                       "meta-llama/Meta-Llama-3-70B-Instruct", "google/gemma-2-27b-it", "google/gemma-2-9b-it",
-                      "google/gemma-7b-it"]
+                      "google/gemma-7b-it"],
+            "context_window": 32768,
+            "context_windows": {"Qwen/Qwen2.5-72B-Instruct": 131072, "Qwen/Qwen2.5-32B-Instruct": 131072,
+                                "Qwen/Qwen2.5-14B-Instruct": 131072, "Qwen/Qwen2.5-7B-Instruct": 131072}
         }
     }
+    
+    # 不支持 stream_options 参数的提供商（去掉该参数后重试成功时记录），流式调用时不再请求用量
+    _stream_usage_unsupported = set()
 
-    def __init__(self, provider: str = None, model: str = None, api_key: Optional[str] = None):
+    def __init__(self, provider: str = None, model: str = None, api_key: Optional[str] = None,
+                 cache: Optional[ResponseCache] = None, max_retries: Optional[int] = None,
+                 coalesce: bool = True, budgeter: Optional[ContextBudgeter] = None):
         """
         初始化LLM管理器
         
@@ -66,27 +110,31 @@ class LLMManager:
             provider: 模型提供商 ("openai", "qwen", "deepseek", "moonshot", "modelscope", "zhipu", "anthropic")
             model: 模型名称
             api_key: API密钥（可选，如果未提供将从配置文件或环境变量中获取）
+            cache: 响应缓存（可选），只缓存 temperature 为0的非流式调用，可在多个管理器间共享
+            max_retries: 客户端的重试次数（可选，默认使用OpenAI客户端的设置）
+            coalesce: 是否合并并发的相同请求：进程内同一提供商、同一API密钥、参数完全相同的确定性调用
+                （temperature 为0的非流式调用）同时进行时只发送一次请求，所有调用共享它的结果；
+                采样调用不合并，每次调用得到独立的结果
+            budgeter: 上下文预算器（可选），调用前把消息压缩到模型上下文窗口（减去输出预留）以内
         """
-        # 加载配置
-        self.config = self._load_config()
-        
         # 如果未指定提供商和模型，则从配置文件中获取默认值
         if provider is None:
-            provider = self.config.get("default_provider", "openai")
+            provider = self.config.default_provider
         if model is None:
-            model = self.config.get("default_model", "gpt-4o-mini")
+            model = self.config.default_model
             
         self.provider = provider
         self.model = model
-        self.client = self._create_client(api_key)
+        self.cache = cache
+        self.max_retries = max_retries
+        self.coalesce = coalesce
+        self.budgeter = budgeter
+        self._options = self._client_options(api_key)
     
-    def _load_config(self) -> Dict[str, Any]:
-        """加载配置文件"""
-        config_path = os.path.join(os.path.dirname(__file__), "config", "config.yaml")
-        if os.path.exists(config_path):
-            with open(config_path, "r", encoding="utf-8") as f:
-                return yaml.safe_load(f) or {}
-        return {}
+    @property
+    def config(self) -> LLMConfig:
+        """当前配置（进程内缓存，配置文件变化时自动重新加载）"""
+        return get_llm_config()
     
     def _get_api_key(self, api_key: Optional[str] = None) -> str:
         """获取API密钥"""
@@ -95,12 +143,9 @@ class LLMManager:
             return api_key
             
         # 从配置文件中获取
-        if self.config and "api_keys" in self.config:
-            api_keys = self.config["api_keys"]
-            if self.provider in api_keys:
-                key = api_keys[self.provider]
-                if key and key != f"YOUR_{self.provider.upper()}_API_KEY":
-                    return key
+        key = self.config.api_key(self.provider)
+        if key:
+            return key
         
         # 从环境变量获取
         env_vars = {
@@ -123,16 +168,27 @@ class LLMManager:
         # 默认值
         return "YOUR_API_KEY"
     
-    def _create_client(self, api_key: Optional[str] = None) -> OpenAI:
-        """创建OpenAI客户端"""
+    def _client_options(self, api_key: Optional[str] = None) -> Dict[str, Any]:
+        """按 MODEL_CONFIGS 解析当前提供商的客户端参数"""
         if self.provider not in self.MODEL_CONFIGS:
             raise ValueError(f"不支持的模型提供商: {self.provider}")
         
         config = self.MODEL_CONFIGS[self.provider]
-        return OpenAI(
-            api_key=api_key or self._get_api_key(None),
-            base_url=config["base_url"]
-        )
+        return {
+            "api_key": api_key or self._get_api_key(None),
+            "base_url": config["base_url"]
+        }
+    
+    @property
+    def client(self) -> OpenAI:
+        """当前提供商的OpenAI客户端（进程内共享，不要单独关闭）"""
+        client = get_client(self.provider, **self._options)
+        return client if self.max_retries is None else client.with_options(max_retries=self.max_retries)
+    
+    def _get_async_client(self) -> AsyncOpenAI:
+        """获取当前事件循环中共享的异步客户端"""
+        client = get_async_client(self.provider, **self._options)
+        return client if self.max_retries is None else client.with_options(max_retries=self.max_retries)
     
     def update_provider(self, provider: str, api_key: Optional[str] = None):
         """
@@ -143,7 +199,7 @@ class LLMManager:
             api_key: 新的API密钥，如果为None则使用当前密钥
         """
         self.provider = provider
-        self.client = self._create_client(api_key)
+        self._options = self._client_options(api_key)
     
     def update_model(self, model: str):
         """
@@ -154,29 +210,308 @@ class LLMManager:
         """
         self.model = model
     
-    def chat_completion(self, messages: list, **kwargs) -> Dict[str, Any]:
+    def chat_completion(self, messages: list, deadline: Optional[float] = None,
+                        budget_report: Optional[BudgetReport] = None, **kwargs) -> Dict[str, Any]:
         """
         调用聊天完成接口
         
         Args:
             messages: 消息列表
+            deadline: 排队的截止时间（从现在起的秒数，可选），配置了速率限制时按截止时间先后获得许可
+            budget_report: 预算结果对象（可选），配置了 budgeter 时记录压缩前后的令牌数和节省的令牌数
             **kwargs: 其他参数
             
         Returns:
             模型响应
         """
-        # 设置默认参数
+        params = self._request_params(messages, kwargs, budget_report)
+        key = self.cache.key_for(self.provider, params) if self.cache is not None else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        
+        # 调用API
+        flight_key = self._flight_key(params)
+        if flight_key is not None:
+            response, shared = get_single_flight().do(flight_key, lambda: self._create(params, deadline))
+        else:
+            response, shared = self._create(params, deadline), False
+        if shared:
+            # 共享的响应复制一份，避免调用方修改彼此的结果
+            return response.model_copy(deep=True)
+        if key is not None:
+            self.cache.put(key, response)
+        return response
+    
+    async def achat_completion(self, messages: list, deadline: Optional[float] = None,
+                               budget_report: Optional[BudgetReport] = None, **kwargs) -> Dict[str, Any]:
+        """
+        异步调用聊天完成接口
+        
+        Args:
+            messages: 消息列表
+            deadline: 排队的截止时间（从现在起的秒数，可选），配置了速率限制时按截止时间先后获得许可
+            budget_report: 预算结果对象（可选），配置了 budgeter 时记录压缩前后的令牌数和节省的令牌数
+            **kwargs: 其他参数
+            
+        Returns:
+            模型响应
+        """
+        params = await self._in_thread_if_summarizing(self._request_params, messages, kwargs, budget_report)
+        # 缓存读写是本地的内存或SQLite操作，耗时远小于一次模型调用，直接在事件循环中执行
+        key = self.cache.key_for(self.provider, params) if self.cache is not None else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        
+        flight_key = self._flight_key(params)
+        if flight_key is not None:
+            response, shared = await get_single_flight().ado(flight_key, lambda: self._acreate(params, deadline))
+        else:
+            response, shared = await self._acreate(params, deadline), False
+        if shared:
+            return response.model_copy(deep=True)
+        if key is not None:
+            self.cache.put(key, response)
+        return response
+    
+    async def achat_many(self, message_sets: List[list], concurrency: int = DEFAULT_CONCURRENCY,
+                         return_exceptions: bool = False, **kwargs) -> list:
+        """
+        并发调用聊天完成接口
+        
+        Args:
+            message_sets: 消息列表的列表，每个元素对应一次请求
+            concurrency: 最大并发请求数
+            return_exceptions: 为True时失败的请求以异常对象作为结果返回，
+                为False时第一个失败的请求抛出异常并取消其余请求
+            **kwargs: 其他参数，应用于每次请求
+            
+        Returns:
+            与 message_sets 顺序一致的模型响应列表
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency 必须大于0")
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def run(messages: list):
+            async with semaphore:
+                return await self.achat_completion(messages, **kwargs)
+        
+        tasks = [asyncio.ensure_future(run(messages)) for messages in message_sets]
+        try:
+            return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    def stream_chat_completion(self, messages: list, metrics: Optional[StreamMetrics] = None,
+                               budget_report: Optional[BudgetReport] = None, **kwargs) -> Iterator[str]:
+        """
+        流式调用聊天完成接口
+        
+        Args:
+            messages: 消息列表
+            metrics: 指标对象（可选），调用过程中记录首个令牌时间、每秒令牌数、总耗时和用量
+            budget_report: 预算结果对象（可选），配置了 budgeter 时记录压缩前后的令牌数和节省的令牌数
+            **kwargs: 其他参数
+            
+        Returns:
+            文本增量的生成器
+        """
+        metrics = self._start_metrics(metrics)
+        params = self._stream_params(messages, kwargs, budget_report)
+        try:
+            stream = self.client.chat.completions.create(**params)
+        except openai.BadRequestError:
+            if not self._drop_stream_usage(params, kwargs):
+                raise
+            stream = self.client.chat.completions.create(**params)
+            self._stream_usage_unsupported.add(self.provider)
+        try:
+            for chunk in stream:
+                text = metrics.observe(chunk)
+                if text:
+                    yield text
+        finally:
+            stream.close()
+            metrics.finish()
+    
+    async def astream_chat_completion(self, messages: list, metrics: Optional[StreamMetrics] = None,
+                                      budget_report: Optional[BudgetReport] = None,
+                                      **kwargs) -> AsyncIterator[str]:
+        """
+        异步流式调用聊天完成接口
+        
+        Args:
+            messages: 消息列表
+            metrics: 指标对象（可选），调用过程中记录首个令牌时间、每秒令牌数、总耗时和用量
+            budget_report: 预算结果对象（可选），配置了 budgeter 时记录压缩前后的令牌数和节省的令牌数
+            **kwargs: 其他参数
+            
+        Returns:
+            文本增量的异步生成器
+        """
+        metrics = self._start_metrics(metrics)
+        params = await self._in_thread_if_summarizing(self._stream_params, messages, kwargs, budget_report)
+        client = self._get_async_client()
+        try:
+            stream = await client.chat.completions.create(**params)
+        except openai.BadRequestError:
+            if not self._drop_stream_usage(params, kwargs):
+                raise
+            stream = await client.chat.completions.create(**params)
+            self._stream_usage_unsupported.add(self.provider)
+        try:
+            async for chunk in stream:
+                text = metrics.observe(chunk)
+                if text:
+                    yield text
+        finally:
+            await stream.close()
+            metrics.finish()
+    
+    def _flight_key(self, params: Dict[str, Any]) -> Optional[tuple]:
+        """
+        请求合并的键：客户端（提供商、地址、API密钥哈希）和请求参数的哈希
+        
+        未开启合并、不是确定性调用或参数无法序列化（如 openai.NOT_GIVEN）时返回None，直接调用
+        """
+        if not self.coalesce or not is_deterministic(params):
+            return None
+        try:
+            return client_key(self.provider, **self._options), request_hash(self.provider, params)
+        except (TypeError, ValueError):
+            return None
+    
+    def _rate_limiter(self) -> Optional[RateLimiter]:
+        """config.yaml 中为当前提供商和模型配置的速率限制器"""
+        limits = self.config.rate_limits_for(self.provider, self.model)
+        return get_rate_limiter(self.provider, self.model, limits) if limits is not None else None
+    
+    def _create(self, params: Dict[str, Any], deadline: Optional[float] = None):
+        """发出请求；配置了速率限制时排队获得许可，由限制器代替客户端重试429和5xx"""
+        limiter = self._rate_limiter()
+        if limiter is None:
+            return self.client.chat.completions.create(**params)
+        client = self.client.with_options(max_retries=0)
+        return call_with_limiter(
+            limiter,
+            lambda: client.chat.completions.create(**params),
+            estimate_tokens(params),
+            None if deadline is None else time.monotonic() + deadline
+        )
+    
+    async def _acreate(self, params: Dict[str, Any], deadline: Optional[float] = None):
+        """异步发出请求，参见 _create"""
+        client = self._get_async_client()
+        limiter = self._rate_limiter()
+        if limiter is None:
+            return await client.chat.completions.create(**params)
+        client = client.with_options(max_retries=0)
+        return await acall_with_limiter(
+            limiter,
+            lambda: client.chat.completions.create(**params),
+            estimate_tokens(params),
+            None if deadline is None else time.monotonic() + deadline
+        )
+    
+    def _start_metrics(self, metrics: Optional[StreamMetrics]) -> StreamMetrics:
+        if metrics is None:
+            metrics = StreamMetrics()
+        metrics.provider, metrics.model = self.provider, self.model
+        metrics.started_at = time.perf_counter()
+        return metrics
+    
+    def _stream_params(self, messages: list, kwargs: Dict[str, Any],
+                       budget_report: Optional[BudgetReport] = None) -> Dict[str, Any]:
+        """流式调用参数，默认请求在最后一个块中返回用量"""
+        params = {**self._request_params(messages, kwargs, budget_report), "stream": True}
+        if "stream_options" not in kwargs and self.provider not in self._stream_usage_unsupported:
+            params["stream_options"] = {"include_usage": True}
+        return params
+    
+    def _drop_stream_usage(self, params: Dict[str, Any], kwargs: Dict[str, Any]) -> bool:
+        """
+        请求被拒绝时去掉自动添加的 stream_options，返回是否需要重试
+        
+        拒绝的原因可能与该参数无关（如上下文过长），重试成功后才记录提供商不支持该参数
+        """
+        if "stream_options" in kwargs or "stream_options" not in params:
+            return False
+        del params["stream_options"]
+        return True
+    
+    def _request_params(self, messages: list, kwargs: Dict[str, Any],
+                        budget_report: Optional[BudgetReport] = None) -> Dict[str, Any]:
+        """合并默认参数和调用参数，配置了 budgeter 时把消息压缩到预算内"""
+        # 设置默认参数（配置文件中的 model_params 优先级最低）
         default_params = {
+            **self.config.model_params.as_kwargs(),
             "model": self.model,
             "messages": messages
         }
         
         # 合并参数
         params = {**default_params, **kwargs}
+        if self.budgeter is not None:
+            params["messages"], _ = self.fit_messages(params["messages"], self._max_output(params), budget_report)
+        return params
+    
+    async def _in_thread_if_summarizing(self, build, *args) -> Dict[str, Any]:
+        """构造请求参数；预算器的摘要函数会调用模型，此时在线程中执行以免阻塞事件循环"""
+        if self.budgeter is not None and self.budgeter.summarizer is not None:
+            return await asyncio.to_thread(build, *args)
+        return build(*args)
+    
+    @staticmethod
+    def _max_output(params: Dict[str, Any]) -> Optional[int]:
+        return params.get("max_tokens") or params.get("max_completion_tokens")
+    
+    def get_context_window(self, model: Optional[str] = None) -> int:
+        """
+        获取模型的上下文窗口
         
-        # 调用API
-        response = self.client.chat.completions.create(**params)
-        return response
+        Args:
+            model: 模型名称，如果为None则使用当前模型
+            
+        Returns:
+            上下文窗口的令牌数
+        """
+        config = self.MODEL_CONFIGS.get(self.provider, {})
+        windows = config.get("context_windows") or {}
+        return windows.get(model or self.model, config.get("context_window", DEFAULT_CONTEXT_WINDOW))
+    
+    def count_tokens(self, messages: list) -> int:
+        """
+        计算消息列表的输入令牌数（使用当前模型所属系列的分词器）
+        
+        Args:
+            messages: 消息列表
+            
+        Returns:
+            令牌数
+        """
+        return count_tokens(messages, self.model)
+    
+    def fit_messages(self, messages: list, max_tokens: Optional[int] = None,
+                     report: Optional[BudgetReport] = None) -> Tuple[list, BudgetReport]:
+        """
+        把消息压缩到当前模型的上下文预算内
+        
+        Args:
+            messages: 消息列表
+            max_tokens: 为输出预留的令牌数（可选，默认使用预算器的设置）
+            report: 结果对象（可选）
+            
+        Returns:
+            (消息列表, 结果)，结果中包含节省的令牌数
+        """
+        budgeter = self.budgeter or ContextBudgeter()
+        budget = budgeter.budget_for(self.get_context_window(), max_tokens)
+        return budgeter.fit(messages, budget, self.model, report)
     
     def get_available_providers(self) -> list:
         """获取所有支持的模型提供商"""
@@ -210,18 +545,7 @@ class LLMManager:
         Returns:
             模板内容
         """
-        template_path = os.path.join(
-            os.path.dirname(__file__), 
-            "config", 
-            "prompt_templates", 
-            f"{template_name}.txt"
-        )
-        
-        if os.path.exists(template_path):
-            with open(template_path, "r", encoding="utf-8") as f:
-                return f.read()
-        else:
-            raise FileNotFoundError(f"提示词模板 '{template_name}' 不存在")
+        return get_template_registry().get(template_name).source
     
     def render_prompt_template(self, template_name: str, **kwargs) -> str:
         """
@@ -229,18 +553,12 @@ class LLMManager:
         
         Args:
             template_name: 模板名称（不包含文件扩展名）
-            **kwargs: 模板变量
+            **kwargs: 模板变量，对应模板中的 {{变量}}
             
         Returns:
             渲染后的提示词
         """
-        template_content = self.load_prompt_template(template_name)
-        
-        # 简单的模板渲染（使用Python内置的str.format方法）
-        try:
-            return template_content.format(**kwargs)
-        except KeyError as e:
-            raise ValueError(f"模板 '{template_name}' 缺少必要的变量: {e}")
+        return get_template_registry().render(template_name, **kwargs)
 
 
 # 使用示例
@@ -0,0 +1,260 @@
+"""
+模型路由模块
+在提供同一模型的多个端点之间按延迟和错误率选择，可选对冲请求以降低尾延迟
+"""
+
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import openai
+
+from src.core.llm import LLMManager
+
+# 延迟和错误率的指数加权移动平均系数
+LATENCY_ALPHA = 0.2
+ERROR_ALPHA = 0.1
+
+# 计算 p95 使用的最近延迟样本数，样本不足 HEDGE_MIN_SAMPLES 个时不发送对冲请求
+LATENCY_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+
+# 对冲请求的最小延迟（秒），避免在延迟很小时加倍请求量
+HEDGE_MIN_DELAY = 0.05
+
+# 随机选择非最优端点的概率，使延迟变化后的端点有机会重新被评估
+EXPLORE_RATE = 0.05
+
+
+def is_endpoint_error(error: BaseException) -> bool:
+    """由端点引起、换一个端点可能成功的错误：连接失败、超时、404、429和5xx"""
+    if isinstance(error, (openai.APIConnectionError, asyncio.TimeoutError)):
+        return True
+    status = getattr(error, "status_code", None)
+    return status is not None and (status in (404, 408, 429) or status >= 500)
+
+
+class EndpointStats:
+    """单个端点的延迟和错误率统计"""
+
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.samples: deque = deque(maxlen=LATENCY_WINDOW)
+
+    def observe(self, latency: float, ok: bool):
+        self.requests += 1
+        self.error_rate += ERROR_ALPHA * ((0.0 if ok else 1.0) - self.error_rate)
+        if not ok:
+            self.errors += 1
+            return
+        self.samples.append(latency)
+        self.latency = latency if self.latency is None else self.latency + LATENCY_ALPHA * (latency - self.latency)
+
+    def score(self) -> float:
+        """预期延迟，错误率越高越大；未调用过的端点为0，优先尝试，只有失败记录的端点排在最后"""
+        if self.latency is None:
+            return 0.0 if self.errors == 0 else float("inf")
+        return self.latency / max(1e-3, 1.0 - self.error_rate)
+
+    def p95(self) -> Optional[float]:
+        if len(self.samples) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def as_dict(self) -> Dict[str, Any]:
+        p95 = self.p95()
+        return {
+            "latency_ewma": None if self.latency is None else round(self.latency, 4),
+            "p95": None if p95 is None else round(p95, 4),
+            "error_rate": round(self.error_rate, 4),
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+        }
+
+
+class LLMRouter:
+    """
+    多端点路由
+
+    同一个模型往往可以从多个提供商调用（如 qwen、modelscope、siliconflow 上的 Qwen 系列），
+    路由按每个端点延迟和错误率的指数加权移动平均选择预期延迟最小的端点，端点出错时换下一个端点。
+    异步调用可开启对冲：主请求超过该端点延迟的 p95 仍未返回时向次优端点发送相同请求，
+    先返回的结果生效，另一个请求被取消。
+    """
+
+    def __init__(self, endpoints: Sequence[Tuple[str, str]], api_keys: Optional[Dict[str, str]] = None,
+                 hedge: bool = False, max_retries: int = 0):
+        """
+        Args:
+            endpoints: (提供商, 模型) 列表
+            api_keys: 提供商 -> API密钥（可选，未提供时从配置文件或环境变量中获取）
+            hedge: 异步调用是否发送对冲请求
+            max_retries: 每个端点客户端的重试次数，默认不重试，出错时直接换端点
+        """
+        if not endpoints:
+            raise ValueError("至少需要一个端点")
+        api_keys = api_keys or {}
+        self.hedge = hedge
+        self.managers: Dict[Tuple[str, str], LLMManager] = {
+            (provider, model): LLMManager(provider, model, api_keys.get(provider), max_retries=max_retries)
+            for provider, model in endpoints
+        }
+        self.endpoints: Dict[Tuple[str, str], EndpointStats] = {endpoint: EndpointStats() for endpoint in self.managers}
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+
+    def choose(self, exclude: Sequence[Tuple[str, str]] = ()) -> Optional[Tuple[str, str]]:
+        """选择预期延迟最小的端点，所有端点都已排除时返回None"""
+        with self._lock:
+            candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude]
+            if not candidates:
+                return None
+            if len(candidates) > 1 and random.random() < EXPLORE_RATE:
+                return random.choice(candidates)
+            return min(candidates, key=lambda endpoint: self.endpoints[endpoint].score())
+
+    def chat_completion(self, messages: list, **kwargs) -> Any:
+        """
+        调用预期延迟最小的端点，端点出错时依次换下一个端点
+
+        Args:
+            messages: 消息列表
+            **kwargs: 其他参数（model 由端点决定）
+
+        Returns:
+            模型响应
+        """
+        tried: List[Tuple[str, str]] = []
+        last_error: Optional[BaseException] = None
+        while True:
+            endpoint = self.choose(tried)
+            if endpoint is None:
+                raise last_error
+            tried.append(endpoint)
+            self._begin(endpoint)
+            start = time.perf_counter()
+            try:
+                response = self.managers[endpoint].chat_completion(messages, **kwargs)
+            except Exception as e:
+                self._end(endpoint, time.perf_counter() - start, ok=False if is_endpoint_error(e) else None)
+                if not is_endpoint_error(e):
+                    raise
+                last_error = e
+                continue
+            self._end(endpoint, time.perf_counter() - start, ok=True)
+            return response
+
+    async def achat_completion(self, messages: list, **kwargs) -> Any:
+        """
+        异步调用，开启对冲时主请求超过 p95 延迟后向次优端点发送相同请求
+
+        Args:
+            messages: 消息列表
+            **kwargs: 其他参数（model 由端点决定）
+
+        Returns:
+            模型响应
+        """
+        tried: List[Tuple[str, str]] = []
+        tasks: Dict[asyncio.Task, Tuple[str, str]] = {}
+        # 有请求成功返回后置为True，之后被取消的请求（对冲中的落后者）仍计入延迟统计
+        race = {"won": False}
+        hedged = False
+        last_error: Optional[BaseException] = None
+        try:
+            while True:
+                if not tasks:
+                    endpoint = self.choose(tried)
+                    if endpoint is None:
+                        raise last_error
+                    tried.append(endpoint)
+                    tasks[asyncio.ensure_future(self._acall(endpoint, messages, kwargs, race))] = endpoint
+
+                timeout = None
+                if self.hedge and not hedged and len(tasks) == 1 and len(tried) < len(self.endpoints):
+                    timeout = self._hedge_delay(next(iter(tasks.values())))
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # 主请求超过 p95 仍未返回，向次优端点发送对冲请求
+                    endpoint = self.choose(tried)
+                    tried.append(endpoint)
+                    hedged = True
+                    with self._lock:
+                        self.hedges += 1
+                    tasks[asyncio.ensure_future(self._acall(endpoint, messages, kwargs, race, hedge=True))] = endpoint
+                    continue
+
+                for task in done:
+                    tasks.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        race["won"] = True
+                        return task.result()
+                    if not is_endpoint_error(error):
+                        raise error
+                    last_error = error
+        finally:
+            # 取消尚未返回的请求（对冲中的落后者）
+            for task in tasks:
+                task.cancel()
+
+    async def _acall(self, endpoint: Tuple[str, str], messages: list, kwargs: Dict[str, Any],
+                     race: Dict[str, bool], hedge: bool = False):
+        self._begin(endpoint)
+        start = time.perf_counter()
+        ok = None
+        try:
+            response = await self.managers[endpoint].achat_completion(messages, **kwargs)
+            ok = True
+            if hedge:
+                with self._lock:
+                    self.hedge_wins += 1
+            return response
+        except asyncio.CancelledError:
+            # 另一个请求先返回时，落后者已用的时间是其延迟的下限，计入统计，
+            # 否则延迟和 p95 只由快速返回的请求构成；调用方取消整个调用时不计入
+            if race["won"]:
+                ok = True
+            raise
+        except Exception as e:
+            ok = False if is_endpoint_error(e) else None
+            raise
+        finally:
+            self._end(endpoint, time.perf_counter() - start, ok)
+
+    def _hedge_delay(self, endpoint: Tuple[str, str]) -> Optional[float]:
+        with self._lock:
+            p95 = self.endpoints[endpoint].p95()
+        return None if p95 is None else max(p95, HEDGE_MIN_DELAY)
+
+    def _begin(self, endpoint: Tuple[str, str]):
+        with self._lock:
+            self.endpoints[endpoint].in_flight += 1
+
+    def _end(self, endpoint: Tuple[str, str], latency: float, ok: Optional[bool]):
+        """记录一次请求的结果，ok 为None（请求本身有误或调用方取消）时只减少在途数"""
+        with self._lock:
+            stats = self.endpoints[endpoint]
+            stats.in_flight -= 1
+            if ok is not None:
+                stats.observe(latency, ok)
+
+    def stats(self) -> Dict[str, Any]:
+        """每个端点的统计和对冲次数"""
+        with self._lock:
+            return {
+                "endpoints": {f"{provider}/{model}": stats.as_dict() for (provider, model), stats in self.endpoints.items()},
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+            }
@@ -43,15 +43,22 @@ try:
         office_tools.create_word_document,
         office_tools.create_excel_spreadsheet,
         office_tools.create_powerpoint_presentation,
+        office_tools.create_documents_batch,
         office_tools.list_files_in_directory,
         office_tools.read_file_content,
         office_tools.move_file,
+        office_tools.move_files,
         office_tools.delete_file,
         office_tools.compress_files,
         office_tools.extract_archive,
         office_tools.create_task_list,
         office_tools.add_task_to_list,
-        office_tools.get_task_list_summary
+        office_tools.update_task,
+        office_tools.delete_task,
+        office_tools.get_task_list_summary,
+        office_tools.query_tasks,
+        office_tools.convert_task_list,
+        office_tools.bulk_import_tasks
     ]
     
     # 注册所有工具
@@ -4,14 +4,49 @@
 """
 
 import os
-import json
+import time
+import asyncio
+import functools
+import threading
+import contextlib
 import subprocess
+import importlib.metadata
 from pathlib import Path
 from typing import List, Dict, Any, Optional
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
+from pydantic import AnyUrl
+
+from src.utils.archive import build_zip, collect_members, extract_zip
+from src.utils.batch_runner import DEFAULT_MEMORY_BUDGET, count_manifest, iter_manifest, run_batch
+from src.utils.dir_scanner import DEFAULT_PAGE_SIZE, list_directory
+from src.utils.dir_watcher import DirectorySnapshot
+from src.utils.docx_writer import iter_file_paragraphs, iter_paragraphs, write_docx
+from src.utils.file_mover import DEFAULT_MOVE_WORKERS, move_many, move_path
+from src.utils.pptx_writer import write_pptx
+from src.utils.progress import run_with_progress
+from src.utils.ranged_reader import detect_encoding, is_text_file, read_range, read_sample
+from src.utils.row_reader import DEFAULT_CHUNK_SIZE, iter_row_chunks
+from src.utils.task_import import DEFAULT_IMPORT_BATCH_SIZE, import_tasks
+from src.utils.task_store import (
+    DEFAULT_QUERY_LIMIT,
+    TaskNotFoundError,
+    VersionConflictError,
+    convert_tasks,
+    open_task_store,
+    task_list_filename,
+)
+from src.utils.xlsx_writer import write_xlsx
+
+
+@contextlib.asynccontextmanager
+async def _server_lifespan(server: FastMCP):
+    """服务器启动时开始监视资源目录（HTTP传输下每个会话都会进入，已启动时不做任何事）"""
+    start_resource_watchers()
+    yield {}
+
 
 # 初始化MCP服务器
-mcp = FastMCP("OfficeTools")
+mcp = FastMCP("OfficeTools", lifespan=_server_lifespan)
 
 
 @mcp.prompt(name="office_assistant")
@@ -21,14 +56,17 @@ def office_assistant_prompt():
 
 
 @mcp.tool()
-def create_word_document(content: str, filename: str, save_path: str = "./") -> Dict[str, Any]:
+def create_word_document(content: str, filename: str, save_path: str = "./", source_path: Optional[str] = None) -> Dict[str, Any]:
     """
     创建Word文档
     
+    文档内容按段落流式写入 word/document.xml，内存占用不随文档大小增长
+    
     Args:
-        content: 文档内容
+        content: 文档内容，按换行符拆分为段落
         filename: 文件名（不含扩展名）
         save_path: 保存路径
+        source_path: 文本文件路径（可选，提供时逐行读取该文件作为段落，忽略content）
         
     Returns:
         操作结果
@@ -40,21 +78,23 @@ def create_word_document(content: str, filename: str, save_path: str = "./") ->
         # 创建文件路径
         file_path = os.path.join(save_path, f"{filename}.docx")
         
-        # 这里应该调用实际的Word操作库（如python-docx）
-        # 为简化示例，我们只是创建一个包含内容的JSON文件
-        doc_data = {
-            "content": content,
-            "created_at": "2025-04-05",
-            "format": "docx"
-        }
-        
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(doc_data, f, ensure_ascii=False, indent=2)
+        if source_path:
+            if not os.path.exists(source_path):
+                return {
+                    "success": False,
+                    "message": f"源文件不存在: {source_path}"
+                }
+            paragraphs = iter_file_paragraphs(source_path)
+        else:
+            paragraphs = iter_paragraphs(content)
+            
+        stats = write_docx(file_path, paragraphs, title=filename)
             
         return {
             "success": True,
             "message": f"Word文档已创建: {file_path}",
-            "file_path": file_path
+            "file_path": file_path,
+            "paragraphs": stats["paragraphs"]
         }
     except Exception as e:
         return {
@@ -64,14 +104,22 @@ def create_word_document(content: str, filename: str, save_path: str = "./") ->
 
 
 @mcp.tool()
-def create_excel_spreadsheet(data: List[List[Any]], filename: str, save_path: str = "./") -> Dict[str, Any]:
+def create_excel_spreadsheet(data: List[List[Any]], filename: str, save_path: str = "./",
+                             source_path: Optional[str] = None, sheet_name: str = "Sheet1",
+                             chunk_size: int = DEFAULT_CHUNK_SIZE, repeat_header: bool = False) -> Dict[str, Any]:
     """
     创建Excel电子表格
     
+    使用xlsxwriter的constant_memory模式逐行写入，超过单表行数上限时自动续写到新工作表
+    
     Args:
         data: 表格数据（二维列表）
         filename: 文件名（不含扩展名）
         save_path: 保存路径
+        source_path: NDJSON/CSV/TSV数据文件路径（可选，提供时按块读取该文件，忽略data；NDJSON对象以第一行的键作为表头）
+        sheet_name: 工作表名称
+        chunk_size: 从数据文件每次读取的行数
+        repeat_header: 是否在续写的工作表中重复第一行作为表头
         
     Returns:
         操作结果
@@ -83,21 +131,25 @@ def create_excel_spreadsheet(data: List[List[Any]], filename: str, save_path: st
         # 创建文件路径
         file_path = os.path.join(save_path, f"{filename}.xlsx")
         
-        # 这里应该调用实际的Excel操作库（如openpyxl）
-        # 为简化示例，我们只是创建一个包含数据的JSON文件
-        spreadsheet_data = {
-            "data": data,
-            "created_at": "2025-04-05",
-            "format": "xlsx"
-        }
-        
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(spreadsheet_data, f, ensure_ascii=False, indent=2)
+        if source_path:
+            if not os.path.exists(source_path):
+                return {
+                    "success": False,
+                    "message": f"数据文件不存在: {source_path}"
+                }
+            row_chunks = iter_row_chunks(source_path, chunk_size)
+        else:
+            row_chunks = [data]
+            
+        stats = write_xlsx(file_path, row_chunks, sheet_name=sheet_name,
+                           repeat_header=repeat_header, use_zip64=bool(source_path))
             
         return {
             "success": True,
             "message": f"Excel电子表格已创建: {file_path}",
-            "file_path": file_path
+            "file_path": file_path,
+            "rows": stats["rows"],
+            "sheets": stats["sheets"]
         }
     except Exception as e:
         return {
@@ -107,40 +159,42 @@ def create_excel_spreadsheet(data: List[List[Any]], filename: str, save_path: st
 
 
 @mcp.tool()
-def create_powerpoint_presentation(slides: List[Dict[str, Any]], filename: str, save_path: str = "./") -> Dict[str, Any]:
+def create_powerpoint_presentation(slides: List[Dict[str, Any]], filename: str, save_path: str = "./",
+                                   template_path: Optional[str] = None) -> Dict[str, Any]:
     """
     创建PowerPoint演示文稿
     
+    模板的母版、版式和主题解析后会被缓存，模板文件修改后自动重新解析
+    
     Args:
-        slides: 幻灯片数据列表，每个元素包含"title"和"content"键
+        slides: 幻灯片数据列表，每个元素包含"title"和"content"键，可选"layout"（版式名称）
         filename: 文件名（不含扩展名）
         save_path: 保存路径
+        template_path: 模板文件路径（.pptx/.potx，可选，默认使用内置模板）
         
     Returns:
         操作结果
     """
     try:
+        if template_path and not os.path.exists(template_path):
+            return {
+                "success": False,
+                "message": f"模板文件不存在: {template_path}"
+            }
+            
         # 确保保存路径存在
         Path(save_path).mkdir(parents=True, exist_ok=True)
         
         # 创建文件路径
         file_path = os.path.join(save_path, f"{filename}.pptx")
         
-        # 这里应该调用实际的PPT操作库（如python-pptx）
-        # 为简化示例，我们只是创建一个包含幻灯片数据的JSON文件
-        presentation_data = {
-            "slides": slides,
-            "created_at": "2025-04-05",
-            "format": "pptx"
-        }
-        
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(presentation_data, f, ensure_ascii=False, indent=2)
+        stats = write_pptx(file_path, slides, template_path=template_path)
             
         return {
             "success": True,
             "message": f"PowerPoint演示文稿已创建: {file_path}",
-            "file_path": file_path
+            "file_path": file_path,
+            "slides": stats["slides"]
         }
     except Exception as e:
         return {
@@ -149,13 +203,149 @@ def create_powerpoint_presentation(slides: List[Dict[str, Any]], filename: str,
         }
 
 
+# 批量生成支持的文档类型（含扩展名别名）及对应的工具
+DOCUMENT_BUILDERS = {
+    "word": create_word_document,
+    "docx": create_word_document,
+    "excel": create_excel_spreadsheet,
+    "xlsx": create_excel_spreadsheet,
+    "powerpoint": create_powerpoint_presentation,
+    "pptx": create_powerpoint_presentation,
+}
+
+
+def build_document(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """按文档规格调用对应的创建工具（在工作进程中执行）"""
+    if not isinstance(spec, dict):
+        return {
+            "success": False,
+            "message": "文档规格必须是对象"
+        }
+    params = dict(spec)
+    doc_type = str(params.pop("type", "")).lower()
+    builder = DOCUMENT_BUILDERS.get(doc_type)
+    if builder is None:
+        return {
+            "success": False,
+            "message": f"不支持的文档类型: {doc_type}，可选: word、excel、powerpoint"
+        }
+    try:
+        return builder(**params)
+    except TypeError as e:
+        return {
+            "success": False,
+            "message": f"文档参数错误: {str(e)}"
+        }
+
+
+def _create_documents(specs, save_path: str, total: int, max_workers: Optional[int], memory_budget: int,
+                      progress=None) -> Dict[str, Any]:
+    """在进程池中生成一批文档，每完成一个报告一次进度"""
+    def with_defaults():
+        for spec in specs:
+            yield {"save_path": save_path, **spec} if isinstance(spec, dict) else spec
+            
+    start = time.perf_counter()
+    files, failures = [], []
+    for done, (index, spec, result) in enumerate(run_batch(build_document, with_defaults(), max_workers,
+                                                           memory_budget), 1):
+        if isinstance(result, Exception):
+            result = {"success": False, "message": str(result)}
+        name = spec.get("filename") if isinstance(spec, dict) else None
+        if result.get("success"):
+            files.append((index, result["file_path"]))
+        else:
+            failures.append({"index": index, "filename": name, "message": result["message"]})
+        if progress is not None:
+            progress(done, total, f"{name or index}: {'已生成' if result.get('success') else '失败'}")
+            
+    elapsed = time.perf_counter() - start
+    return {
+        "files": [path for _, path in sorted(files)],
+        "failures": sorted(failures, key=lambda failure: failure["index"]),
+        "elapsed_seconds": round(elapsed, 3),
+        "documents_per_second": round(total / elapsed, 1) if elapsed > 0 else None
+    }
+
+
+@mcp.tool()
+async def create_documents_batch(documents: Optional[List[Dict[str, Any]]] = None,
+                                 manifest_path: Optional[str] = None, save_path: str = "./",
+                                 max_workers: Optional[int] = None,
+                                 max_memory_mb: int = DEFAULT_MEMORY_BUDGET // (1024 * 1024),
+                                 ctx: Optional[Context] = None) -> Dict[str, Any]:
+    """
+    批量创建Word、Excel和PowerPoint文档
+    
+    文档在常驻进程池中并行生成，每完成一个文档发送一次进度通知；
+    同时处理的文档数不超过 max_workers 的两倍，且在途文档参数的总大小不超过 max_memory_mb
+    
+    Args:
+        documents: 文档规格列表，每个规格包含"type"("word"、"excel"或"powerpoint")和对应创建工具的参数，
+                   如 {"type": "word", "filename": "报告", "content": "..."}
+        manifest_path: NDJSON清单文件路径（可选，每行一个文档规格，提供时忽略documents）
+        save_path: 规格中没有指定 save_path 时使用的保存路径
+        max_workers: 最大并行进程数（可选，默认为CPU核数，1表示在当前进程中依次生成）
+        max_memory_mb: 在途文档参数的内存预算（MB），默认256
+        
+    Returns:
+        汇总结果，包含生成的文件列表和失败的文档
+    """
+    try:
+        if manifest_path:
+            if not os.path.exists(manifest_path):
+                return {
+                    "success": False,
+                    "message": f"清单文件不存在: {manifest_path}"
+                }
+            specs = iter_manifest(manifest_path)
+            total = count_manifest(manifest_path)
+        else:
+            specs = documents or []
+            total = len(specs)
+            
+        report = await run_with_progress(_create_documents, ctx, specs, save_path, total, max_workers,
+                                         max(1, max_memory_mb) * 1024 * 1024)
+            
+        return {
+            "success": not report["failures"],
+            "message": f"已生成 {len(report['files'])}/{total} 个文档",
+            "total": total,
+            "succeeded": len(report["files"]),
+            "failed": len(report["failures"]),
+            "files": report["files"],
+            "failures": report["failures"],
+            "elapsed_seconds": report["elapsed_seconds"],
+            "documents_per_second": report["documents_per_second"]
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"批量创建文档失败: {str(e)}"
+        }
+
+
 @mcp.tool()
-def list_files_in_directory(directory: str = "./") -> Dict[str, Any]:
+def list_files_in_directory(directory: str = "./", recursive: bool = False, max_depth: Optional[int] = None,
+                            include: Optional[List[str]] = None, exclude: Optional[List[str]] = None,
+                            sort_by: str = "name", limit: int = DEFAULT_PAGE_SIZE,
+                            cursor: Optional[str] = None) -> Dict[str, Any]:
     """
     列出目录中的文件
     
+    结果分页返回，将 next_cursor 传入下一次调用的 cursor 参数获取下一页。
+    按名称排序时每页都会重新遍历目录树；按大小或修改时间排序时第一页需要读取
+    所有条目的文件信息，之后一分钟内的翻页使用第一页排好序的结果
+    
     Args:
         directory: 目录路径
+        recursive: 是否递归列出子目录
+        max_depth: 最大递归深度（可选，0表示只列出当前目录）
+        include: 包含的glob模式列表，如 ["*.docx", "*.xlsx"]
+        exclude: 排除的glob模式列表，被排除的目录不会继续深入
+        sort_by: 排序字段（"name"、"size"、"modified"，前缀"-"表示降序）
+        limit: 每页条目数
+        cursor: 分页游标（上一页返回的 next_cursor）
         
     Returns:
         文件列表
@@ -168,19 +358,15 @@ def list_files_in_directory(directory: str = "./") -> Dict[str, Any]:
                 "message": f"目录不存在: {directory}"
             }
             
-        files = []
-        for item in path.iterdir():
-            files.append({
-                "name": item.name,
-                "is_file": item.is_file(),
-                "size": item.stat().st_size if item.is_file() else None,
-                "modified": item.stat().st_mtime
-            })
+        page = list_directory(directory, recursive=recursive, max_depth=max_depth,
+                              include=include, exclude=exclude, sort_by=sort_by,
+                              limit=limit, cursor=cursor)
             
         return {
             "success": True,
-            "files": files,
-            "count": len(files)
+            "files": page["files"],
+            "count": len(page["files"]),
+            "next_cursor": page["next_cursor"]
         }
     except Exception as e:
         return {
@@ -190,12 +376,19 @@ def list_files_in_directory(directory: str = "./") -> Dict[str, Any]:
 
 
 @mcp.tool()
-def read_file_content(file_path: str) -> Dict[str, Any]:
+def read_file_content(file_path: str, offset: Optional[int] = None, length: Optional[int] = None,
+                      line_start: Optional[int] = None, line_count: Optional[int] = None) -> Dict[str, Any]:
     """
     读取文件内容
     
+    指定字节区间或行区间时通过内存映射只读取所需部分，适合分页浏览大文件
+    
     Args:
         file_path: 文件路径
+        offset: 起始字节偏移（可选）
+        length: 读取的字节数（可选，默认65536）
+        line_start: 起始行号（可选，从1开始）
+        line_count: 读取的行数（可选，默认100）
         
     Returns:
         文件内容
@@ -207,12 +400,21 @@ def read_file_content(file_path: str) -> Dict[str, Any]:
                 "message": f"文件不存在: {file_path}"
             }
             
-        # 获取文件扩展名
-        _, ext = os.path.splitext(file_path)
-        
+        # 区间读取
+        if any(value is not None for value in (offset, length, line_start, line_count)):
+            result = read_range(file_path, offset=offset, length=length,
+                                line_start=line_start, line_count=line_count)
+            return {
+                "success": True,
+                "file_path": file_path,
+                **result
+            }
+            
         # 根据文件类型读取内容
-        if ext.lower() in ['.txt', '.md', '.py', '.json']:
-            with open(file_path, 'r', encoding='utf-8') as f:
+        sample = read_sample(file_path)
+        if is_text_file(file_path, sample):
+            encoding = detect_encoding(sample)
+            with open(file_path, 'r', encoding=encoding, errors='replace') as f:
                 content = f.read()
         else:
             # 对于二进制文件，返回基本信息
@@ -236,6 +438,8 @@ def move_file(source_path: str, destination_path: str) -> Dict[str, Any]:
     """
     移动文件
     
+    跨文件系统时使用零拷贝复制，落盘后删除源文件
+    
     Args:
         source_path: 源文件路径
         destination_path: 目标文件路径
@@ -250,11 +454,13 @@ def move_file(source_path: str, destination_path: str) -> Dict[str, Any]:
             Path(dest_dir).mkdir(parents=True, exist_ok=True)
             
         # 移动文件
-        os.rename(source_path, destination_path)
+        info = move_path(source_path, destination_path)
         
         return {
             "success": True,
-            "message": f"文件已移动: {source_path} -> {destination_path}"
+            "message": f"文件已移动: {source_path} -> {destination_path}",
+            "bytes": info["bytes"],
+            "method": info["method"]
         }
     except Exception as e:
         return {
@@ -263,6 +469,33 @@ def move_file(source_path: str, destination_path: str) -> Dict[str, Any]:
         }
 
 
+@mcp.tool()
+def move_files(moves: List[Dict[str, str]], max_workers: int = DEFAULT_MOVE_WORKERS) -> Dict[str, Any]:
+    """
+    批量移动文件
+    
+    Args:
+        moves: 移动任务列表，每项包含"source_path"(源文件路径)和"destination_path"(目标文件路径)
+        max_workers: 最大并发数
+        
+    Returns:
+        逐项结果及总吞吐量
+    """
+    try:
+        report = move_many(moves, max_workers=max_workers)
+        
+        return {
+            "success": report["failed"] == 0,
+            "message": f"已移动 {report['succeeded']} 个文件，失败 {report['failed']} 个",
+            **report
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"批量移动文件失败: {str(e)}"
+        }
+
+
 @mcp.tool()
 def delete_file(file_path: str) -> Dict[str, Any]:
     """
@@ -295,34 +528,37 @@ def delete_file(file_path: str) -> Dict[str, Any]:
 
 
 @mcp.tool()
-def compress_files(file_paths: List[str], zip_path: str) -> Dict[str, Any]:
+def compress_files(file_paths: List[str], zip_path: str, compression_level: int = 6,
+                   max_workers: Optional[int] = None) -> Dict[str, Any]:
     """
     压缩文件
     
+    各文件在多个进程中并行压缩，图片、PDF、Office文档、压缩包等已压缩的格式直接存储
+    
     Args:
-        file_paths: 要压缩的文件路径列表
+        file_paths: 要压缩的文件或目录路径列表
         zip_path: 压缩文件保存路径
+        compression_level: 压缩级别（0-9）
+        max_workers: 最大并行进程数（可选，默认为CPU核数）
         
     Returns:
         操作结果
     """
     try:
-        import zipfile
-        
         # 确保保存目录存在
         Path(os.path.dirname(zip_path)).mkdir(parents=True, exist_ok=True)
         
         # 创建压缩文件
-        with zipfile.ZipFile(zip_path, 'w') as zipf:
-            for file_path in file_paths:
-                if os.path.exists(file_path):
-                    # 添加文件到压缩包
-                    zipf.write(file_path, os.path.basename(file_path))
+        members = collect_members(file_paths, skip_missing=True)
+        stats = build_zip(zip_path, members, level=compression_level, max_workers=max_workers)
                     
         return {
             "success": True,
             "message": f"文件已压缩: {zip_path}",
-            "zip_path": zip_path
+            "zip_path": zip_path,
+            "files": stats["files"],
+            "total_size": stats["total_size"],
+            "compressed_size": stats["compressed_size"]
         }
     except Exception as e:
         return {
@@ -332,36 +568,42 @@ def compress_files(file_paths: List[str], zip_path: str) -> Dict[str, Any]:
 
 
 @mcp.tool()
-def extract_archive(archive_path: str, extract_to: str = "./") -> Dict[str, Any]:
+async def extract_archive(archive_path: str, extract_to: str = "./", include: Optional[List[str]] = None,
+                          exclude: Optional[List[str]] = None, max_workers: Optional[int] = None,
+                          ctx: Optional[Context] = None) -> Dict[str, Any]:
     """
     解压缩文件
     
+    成员分批在多个进程中并行解压，解压过程中发送进度通知
+    
     Args:
         archive_path: 压缩文件路径
         extract_to: 解压目录
+        include: 只解压匹配的成员（glob模式列表，如 ["*.csv", "data/*"]）
+        exclude: 跳过匹配的成员（glob模式列表）
+        max_workers: 最大并行进程数（可选，默认为CPU核数）
         
     Returns:
         操作结果
     """
     try:
-        import zipfile
-        
         if not os.path.exists(archive_path):
             return {
                 "success": False,
                 "message": f"压缩文件不存在: {archive_path}"
             }
             
-        # 确保解压目录存在
-        Path(extract_to).mkdir(parents=True, exist_ok=True)
-        
         # 解压缩
-        with zipfile.ZipFile(archive_path, 'r') as zipf:
-            zipf.extractall(extract_to)
+        stats = await run_with_progress(extract_zip, ctx, archive_path, extract_to, include=include,
+                                        exclude=exclude, max_workers=max_workers)
             
         return {
             "success": True,
-            "message": f"文件已解压到: {extract_to}"
+            "message": f"文件已解压到: {extract_to}",
+            "files": stats["files"],
+            "skipped": stats["skipped"],
+            "total_size": stats["total_size"],
+            "elapsed_seconds": stats["elapsed_seconds"]
         }
     except Exception as e:
         return {
@@ -371,14 +613,17 @@ def extract_archive(archive_path: str, extract_to: str = "./") -> Dict[str, Any]
 
 
 @mcp.tool()
-def create_task_list(tasks: List[Dict[str, Any]], filename: str, save_path: str = "./") -> Dict[str, Any]:
+def create_task_list(tasks: List[Dict[str, Any]], filename: str, save_path: str = "./",
+                     backend: Optional[str] = None) -> Dict[str, Any]:
     """
     创建日常任务列表
     
     Args:
         tasks: 任务列表，每个任务包含"title"(标题), "description"(描述), "priority"(优先级), "due_date"(截止日期)等字段
-        filename: 文件名（不含扩展名）
+        filename: 文件名，不含扩展名时按后端添加；以.json或.db结尾时按扩展名选择后端
         save_path: 保存路径
+        backend: 存储后端，"json"（保存为.json文件）或 "sqlite"（保存为.db文件，适合大量任务）；
+            为None时按文件名的扩展名判断，没有扩展名时默认为 "json"
         
     Returns:
         操作结果
@@ -388,24 +633,19 @@ def create_task_list(tasks: List[Dict[str, Any]], filename: str, save_path: str
         Path(save_path).mkdir(parents=True, exist_ok=True)
         
         # 创建文件路径
-        file_path = os.path.join(save_path, f"{filename}.json")
-        
-        # 准备任务列表数据
-        task_list_data = {
-            "tasks": tasks,
-            "created_at": "2025-04-05",
-            "total_tasks": len(tasks),
-            "pending_tasks": len([task for task in tasks if task.get("status", "pending") == "pending"])
-        }
+        file_path = os.path.join(save_path, task_list_filename(filename, backend))
         
-        # 保存到JSON文件
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(task_list_data, f, ensure_ascii=False, indent=2)
+        # 保存任务列表
+        with open_task_store(file_path, backend) as store:
+            total_tasks = store.create(tasks)
+            version = store.last_version
             
         return {
             "success": True,
             "message": f"任务列表已创建: {file_path}",
-            "file_path": file_path
+            "file_path": file_path,
+            "total_tasks": total_tasks,
+            "version": version
         }
     except Exception as e:
         return {
@@ -415,13 +655,18 @@ def create_task_list(tasks: List[Dict[str, Any]], filename: str, save_path: str
 
 
 @mcp.tool()
-def add_task_to_list(task_list_path: str, new_task: Dict[str, Any]) -> Dict[str, Any]:
+def add_task_to_list(task_list_path: str, new_task: Dict[str, Any],
+                     expected_version: Optional[int] = None) -> Dict[str, Any]:
     """
     向现有任务列表添加新任务
     
+    多个进程可以同时写入同一个任务列表；传入 expected_version 时，
+    只有任务列表仍是该版本才写入，否则返回冲突和当前版本
+    
     Args:
         task_list_path: 任务列表文件路径
         new_task: 新任务信息，包含"title", "description", "priority", "due_date"等字段
+        expected_version: 期望的任务列表版本（可选，来自上一次调用返回的 version）
         
     Returns:
         操作结果
@@ -434,23 +679,24 @@ def add_task_to_list(task_list_path: str, new_task: Dict[str, Any]) -> Dict[str,
                 "message": f"任务列表文件不存在: {task_list_path}"
             }
             
-        # 读取现有任务列表
-        with open(task_list_path, "r", encoding="utf-8") as f:
-            task_list_data = json.load(f)
-            
         # 添加新任务
-        task_list_data["tasks"].append(new_task)
-        task_list_data["total_tasks"] = len(task_list_data["tasks"])
-        task_list_data["pending_tasks"] = len([task for task in task_list_data["tasks"] if task.get("status", "pending") == "pending"])
-        
-        # 更新文件
-        with open(task_list_path, "w", encoding="utf-8") as f:
-            json.dump(task_list_data, f, ensure_ascii=False, indent=2)
+        with open_task_store(task_list_path) as store:
+            task_id = store.add(new_task, expected_version=expected_version)
+            total_tasks = store.count()
+            version = store.last_version
             
         return {
             "success": True,
             "message": f"新任务已添加到: {task_list_path}",
-            "total_tasks": task_list_data["total_tasks"]
+            "task_id": task_id,
+            "total_tasks": total_tasks,
+            "version": version
+        }
+    except VersionConflictError as e:
+        return {
+            "success": False,
+            "message": str(e),
+            "version": e.current
         }
     except Exception as e:
         return {
@@ -459,11 +705,114 @@ def add_task_to_list(task_list_path: str, new_task: Dict[str, Any]) -> Dict[str,
         }
 
 
+@mcp.tool()
+def update_task(task_list_path: str, task_id: int, updates: Dict[str, Any],
+                expected_version: Optional[int] = None) -> Dict[str, Any]:
+    """
+    修改任务列表中的任务
+    
+    Args:
+        task_list_path: 任务列表文件路径
+        task_id: 任务ID
+        updates: 要修改的字段，如 {"status": "completed"}
+        expected_version: 期望的任务列表版本（可选），不一致时不修改并返回当前版本
+        
+    Returns:
+        操作结果
+    """
+    try:
+        # 检查文件是否存在
+        if not os.path.exists(task_list_path):
+            return {
+                "success": False,
+                "message": f"任务列表文件不存在: {task_list_path}"
+            }
+            
+        with open_task_store(task_list_path) as store:
+            task = store.update(task_id, updates, expected_version=expected_version)
+            version = store.last_version
+            
+        return {
+            "success": True,
+            "message": f"任务已更新: {task_id}",
+            "task": task,
+            "version": version
+        }
+    except TaskNotFoundError as e:
+        return {
+            "success": False,
+            "message": str(e)
+        }
+    except VersionConflictError as e:
+        return {
+            "success": False,
+            "message": str(e),
+            "version": e.current
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"更新任务失败: {str(e)}"
+        }
+
+
+@mcp.tool()
+def delete_task(task_list_path: str, task_id: int, expected_version: Optional[int] = None) -> Dict[str, Any]:
+    """
+    从任务列表中删除任务
+    
+    Args:
+        task_list_path: 任务列表文件路径
+        task_id: 任务ID
+        expected_version: 期望的任务列表版本（可选），不一致时不删除并返回当前版本
+        
+    Returns:
+        操作结果
+    """
+    try:
+        # 检查文件是否存在
+        if not os.path.exists(task_list_path):
+            return {
+                "success": False,
+                "message": f"任务列表文件不存在: {task_list_path}"
+            }
+            
+        with open_task_store(task_list_path) as store:
+            store.delete(task_id, expected_version=expected_version)
+            total_tasks = store.count()
+            version = store.last_version
+            
+        return {
+            "success": True,
+            "message": f"任务已删除: {task_id}",
+            "total_tasks": total_tasks,
+            "version": version
+        }
+    except TaskNotFoundError as e:
+        return {
+            "success": False,
+            "message": str(e)
+        }
+    except VersionConflictError as e:
+        return {
+            "success": False,
+            "message": str(e),
+            "version": e.current
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"删除任务失败: {str(e)}"
+        }
+
+
 @mcp.tool()
 def get_task_list_summary(task_list_path: str) -> Dict[str, Any]:
     """
     获取任务列表摘要信息
     
+    摘要由每次修改时增量维护的聚合计数生成，不扫描任务
+    
     Args:
         task_list_path: 任务列表文件路径
         
@@ -478,60 +827,303 @@ def get_task_list_summary(task_list_path: str) -> Dict[str, Any]:
                 "message": f"任务列表文件不存在: {task_list_path}"
             }
             
-        # 读取任务列表
-        with open(task_list_path, "r", encoding="utf-8") as f:
-            task_list_data = json.load(f)
+        with open_task_store(task_list_path) as store:
+            summary = store.summary()
+            
+        return {
+            "success": True,
+            "summary": summary
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"获取任务列表摘要失败: {str(e)}"
+        }
+
+
+@mcp.tool()
+def query_tasks(task_list_path: str, status: Optional[List[str]] = None, priority: Optional[List[str]] = None,
+                due_from: Optional[str] = None, due_to: Optional[str] = None, sort_by: str = "due_date",
+                limit: int = DEFAULT_QUERY_LIMIT, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    按条件查询任务列表中的任务
+    
+    通过索引筛选和排序，只返回一页结果；按截止日期升序时没有截止日期的任务排在最后
+    
+    Args:
+        task_list_path: 任务列表文件路径
+        status: 状态列表（任一匹配），如 ["pending", "in_progress"]
+        priority: 优先级列表（任一匹配），如 ["high"]
+        due_from: 截止日期下限（含），如 "2025-04-01"
+        due_to: 截止日期上限（含）
+        sort_by: 排序字段 "due_date"（默认）、"priority" 或 "id"，前缀"-"表示降序
+        limit: 每页最大任务数，默认100
+        cursor: 分页游标（上一次调用返回的 next_cursor）
+        
+    Returns:
+        查询结果，包含任务列表和下一页游标
+    """
+    try:
+        # 检查文件是否存在
+        if not os.path.exists(task_list_path):
+            return {
+                "success": False,
+                "message": f"任务列表文件不存在: {task_list_path}"
+            }
+            
+        with open_task_store(task_list_path) as store:
+            result = store.query(status=status, priority=priority, due_from=due_from, due_to=due_to,
+                                 sort_by=sort_by, limit=limit, cursor=cursor)
             
-        # 统计信息
-        tasks = task_list_data.get("tasks", [])
-        total_tasks = len(tasks)
+        return {
+            "success": True,
+            "tasks": result["tasks"],
+            "count": len(result["tasks"]),
+            "next_cursor": result["next_cursor"]
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"查询任务失败: {str(e)}"
+        }
+
+
+@mcp.tool()
+def convert_task_list(source_path: str, destination_path: str) -> Dict[str, Any]:
+    """
+    在不同存储格式之间转换任务列表
+    
+    根据扩展名判断格式，可用于把原有的JSON任务列表导入SQLite（.db），或把SQLite任务列表导出为JSON
+    
+    Args:
+        source_path: 源任务列表文件路径
+        destination_path: 目标文件路径（已存在时覆盖）
         
-        # 按优先级统计
-        priority_counts = {}
-        for task in tasks:
-            priority = task.get("priority", "medium")
-            priority_counts[priority] = priority_counts.get(priority, 0) + 1
+    Returns:
+        操作结果
+    """
+    try:
+        # 检查文件是否存在
+        if not os.path.exists(source_path):
+            return {
+                "success": False,
+                "message": f"任务列表文件不存在: {source_path}"
+            }
             
-        # 按状态统计
-        status_counts = {}
-        for task in tasks:
-            status = task.get("status", "pending")
-            status_counts[status] = status_counts.get(status, 0) + 1
+        # 确保目标目录存在
+        dest_dir = os.path.dirname(destination_path)
+        if dest_dir:
+            Path(dest_dir).mkdir(parents=True, exist_ok=True)
+            
+        with open_task_store(source_path) as source, open_task_store(destination_path) as destination:
+            total_tasks = convert_tasks(source, destination)
             
         return {
             "success": True,
-            "summary": {
-                "total_tasks": total_tasks,
-                "pending_tasks": status_counts.get("pending", 0),
-                "completed_tasks": status_counts.get("completed", 0),
-                "priority_distribution": priority_counts,
-                "created_at": task_list_data.get("created_at")
+            "message": f"任务列表已转换: {source_path} -> {destination_path}",
+            "file_path": destination_path,
+            "total_tasks": total_tasks
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"转换任务列表失败: {str(e)}"
+        }
+
+
+@mcp.tool()
+async def bulk_import_tasks(task_list_path: str, source_path: str, source_format: Optional[str] = None,
+                            batch_size: int = DEFAULT_IMPORT_BATCH_SIZE, ctx: Optional[Context] = None) -> Dict[str, Any]:
+    """
+    从CSV或NDJSON文件批量导入任务
+    
+    流式读取数据文件，逐行校验并规范化，合格的任务按批写入任务列表，不合格的行跳过并计数；
+    导入过程中发送进度通知。任务列表不存在时按扩展名新建
+    
+    Args:
+        task_list_path: 任务列表文件路径（.db 或 .json）
+        source_path: 数据文件路径（.csv、.tsv、.ndjson 或 .jsonl），CSV第一行为表头
+        source_format: 数据文件格式（可选，"csv"、"tsv" 或 "ndjson"，默认按扩展名判断）
+        batch_size: 每个事务写入的任务数，默认10000
+        
+    Returns:
+        导入结果，包含导入数、被拒绝的行数及原因、每秒处理行数
+    """
+    try:
+        # 检查文件是否存在
+        if not os.path.exists(source_path):
+            return {
+                "success": False,
+                "message": f"数据文件不存在: {source_path}"
             }
+            
+        # 确保任务列表所在目录存在
+        list_dir = os.path.dirname(task_list_path)
+        if list_dir:
+            Path(list_dir).mkdir(parents=True, exist_ok=True)
+            
+        # 在工作线程中打开任务列表并导入（SQLite连接不能跨线程使用）
+        stats = await run_with_progress(import_tasks, ctx, task_list_path, source_path, fmt=source_format,
+                                        batch_size=batch_size)
+            
+        return {
+            "success": True,
+            "message": f"已导入 {stats['imported']} 个任务到: {task_list_path}",
+            "imported": stats["imported"],
+            "rejected": stats["rejected"],
+            "rejected_rows": stats["rejected_rows"],
+            "total_tasks": stats["total_tasks"],
+            "elapsed_seconds": stats["elapsed_seconds"],
+            "rows_per_second": stats["rows_per_second"]
         }
     except Exception as e:
         return {
             "success": False,
-            "message": f"获取任务列表摘要失败: {str(e)}"
+            "message": f"批量导入任务失败: {str(e)}"
         }
 
 
 # 资源定义
-@mcp.resource("file://documents")
-def documents() -> List[str]:
-    """列出文档目录中的文件"""
-    docs_dir = Path.home() / "Documents"
-    if docs_dir.exists():
-        return [str(f) for f in docs_dir.iterdir() if f.is_file()]
-    return []
-
-
-@mcp.resource("file://desktop")
-def desktop() -> List[str]:
-    """列出桌面目录中的文件"""
-    desktop_dir = Path.home() / "Desktop"
-    if desktop_dir.exists():
-        return [str(f) for f in desktop_dir.iterdir() if f.is_file()]
-    return []
+# 资源URI -> 提供资源内容的目录，服务器启动时（或首次读取、订阅时）创建目录快照
+RESOURCE_DIRECTORIES = {
+    "file://documents": str(Path.home() / "Documents"),
+    "file://desktop": str(Path.home() / "Desktop"),
+}
+
+# 支持在底层服务器上注册资源订阅处理函数的 mcp 版本范围 [最低, 最高)
+MCP_SUBSCRIBE_VERSIONS = ((1, 0), (2, 0))
+
+# 资源URI对应的目录快照，由后台监视线程增量更新，读取资源时只查表返回缓存的结果
+_resource_snapshots: Dict[str, DirectorySnapshot] = {}
+
+# 订阅了资源变化的会话：资源URI -> {会话: 会话所在的事件循环}
+# 由事件循环（订阅、取消订阅）和监视线程（通知失败时移除）同时修改，读写都在 _resource_lock 内
+_resource_subscribers: Dict[str, Dict[Any, asyncio.AbstractEventLoop]] = {}
+_resource_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=64)
+def _resource_key(uri: str) -> str:
+    """规范化资源URI（如 file://documents 规范化为 file://documents/），与客户端订阅时使用的URI一致"""
+    return str(AnyUrl(uri))
+
+
+def _notify_resource_updated(uri: str):
+    """向订阅了资源的会话发送 resources/updated 通知（在监视线程中调用）"""
+    with _resource_lock:
+        subscribers = list(_resource_subscribers.get(uri, {}).items())
+    for session, loop in subscribers:
+        try:
+            future = asyncio.run_coroutine_threadsafe(session.send_resource_updated(uri), loop)
+        except RuntimeError:
+            # 事件循环已关闭，会话已经结束
+            _remove_subscriber(uri, session)
+            continue
+        future.add_done_callback(functools.partial(_drop_failed_subscriber, uri, session))
+
+
+def _remove_subscriber(uri: str, session: Any):
+    with _resource_lock:
+        _resource_subscribers.get(uri, {}).pop(session, None)
+
+
+def _drop_failed_subscriber(uri: str, session: Any, future):
+    if future.cancelled() or future.exception() is not None:
+        _remove_subscriber(uri, session)
+
+
+def watch_resource(uri: str, path: str, **kwargs) -> DirectorySnapshot:
+    """
+    以目录快照提供资源内容
+    
+    Args:
+        uri: 资源URI
+        path: 目录路径
+        **kwargs: 传给 DirectorySnapshot 的参数（如 poll_interval）
+        
+    Returns:
+        目录快照
+    """
+    uri = _resource_key(uri)
+    snapshot = DirectorySnapshot(path, **kwargs)
+    snapshot.add_listener(functools.partial(_notify_resource_updated, uri))
+    with _resource_lock:
+        _resource_snapshots[uri] = snapshot
+    return snapshot
+
+
+def _resource_snapshot(uri: str) -> Optional[DirectorySnapshot]:
+    """资源URI对应的目录快照，RESOURCE_DIRECTORIES 中的资源尚未创建快照时创建"""
+    uri = _resource_key(uri)
+    with _resource_lock:
+        snapshot = _resource_snapshots.get(uri)
+    if snapshot is not None:
+        return snapshot
+    for name, path in RESOURCE_DIRECTORIES.items():
+        if _resource_key(name) == uri:
+            with _resource_lock:
+                if uri in _resource_snapshots:
+                    return _resource_snapshots[uri]
+            return watch_resource(name, path)
+    return None
+
+
+def start_resource_watchers():
+    """为 RESOURCE_DIRECTORIES 中的资源创建目录快照并开始监视"""
+    for uri in RESOURCE_DIRECTORIES:
+        _resource_snapshot(uri).start()
+
+
+async def subscribe_resource(uri) -> None:
+    """客户端订阅资源变化，目录中的文件增删时发送 resources/updated 通知"""
+    uri = _resource_key(str(uri))
+    snapshot = _resource_snapshot(uri)
+    if snapshot is not None:
+        snapshot.start()
+    session = mcp.get_context().session
+    loop = asyncio.get_running_loop()
+    with _resource_lock:
+        _resource_subscribers.setdefault(uri, {})[session] = loop
+
+
+async def unsubscribe_resource(uri) -> None:
+    """客户端取消订阅资源变化"""
+    _remove_subscriber(_resource_key(str(uri)), mcp.get_context().session)
+
+
+def _register_subscription_handlers(server: FastMCP) -> bool:
+    """
+    注册资源订阅的处理函数，返回是否注册成功
+
+    FastMCP 没有提供资源订阅的接口，只能在其私有的底层服务器（_mcp_server）上注册；
+    私有属性可能随版本变化，只在 MCP_SUBSCRIBE_VERSIONS 范围内的版本上注册，其他版本资源仍可读取但不支持订阅
+    """
+    try:
+        version = tuple(int(part) for part in importlib.metadata.version("mcp").split(".")[:2])
+    except (importlib.metadata.PackageNotFoundError, ValueError):
+        return False
+    lowlevel = getattr(server, "_mcp_server", None)
+    low, high = MCP_SUBSCRIBE_VERSIONS
+    if not low <= version < high or not hasattr(lowlevel, "subscribe_resource"):
+        return False
+    lowlevel.subscribe_resource()(subscribe_resource)
+    lowlevel.unsubscribe_resource()(unsubscribe_resource)
+    return True
+
+
+_register_subscription_handlers(mcp)
+
+
+@mcp.resource("file://documents", mime_type="application/json")
+def documents() -> str:
+    """列出文档目录中的文件（JSON数组）"""
+    return _resource_snapshot("file://documents").text()
+
+
+@mcp.resource("file://desktop", mime_type="application/json")
+def desktop() -> str:
+    """列出桌面目录中的文件（JSON数组）"""
+    return _resource_snapshot("file://desktop").text()
 
 
 if __name__ == "__main__":
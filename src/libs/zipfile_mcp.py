@@ -4,23 +4,37 @@ zipfile库的MCP服务器配置
 """
 
 import os
+import sys
 import zipfile
 from pathlib import Path
-from typing import List, Dict, Any
-from mcp.server.fastmcp import FastMCP
+from typing import List, Dict, Any, Optional
+from mcp.server.fastmcp import Context, FastMCP
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.utils.archive import build_zip, collect_members, extract_zip
+from src.utils.progress import run_with_progress
 
 # 初始化MCP服务器
 mcp = FastMCP("ZipFileTools")
 
 
 @mcp.tool()
-def create_zip_archive(file_paths: List[str], zip_path: str) -> Dict[str, Any]:
+def create_zip_archive(file_paths: List[str], zip_path: str, compression_level: int = 6,
+                       max_workers: Optional[int] = None) -> Dict[str, Any]:
     """
     创建ZIP压缩文件
     
+    各文件在多个进程中并行压缩，已压缩的格式直接存储
+    
     Args:
-        file_paths: 要压缩的文件路径列表
+        file_paths: 要压缩的文件或目录路径列表
         zip_path: 压缩文件保存路径
+        compression_level: 压缩级别（0-9）
+        max_workers: 最大并行进程数（可选，默认为CPU核数）
         
     Returns:
         操作结果
@@ -29,23 +43,24 @@ def create_zip_archive(file_paths: List[str], zip_path: str) -> Dict[str, Any]:
         # 确保保存目录存在
         Path(os.path.dirname(zip_path)).mkdir(parents=True, exist_ok=True)
         
+        try:
+            members = collect_members(file_paths, skip_missing=False)
+        except FileNotFoundError as e:
+            return {
+                "success": False,
+                "message": str(e)
+            }
+            
         # 创建压缩文件
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for file_path in file_paths:
-                if os.path.exists(file_path):
-                    # 添加文件到压缩包
-                    arcname = os.path.basename(file_path)
-                    zipf.write(file_path, arcname)
-                else:
-                    return {
-                        "success": False,
-                        "message": f"文件不存在: {file_path}"
-                    }
+        stats = build_zip(zip_path, members, level=compression_level, max_workers=max_workers)
                     
         return {
             "success": True,
             "message": f"ZIP压缩文件已创建: {zip_path}",
-            "zip_path": zip_path
+            "zip_path": zip_path,
+            "files": stats["files"],
+            "total_size": stats["total_size"],
+            "compressed_size": stats["compressed_size"]
         }
     except Exception as e:
         return {
@@ -55,13 +70,20 @@ def create_zip_archive(file_paths: List[str], zip_path: str) -> Dict[str, Any]:
 
 
 @mcp.tool()
-def extract_zip_archive(zip_path: str, extract_to: str = "./") -> Dict[str, Any]:
+async def extract_zip_archive(zip_path: str, extract_to: str = "./", include: Optional[List[str]] = None,
+                              exclude: Optional[List[str]] = None, max_workers: Optional[int] = None,
+                              ctx: Optional[Context] = None) -> Dict[str, Any]:
     """
     解压ZIP文件
     
+    成员分批在多个进程中并行解压，解压过程中发送进度通知
+    
     Args:
         zip_path: ZIP文件路径
         extract_to: 解压目录
+        include: 只解压匹配的成员（glob模式列表，如 ["*.csv", "data/*"]）
+        exclude: 跳过匹配的成员（glob模式列表）
+        max_workers: 最大并行进程数（可选，默认为CPU核数）
         
     Returns:
         操作结果
@@ -73,16 +95,17 @@ def extract_zip_archive(zip_path: str, extract_to: str = "./") -> Dict[str, Any]
                 "message": f"ZIP文件不存在: {zip_path}"
             }
             
-        # 确保解压目录存在
-        Path(extract_to).mkdir(parents=True, exist_ok=True)
-        
         # 解压缩
-        with zipfile.ZipFile(zip_path, 'r') as zipf:
-            zipf.extractall(extract_to)
+        stats = await run_with_progress(extract_zip, ctx, zip_path, extract_to, include=include,
+                                        exclude=exclude, max_workers=max_workers)
             
         return {
             "success": True,
-            "message": f"ZIP文件已解压到: {extract_to}"
+            "message": f"ZIP文件已解压到: {extract_to}",
+            "files": stats["files"],
+            "skipped": stats["skipped"],
+            "total_size": stats["total_size"],
+            "elapsed_seconds": stats["elapsed_seconds"]
         }
     except Exception as e:
         return {
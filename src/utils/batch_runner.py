@@ -0,0 +1,142 @@
+"""
+批量作业模块
+把一批相互独立的作业分发到常驻进程池，按并发数和在途内存预算限流，按完成顺序逐个返回结果
+"""
+
+import json
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from src.utils.worker_pool import default_workers, discard_process_pool, get_process_pool
+
+# 默认的在途内存预算：已提交但未完成的作业参数总大小上限
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+
+# 每个工作进程最多排队的作业数，避免一次性把所有作业提交到进程池
+JOBS_PER_WORKER = 2
+
+
+class ManifestError(ValueError):
+    """清单中的一行无法解析"""
+
+
+def job_size(job: Any) -> int:
+    """作业参数序列化后的大小（字节），用于估算在途内存"""
+    return len(json.dumps(job, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+def iter_manifest(file_path: str) -> Iterator[Any]:
+    """
+    逐行读取NDJSON清单
+
+    无法解析的行以 ManifestError 对象返回，不中断读取。
+
+    Args:
+        file_path: 清单文件路径
+
+    Returns:
+        作业迭代器
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                yield ManifestError(f"清单第 {line_no} 行不是合法的JSON: {e.msg}")
+
+
+def count_manifest(file_path: str) -> int:
+    """清单中的作业数（非空行数）"""
+    with open(file_path, "r", encoding="utf-8") as f:
+        return sum(1 for line in f if line.strip())
+
+
+def run_batch(func: Callable[[Any], Any], jobs: Iterable[Any], max_workers: Optional[int] = None,
+              memory_budget: int = DEFAULT_MEMORY_BUDGET) -> Iterator[Tuple[int, Any, Any]]:
+    """
+    在常驻进程池中执行一批作业
+
+    作业按需从迭代器中读取：在途作业数不超过 max_workers * JOBS_PER_WORKER，
+    在途作业的参数总大小不超过 memory_budget（单个超出预算的作业在没有其他在途作业时单独执行）。
+    max_workers 为1时在当前进程中依次执行。
+
+    Args:
+        func: 作业函数，需可被 pickle（模块级函数）
+        jobs: 作业参数迭代器，ManifestError 等异常对象直接作为失败结果返回
+        max_workers: 最大工作进程数，为None时使用CPU核数
+        memory_budget: 在途内存预算（字节）
+
+    Returns:
+        按完成顺序的 (作业序号, 作业参数, 结果) 迭代器，作业抛出的异常作为结果返回
+    """
+    workers = max(1, max_workers or default_workers())
+    jobs = enumerate(jobs)
+    if workers == 1:
+        for index, job in jobs:
+            if isinstance(job, Exception):
+                yield index, job, job
+                continue
+            try:
+                yield index, job, func(job)
+            except Exception as e:
+                yield index, job, e
+        return
+
+    pool = get_process_pool(workers)
+    window = workers * JOBS_PER_WORKER
+    # 在途作业：future -> (作业序号, 作业参数, 参数大小, 所在进程池)
+    running: Dict[Any, Tuple[int, Any, int, Any]] = {}
+    in_flight = 0
+    waiting: deque = deque()
+    exhausted = False
+    try:
+        while True:
+            # 在并发数和内存预算允许的范围内提交作业
+            while len(running) < window:
+                if not waiting:
+                    if exhausted:
+                        break
+                    item = next(jobs, None)
+                    if item is None:
+                        exhausted = True
+                        break
+                    index, job = item
+                    if isinstance(job, Exception):
+                        yield index, job, job
+                        continue
+                    waiting.append((index, job, job_size(job)))
+                index, job, size = waiting[0]
+                if running and in_flight + size > memory_budget:
+                    break
+                waiting.popleft()
+                try:
+                    future = pool.submit(func, job)
+                except BrokenProcessPool:
+                    # 工作进程异常退出后进程池不可再用，换一个新的进程池
+                    discard_process_pool(pool)
+                    pool = get_process_pool(workers)
+                    future = pool.submit(func, job)
+                running[future] = (index, job, size, pool)
+                in_flight += size
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, job, size, job_pool = running.pop(future)
+                in_flight -= size
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # 同一进程池中的其他作业也会失败，只替换一次
+                    if isinstance(e, BrokenProcessPool) and job_pool is pool:
+                        discard_process_pool(pool)
+                        pool = get_process_pool(workers)
+                    result = e
+                yield index, job, result
+    finally:
+        for future in running:
+            future.cancel()
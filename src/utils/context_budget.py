@@ -0,0 +1,353 @@
+"""
+上下文预算模块
+按模型系列计算消息的令牌数（安装了 tiktoken 时 OpenAI 模型使用对应的编码，其他情况按字符估算），
+消息超出预算时依次截断过长的工具输出、丢弃或摘要较早的消息、截断最长的消息，并报告节省的令牌数
+"""
+
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # 未安装 tiktoken 时所有模型都按字符估算
+    tiktoken = None
+
+# 估算时每个令牌对应的ASCII字符数，中文等非ASCII字符按每个字符一个令牌计
+ASCII_CHARS_PER_TOKEN = 4
+
+# 每条消息的格式开销（角色、分隔符）和回复的起始开销
+MESSAGE_OVERHEAD = 4
+REPLY_OVERHEAD = 3
+
+# 调用参数中没有 max_tokens 时为输出预留的令牌数
+RESERVE_TOKENS = 1024
+
+# 单条工具输出最多占预算的比例
+TOOL_OUTPUT_RATIO = 0.25
+
+# 较早消息的摘要最多占预算的比例
+SUMMARY_RATIO = 0.1
+
+# 截断文本时保留开头的比例，其余保留结尾；截断后至少保留的令牌数
+HEAD_RATIO = 0.7
+MIN_KEEP_TOKENS = 32
+
+TRUNCATION_MARKER = "\n...[省略约 {tokens} 个令牌]...\n"
+
+# 每个分词器缓存令牌数的文本个数
+COUNT_CACHE_SIZE = 4096
+
+# 按字符估算的模型系列
+ESTIMATE = "estimate"
+
+# OpenAI 模型名前缀 -> tiktoken 编码，按顺序匹配
+OPENAI_ENCODINGS = (
+    (("gpt-4o", "gpt-4.1", "o1", "o3", "o4"), "o200k_base"),
+    (("gpt-4", "gpt-3.5"), "cl100k_base"),
+)
+
+# 输出可被截断的工具消息角色
+TOOL_ROLES = ("tool", "function")
+
+
+def model_family(model: Optional[str]) -> str:
+    """模型的分词器系列：OpenAI 模型为 tiktoken 编码名，其他模型（或未安装 tiktoken 时）为 estimate"""
+    if tiktoken is not None:
+        name = (model or "").lower()
+        for prefixes, encoding in OPENAI_ENCODINGS:
+            if name.startswith(prefixes):
+                return encoding
+    return ESTIMATE
+
+
+class Tokenizer:
+    """一个模型系列的分词器，缓存最近计算过的文本的令牌数"""
+
+    def __init__(self, family: str):
+        self.family = family
+        self._encoding = None if family == ESTIMATE else tiktoken.get_encoding(family)
+        # 多轮对话中较早的消息每次调用都会重新计算，按文本缓存
+        self.count = lru_cache(maxsize=COUNT_CACHE_SIZE)(self._count)
+
+    def _count(self, text: str) -> int:
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        chars = len(text)
+        # UTF-8 编码比字符数多出的字节来自非ASCII字符，按每个字符3字节折算
+        wide = (len(text.encode("utf-8", "surrogatepass")) - chars) // 2
+        return wide + (chars - wide + ASCII_CHARS_PER_TOKEN - 1) // ASCII_CHARS_PER_TOKEN
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        把文本截断到不超过 max_tokens 个令牌，保留开头和结尾，中间插入省略标记
+
+        Args:
+            text: 文本
+            max_tokens: 最大令牌数
+
+        Returns:
+            截断后的文本，未超出时原样返回
+        """
+        total = self.count(text)
+        if total <= max_tokens:
+            return text
+        marker = TRUNCATION_MARKER.format(tokens=total)
+        keep = max(0, max_tokens - self._count(marker))
+        marker = TRUNCATION_MARKER.format(tokens=total - keep)
+        if self._encoding is not None:
+            tokens = self._encoding.encode(text, disallowed_special=())
+            head = int(keep * HEAD_RATIO)
+            tail = self._encoding.decode(tokens[len(tokens) - (keep - head):]) if keep > head else ""
+            return self._encoding.decode(tokens[:head]) + marker + tail
+
+        # 估算时按比例保留字符，超出时逐步缩小
+        chars = len(text) * keep // total
+        while True:
+            head = int(chars * HEAD_RATIO)
+            result = text[:head] + marker + text[len(text) - (chars - head):]
+            if chars == 0 or self._count(result) <= max_tokens:
+                return result
+            chars = chars * 9 // 10
+
+
+@lru_cache(maxsize=None)
+def _tokenizer(family: str) -> Tokenizer:
+    return Tokenizer(family)
+
+
+def get_tokenizer(model: Optional[str]) -> Tokenizer:
+    """模型所属系列的分词器，同一系列的模型共享"""
+    return _tokenizer(model_family(model))
+
+
+def _message_dict(message: Any) -> Dict[str, Any]:
+    if isinstance(message, dict):
+        return message
+    # 上一轮响应中的消息对象等
+    if hasattr(message, "model_dump"):
+        return message.model_dump(exclude_none=True)
+    return dict(vars(message))
+
+
+def _text_parts(message: Dict[str, Any]) -> Iterator[str]:
+    content = message.get("content")
+    if isinstance(content, str):
+        yield content
+    elif isinstance(content, list):
+        for part in content:
+            if isinstance(part, dict) and part.get("text"):
+                yield part["text"]
+    if message.get("name"):
+        yield message["name"]
+    for call in message.get("tool_calls") or []:
+        function = call.get("function") or {}
+        yield function.get("name") or ""
+        yield function.get("arguments") or ""
+
+
+def _message_tokens(tokenizer: Tokenizer, message: Dict[str, Any]) -> int:
+    return MESSAGE_OVERHEAD + sum(tokenizer.count(text) for text in _text_parts(message))
+
+
+def count_tokens(messages: list, model: Optional[str] = None) -> int:
+    """
+    计算消息列表的输入令牌数
+
+    Args:
+        messages: 消息列表
+        model: 模型名称，决定使用的分词器
+
+    Returns:
+        令牌数（含每条消息的格式开销）
+    """
+    tokenizer = get_tokenizer(model)
+    return sum(_message_tokens(tokenizer, _message_dict(message)) for message in messages) + REPLY_OVERHEAD
+
+
+@dataclass
+class BudgetReport:
+    """一次调用的上下文预算结果"""
+    model: Optional[str] = None
+    budget: Optional[int] = None
+    original_tokens: int = 0
+    final_tokens: int = 0
+    # 被截断的消息数、被丢弃（或并入摘要）的消息数
+    truncated: int = 0
+    dropped: int = 0
+    summarized: bool = False
+
+    @property
+    def tokens_saved(self) -> int:
+        """压缩节省的输入令牌数"""
+        return self.original_tokens - self.final_tokens
+
+    @property
+    def fits(self) -> bool:
+        """压缩后是否在预算内"""
+        return self.budget is None or self.final_tokens <= self.budget
+
+    def as_dict(self) -> Dict[str, Any]:
+        """结果摘要"""
+        return {
+            "model": self.model,
+            "budget": self.budget,
+            "original_tokens": self.original_tokens,
+            "final_tokens": self.final_tokens,
+            "tokens_saved": self.tokens_saved,
+            "truncated": self.truncated,
+            "dropped": self.dropped,
+            "summarized": self.summarized,
+        }
+
+
+class ContextBudgeter:
+    """
+    上下文预算器
+
+    消息超出预算时按以下顺序压缩，每一步之后满足预算即停止：
+    1. 从最早的开始截断超过预算 tool_output_ratio 的工具输出；
+    2. 从最早的开始丢弃对话轮次（助手的工具调用和对应的工具输出一起丢弃），开头的 system 消息、
+       最后一条 user 消息及其之后的消息始终保留，提供了 summarizer 时被丢弃的消息替换为一条摘要；
+    3. 截断剩余消息中最长的文本（如整篇的PDF或markdown文本），保留开头和结尾。
+    """
+
+    def __init__(self, max_input_tokens: Optional[int] = None, reserve_tokens: int = RESERVE_TOKENS,
+                 tool_output_ratio: float = TOOL_OUTPUT_RATIO, summarizer: Optional[Callable[[str], str]] = None):
+        """
+        Args:
+            max_input_tokens: 输入令牌数上限（可选），低于上下文窗口时用于控制费用
+            reserve_tokens: 调用参数中没有 max_tokens 时为输出预留的令牌数
+            tool_output_ratio: 单条工具输出最多占预算的比例
+            summarizer: 摘要函数（可选），参数为被丢弃消息的文本（每行“角色: 内容”），返回摘要；
+                通常会调用一个较小的模型，异步调用时在线程中执行
+        """
+        self.max_input_tokens = max_input_tokens
+        self.reserve_tokens = reserve_tokens
+        self.tool_output_ratio = tool_output_ratio
+        self.summarizer = summarizer
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(("calls", "compacted", "tokens_saved"), 0)
+
+    def budget_for(self, context_window: int, max_output: Optional[int] = None) -> int:
+        """
+        输入令牌的预算
+
+        Args:
+            context_window: 模型的上下文窗口
+            max_output: 调用参数中的 max_tokens（可选）
+
+        Returns:
+            上下文窗口减去输出预留后的令牌数，不超过 max_input_tokens
+        """
+        budget = context_window - (max_output or self.reserve_tokens)
+        if self.max_input_tokens is not None:
+            budget = min(budget, self.max_input_tokens)
+        return max(budget, 0)
+
+    def fit(self, messages: list, budget: int, model: Optional[str] = None,
+            report: Optional[BudgetReport] = None) -> Tuple[list, BudgetReport]:
+        """
+        把消息压缩到预算内
+
+        Args:
+            messages: 消息列表
+            budget: 输入令牌的预算
+            model: 模型名称，决定使用的分词器
+            report: 结果对象（可选），未提供时新建
+
+        Returns:
+            (消息列表, 结果)；未超出预算时原样返回消息列表，否则返回新的列表，原消息不会被修改
+        """
+        tokenizer = get_tokenizer(model)
+        if report is None:
+            report = BudgetReport()
+        report.model = model
+        report.budget = budget
+        items = [_message_dict(message) for message in messages]
+        counts = [_message_tokens(tokenizer, message) for message in items]
+        report.original_tokens = report.final_tokens = sum(counts) + REPLY_OVERHEAD
+        if report.original_tokens > budget:
+            messages = self._compact(items, counts, budget, tokenizer, report)
+        with self._lock:
+            self._counts["calls"] += 1
+            if report.tokens_saved:
+                self._counts["compacted"] += 1
+                self._counts["tokens_saved"] += report.tokens_saved
+        return messages, report
+
+    def _compact(self, items: List[Optional[Dict[str, Any]]], counts: List[int], budget: int,
+                 tokenizer: Tokenizer, report: BudgetReport) -> list:
+        total = report.final_tokens
+        truncated = set()
+
+        def truncate(index: int, max_tokens: int):
+            nonlocal total
+            message = items[index]
+            items[index] = {**message, "content": tokenizer.truncate(message["content"], max_tokens)}
+            total -= counts[index]
+            counts[index] = _message_tokens(tokenizer, items[index])
+            total += counts[index]
+            truncated.add(index)
+
+        # 1. 过长的工具输出
+        limit = max(MIN_KEEP_TOKENS, int(budget * self.tool_output_ratio))
+        for index, message in enumerate(items):
+            if total <= budget:
+                break
+            if message.get("role") in TOOL_ROLES and isinstance(message.get("content"), str) \
+                    and tokenizer.count(message["content"]) > limit:
+                truncate(index, limit)
+
+        # 2. 较早的对话轮次
+        start = 0
+        while start < len(items) and items[start].get("role") in ("system", "developer"):
+            start += 1
+        end = max((i for i, message in enumerate(items) if message.get("role") == "user"), default=len(items) - 1)
+        groups: List[List[int]] = []
+        for index in range(start, end):
+            if items[index].get("role") in TOOL_ROLES and groups:
+                groups[-1].append(index)
+            else:
+                groups.append([index])
+        summary_limit = max(MIN_KEEP_TOKENS, int(budget * SUMMARY_RATIO)) if self.summarizer else 0
+        dropped = []
+        for group in groups:
+            if total <= budget - summary_limit:
+                break
+            dropped.extend(items[index] for index in group)
+            for index in group:
+                total -= counts[index]
+                items[index] = None
+        summary = None
+        if dropped:
+            report.dropped = len(dropped)
+            if self.summarizer is not None:
+                transcript = "\n".join(f"{message.get('role')}: {''.join(_text_parts(message))}" for message in dropped)
+                text = tokenizer.truncate(self.summarizer(transcript), summary_limit)
+                summary = {"role": "system", "content": f"较早对话的摘要：\n{text}"}
+                total += _message_tokens(tokenizer, summary)
+                report.summarized = True
+
+        # 3. 剩余消息中最长的文本，每条最多截断一次
+        shortened = set()
+        while total > budget:
+            candidates = [index for index, message in enumerate(items)
+                          if message is not None and index not in shortened and isinstance(message.get("content"), str)
+                          and tokenizer.count(message["content"]) > MIN_KEEP_TOKENS]
+            if not candidates:
+                break
+            index = max(candidates, key=counts.__getitem__)
+            shortened.add(index)
+            truncate(index, max(MIN_KEEP_TOKENS, tokenizer.count(items[index]["content"]) - (total - budget)))
+
+        report.truncated = sum(1 for index in truncated if items[index] is not None)
+        report.final_tokens = total
+        head = items[:start] + ([summary] if summary is not None else [])
+        return head + [message for message in items[start:] if message is not None]
+
+    def stats(self) -> Dict[str, int]:
+        """调用数、被压缩的调用数和累计节省的令牌数"""
+        with self._lock:
+            return dict(self._counts)
@@ -0,0 +1,231 @@
+"""
+目录扫描模块
+基于os.scandir遍历目录，复用DirEntry缓存的类型与stat信息，支持递归、过滤、排序和游标分页
+"""
+
+import os
+import re
+import time
+import bisect
+import fnmatch
+import heapq
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.utils.pagination import decode_cursor, encode_cursor, query_fingerprint
+
+# 支持的排序字段，前缀"-"表示降序
+SORT_KEYS = ("name", "size", "modified")
+
+# 单页默认条目数
+DEFAULT_PAGE_SIZE = 1000
+
+# 按大小/修改时间排序时缓存的查询数
+SORTED_CACHE_SIZE = 4
+
+# 排序结果缓存的有效期（秒），过期后的分页请求重新扫描
+SORTED_CACHE_TTL = 60.0
+
+# 查询指纹 -> (创建时间, 升序排序键列表, 对应的 (排序键, 相对路径, DirEntry) 列表)
+_sorted_cache: "OrderedDict[str, Tuple[float, list, list]]" = OrderedDict()
+_sorted_cache_lock = threading.Lock()
+
+
+def _compile_patterns(patterns: Optional[List[str]]) -> Optional[re.Pattern]:
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{fnmatch.translate(os.path.normcase(p))})" for p in patterns))
+
+
+def _matches(regex: Optional[re.Pattern], name: str, rel_path: str) -> bool:
+    # 含路径分隔符的模式匹配相对路径，否则只匹配文件名
+    return bool(regex.match(os.path.normcase(name)) or regex.match(os.path.normcase(rel_path).replace(os.sep, "/")))
+
+
+def scan_directory(directory: str, max_depth: Optional[int] = 0,
+                   include: Optional[List[str]] = None,
+                   exclude: Optional[List[str]] = None) -> Iterator[Tuple[str, os.DirEntry]]:
+    """
+    遍历目录条目
+
+    不跟随符号链接目录，被exclude匹配的目录不会继续深入。
+
+    Args:
+        directory: 目录路径
+        max_depth: 最大递归深度，0表示只列出当前目录，None表示不限制
+        include: 包含的glob模式列表（只作用于返回的条目）
+        exclude: 排除的glob模式列表
+
+    Returns:
+        (相对路径, DirEntry) 迭代器
+    """
+    include_re = _compile_patterns(include)
+    exclude_re = _compile_patterns(exclude)
+    stack = [("", 0)]
+    while stack:
+        rel_dir, depth = stack.pop()
+        try:
+            iterator = os.scandir(os.path.join(directory, rel_dir) if rel_dir else directory)
+        except (PermissionError, FileNotFoundError):
+            if not rel_dir:
+                raise
+            continue
+        with iterator:
+            for entry in iterator:
+                rel_path = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+                if exclude_re is not None and _matches(exclude_re, entry.name, rel_path):
+                    continue
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    is_dir = False
+                if is_dir and (max_depth is None or depth < max_depth):
+                    stack.append((rel_path, depth + 1))
+                if include_re is None or _matches(include_re, entry.name, rel_path):
+                    yield rel_path, entry
+
+
+def _entry_stat(entry: os.DirEntry) -> Optional[os.stat_result]:
+    try:
+        return entry.stat()
+    except OSError:
+        # 失效的符号链接
+        try:
+            return entry.stat(follow_symlinks=False)
+        except OSError:
+            return None
+
+
+def entry_info(rel_path: str, entry: os.DirEntry) -> Dict[str, Any]:
+    """
+    生成条目信息
+
+    Args:
+        rel_path: 相对路径
+        entry: 目录条目
+
+    Returns:
+        条目信息字典
+    """
+    st = _entry_stat(entry)
+    try:
+        is_file = entry.is_file()
+    except OSError:
+        is_file = False
+    return {
+        "name": entry.name,
+        "path": rel_path,
+        "is_file": is_file,
+        "size": st.st_size if is_file and st is not None else None,
+        "modified": st.st_mtime if st is not None else None,
+    }
+
+
+def _sort_key(field: str, rel_path: str, entry: os.DirEntry) -> list:
+    if field == "name":
+        return [rel_path]
+    st = _entry_stat(entry)
+    if field == "size":
+        try:
+            is_file = entry.is_file() if st is not None else False
+        except OSError:
+            is_file = False
+        return [st.st_size if is_file else -1, rel_path]
+    return [st.st_mtime if st is not None else 0.0, rel_path]
+
+
+def _sorted_entries(fingerprint: str, directory: str, depth: Optional[int],
+                    include: Optional[List[str]], exclude: Optional[List[str]],
+                    field: str, limit: int, use_cache: bool) -> Tuple[list, list]:
+    # 返回升序的排序键列表及条目列表；后续分页命中缓存时不再扫描和stat，只有一页的结果不缓存
+    now = time.monotonic()
+    if use_cache:
+        with _sorted_cache_lock:
+            cached = _sorted_cache.get(fingerprint)
+            if cached is not None and now - cached[0] < SORTED_CACHE_TTL:
+                _sorted_cache.move_to_end(fingerprint)
+                return cached[1], cached[2]
+    items = sorted(((_sort_key(field, rel_path, entry), rel_path, entry)
+                    for rel_path, entry in scan_directory(directory, depth, include, exclude)),
+                   key=lambda item: item[0])
+    keys = [item[0] for item in items]
+    if len(items) <= limit:
+        return keys, items
+    with _sorted_cache_lock:
+        _sorted_cache[fingerprint] = (now, keys, items)
+        _sorted_cache.move_to_end(fingerprint)
+        while len(_sorted_cache) > SORTED_CACHE_SIZE:
+            _sorted_cache.popitem(last=False)
+    return keys, items
+
+
+def list_directory(directory: str, recursive: bool = False, max_depth: Optional[int] = None,
+                   include: Optional[List[str]] = None, exclude: Optional[List[str]] = None,
+                   sort_by: str = "name", limit: int = DEFAULT_PAGE_SIZE,
+                   cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    分页列出目录条目
+
+    按 (排序字段, 相对路径) 做键集分页。按名称排序时每页重新扫描目录树，
+    只保留 limit 个候选，且只对返回的条目调用stat；按大小或修改时间排序时
+    第一页需要扫描并stat全部条目，排好序的结果按查询指纹缓存
+    SORTED_CACHE_TTL 秒，期间的后续分页直接从缓存中截取。
+
+    Args:
+        directory: 目录路径
+        recursive: 是否递归子目录
+        max_depth: 最大递归深度（提供时视为递归，0表示只列出当前目录）
+        include: 包含的glob模式列表
+        exclude: 排除的glob模式列表
+        sort_by: 排序字段（"name"、"size"、"modified"，前缀"-"表示降序）
+        limit: 每页条目数
+        cursor: 上一页返回的游标
+
+    Returns:
+        包含 "files" 和 "next_cursor" 的字典
+    """
+    descending = sort_by.startswith("-")
+    field = sort_by.lstrip("-")
+    if field not in SORT_KEYS:
+        raise ValueError(f"不支持的排序字段: {sort_by}")
+    if limit <= 0:
+        raise ValueError("limit 必须大于0")
+    if max_depth is None:
+        depth = None if recursive else 0
+    else:
+        depth = max(max_depth, 0)
+
+    fingerprint = query_fingerprint(os.path.abspath(directory), depth, include, exclude, sort_by)
+    last_key = decode_cursor(cursor, fingerprint) if cursor else None
+
+    if field == "name":
+        def candidates():
+            for rel_path, entry in scan_directory(directory, depth, include, exclude):
+                key = _sort_key(field, rel_path, entry)
+                if last_key is not None and (key <= last_key if not descending else key >= last_key):
+                    continue
+                yield key, rel_path, entry
+
+        select = heapq.nlargest if descending else heapq.nsmallest
+        # 多取一个用于判断是否还有下一页
+        page = select(limit + 1, candidates(), key=lambda item: item[0])
+    else:
+        # 第一页总是重新扫描，使新的分页从最新的目录状态开始
+        keys, items = _sorted_entries(fingerprint, directory, depth, include, exclude, field,
+                                      limit, use_cache=last_key is not None)
+        if descending:
+            end = bisect.bisect_left(keys, last_key) if last_key is not None else len(items)
+            page = items[max(end - limit - 1, 0):end][::-1]
+        else:
+            start = bisect.bisect_right(keys, last_key) if last_key is not None else 0
+            page = items[start:start + limit + 1]
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    files = [entry_info(rel_path, entry) for _, rel_path, entry in page]
+    next_cursor = encode_cursor(fingerprint, page[-1][0]) if has_more else None
+    return {
+        "files": files,
+        "next_cursor": next_cursor,
+    }
@@ -0,0 +1,231 @@
+"""
+目录监视模块
+在内存中维护目录下文件列表的快照：Linux 上由 inotify 事件增量更新，
+inotify 不可用（其他平台、监视数达到上限、目录不存在）时定期检查目录的修改时间，变化时重新扫描。
+快照变化时通知已注册的回调
+"""
+
+import os
+import sys
+import json
+import struct
+import select
+import ctypes
+import ctypes.util
+import threading
+from typing import Callable, Dict, List, Optional
+
+# 轮询间隔（秒），inotify 模式下也是检查停止信号的间隔
+POLL_INTERVAL = 2.0
+
+# inotify 事件掩码（见 <sys/inotify.h>）
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+
+# 被监视的目录本身被删除或移走
+_GONE_MASK = IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED
+
+# struct inotify_event 的固定部分：wd, mask, cookie, len
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _load_libc():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+    return libc if hasattr(libc, "inotify_init1") else None
+
+
+_libc = _load_libc()
+
+
+class _Inotify:
+    """单个目录的 inotify 监视"""
+
+    def __init__(self, path: str):
+        self.fd = _libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        if _libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, os.strerror(error), path)
+
+    def read(self, timeout: float) -> List[tuple]:
+        """等待并读取事件，返回 [(掩码, 文件名), ...]"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events, offset = [], 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            events.append((mask, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class DirectorySnapshot:
+    """
+    目录下文件（不含子目录）列表的快照
+
+    首次读取时扫描目录并启动后台监视线程，之后的读取直接返回缓存的结果。
+    """
+
+    def __init__(self, path: str, poll_interval: float = POLL_INTERVAL, use_inotify: bool = True):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify and _libc is not None
+        # 当前的监视方式："inotify" 或 "poll"
+        self.mode: Optional[str] = None
+        self._names: Dict[str, None] = {}
+        self._text = "[]"
+        self._listeners: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_listener(self, callback: Callable[[], None]):
+        """注册快照变化时的回调（在监视线程中调用）"""
+        self._listeners.append(callback)
+
+    def start(self):
+        """扫描目录并启动监视线程（已启动时不做任何事）"""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._names = dict.fromkeys(self._scan())
+            self._text = self._render()
+            self._thread = threading.Thread(target=self._run, name=f"dir-watch:{self.path}", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """停止监视线程"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def text(self) -> str:
+        """文件路径列表的JSON文本"""
+        self.start()
+        return self._text
+
+    def files(self) -> List[str]:
+        """文件路径列表（按文件名排序）"""
+        self.start()
+        return json.loads(self._text)
+
+    def _scan(self) -> List[str]:
+        try:
+            with os.scandir(self.path) as entries:
+                return [entry.name for entry in entries if entry.is_file()]
+        except (FileNotFoundError, NotADirectoryError):
+            return []
+
+    def _render(self) -> str:
+        paths = [os.path.join(self.path, name) for name in sorted(self._names)]
+        return json.dumps(paths, ensure_ascii=False, indent=2)
+
+    def _update(self, added: List[str] = (), removed: List[str] = (), replace: Optional[List[str]] = None):
+        with self._lock:
+            names = dict(self._names)
+            if replace is not None:
+                names = dict.fromkeys(replace)
+            for name in removed:
+                names.pop(name, None)
+            for name in added:
+                names[name] = None
+            if names.keys() == self._names.keys():
+                return
+            self._names = names
+            self._text = self._render()
+        for callback in list(self._listeners):
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def _run(self):
+        while not self._stop.is_set():
+            watch = None
+            if self.use_inotify and os.path.isdir(self.path):
+                try:
+                    watch = _Inotify(self.path)
+                except OSError:
+                    # 监视数达到上限等情况下改为轮询
+                    self.use_inotify = False
+            if watch is None:
+                self.mode = "poll"
+                self._poll()
+                continue
+            self.mode = "inotify"
+            try:
+                # 建立监视后重新扫描一次，避免遗漏扫描与建立监视之间的变化
+                self._update(replace=self._scan())
+                self._watch(watch)
+            finally:
+                watch.close()
+
+    def _watch(self, watch: _Inotify):
+        """处理 inotify 事件，目录本身被删除或移走时返回"""
+        while not self._stop.is_set():
+            added, removed = [], []
+            for mask, name in watch.read(self.poll_interval):
+                if mask & IN_Q_OVERFLOW:
+                    # 事件队列溢出，无法增量更新
+                    self._update(replace=self._scan())
+                    added, removed = [], []
+                elif mask & _GONE_MASK:
+                    self._update(replace=[])
+                    return
+                elif mask & IN_ISDIR:
+                    continue
+                elif mask & (IN_CREATE | IN_MOVED_TO):
+                    # 指向目录的符号链接等不计入
+                    if os.path.isfile(os.path.join(self.path, name)):
+                        added.append(name)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    removed.append(name)
+                    if name in added:
+                        added.remove(name)
+            if added or removed:
+                self._update(added, removed)
+
+    def _poll(self):
+        """按目录修改时间轮询；目录出现且可以使用 inotify 时返回"""
+        last = None
+        while not self._stop.is_set():
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime != last:
+                last = mtime
+                self._update(replace=self._scan())
+                if mtime is not None and self.use_inotify:
+                    return
+            self._stop.wait(self.poll_interval)
@@ -0,0 +1,257 @@
+"""
+流式DOCX写入模块
+按段落将 word/document.xml 直接写入ZIP容器，内存占用与文档大小无关
+"""
+
+import os
+import re
+import uuid
+import zipfile
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, Optional
+from xml.sax.saxutils import escape
+
+# 写入缓冲区大小，攒够后一次性写入压缩流
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+# XML 1.0 不允许出现的控制字符
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+_CONTENT_TYPES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/docProps/core.xml" '
+    'ContentType="application/vnd.openxmlformats-package.core-properties+xml"/>'
+    '</Types>'
+)
+
+_ROOT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/package/2006/relationships/metadata/core-properties" '
+    'Target="docProps/core.xml"/>'
+    '</Relationships>'
+)
+
+_CORE_XML_TEMPLATE = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<cp:coreProperties '
+    'xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+    'xmlns:dc="http://purl.org/dc/elements/1.1/" '
+    'xmlns:dcterms="http://purl.org/dc/terms/" '
+    'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+    '<dc:title>{title}</dc:title>'
+    '<dcterms:created xsi:type="dcterms:W3CDTF">{created}</dcterms:created>'
+    '</cp:coreProperties>'
+)
+
+_DOCUMENT_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+    '<w:body>'
+)
+
+_DOCUMENT_FOOTER = (
+    '<w:sectPr>'
+    '<w:pgSz w:w="11906" w:h="16838"/>'
+    '<w:pgMar w:top="1440" w:right="1800" w:bottom="1440" w:left="1800" '
+    'w:header="851" w:footer="992" w:gutter="0"/>'
+    '</w:sectPr>'
+    '</w:body>'
+    '</w:document>'
+)
+
+
+def paragraph_xml(text: str) -> str:
+    """
+    生成单个段落的XML片段
+
+    Args:
+        text: 段落文本
+
+    Returns:
+        <w:p> 元素字符串
+    """
+    if not text:
+        return "<w:p/>"
+    text = escape(_INVALID_XML_CHARS.sub("", text))
+    return f'<w:p><w:r><w:t xml:space="preserve">{text}</w:t></w:r></w:p>'
+
+
+def iter_paragraphs(content: str) -> Iterator[str]:
+    """
+    按换行符逐段切分文本，不预先生成整个段落列表
+
+    Args:
+        content: 文本内容
+
+    Returns:
+        段落迭代器
+    """
+    start = 0
+    length = len(content)
+    while start <= length:
+        end = content.find("\n", start)
+        if end == -1:
+            end = length
+        yield content[start:end].rstrip("\r")
+        start = end + 1
+
+
+def iter_file_paragraphs(source_path: str, encoding: str = "utf-8") -> Iterator[str]:
+    """
+    逐行读取文本文件作为段落
+
+    Args:
+        source_path: 文本文件路径
+        encoding: 文件编码
+
+    Returns:
+        段落迭代器
+    """
+    with open(source_path, "r", encoding=encoding, errors="replace", newline="") as f:
+        for line in f:
+            yield line.rstrip("\r\n")
+
+
+class DocxStreamWriter:
+    """
+    流式DOCX写入器
+
+    静态部件在打开时写入，之后 word/document.xml 以压缩流的形式逐段追加，
+    每次只在内存中保留一个写入缓冲区。内容先写入同目录下的临时文件，
+    正常关闭时才替换为目标文件，出错时删除临时文件，不留下不完整的文档。
+    """
+
+    def __init__(self, file_path: str, title: str = "", compresslevel: Optional[int] = 6):
+        self.file_path = file_path
+        self.title = title
+        self.compresslevel = compresslevel
+        self.paragraph_count = 0
+        self.bytes_written = 0
+        self._temp_path: Optional[str] = None
+        self._zip: Optional[zipfile.ZipFile] = None
+        self._stream = None
+        self._buffer: list = []
+        self._buffered = 0
+
+    def open(self) -> "DocxStreamWriter":
+        """打开ZIP容器并写入静态部件"""
+        self._temp_path = os.path.join(os.path.dirname(os.path.abspath(self.file_path)),
+                                       f".{os.path.basename(self.file_path)}.{uuid.uuid4().hex}.part")
+        self._zip = zipfile.ZipFile(
+            self._temp_path, "w", zipfile.ZIP_DEFLATED, compresslevel=self.compresslevel
+        )
+        created = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        self._zip.writestr("[Content_Types].xml", _CONTENT_TYPES_XML)
+        self._zip.writestr("_rels/.rels", _ROOT_RELS_XML)
+        self._zip.writestr(
+            "docProps/core.xml",
+            _CORE_XML_TEMPLATE.format(title=escape(self.title), created=created),
+        )
+        # force_zip64 允许 document.xml 超过4GB
+        self._stream = self._zip.open("word/document.xml", "w", force_zip64=True)
+        self._write(_DOCUMENT_HEADER)
+        return self
+
+    def add_paragraph(self, text: str):
+        """
+        追加一个段落
+
+        Args:
+            text: 段落文本
+        """
+        self._write(paragraph_xml(text))
+        self.paragraph_count += 1
+
+    def add_paragraphs(self, paragraphs: Iterable[str]):
+        """
+        追加多个段落
+
+        Args:
+            paragraphs: 段落迭代器
+        """
+        for text in paragraphs:
+            self.add_paragraph(text)
+
+    def close(self):
+        """写入文档尾部，关闭ZIP容器并替换为目标文件"""
+        if self._zip is None:
+            return
+        try:
+            if self._stream is not None:
+                self._write(_DOCUMENT_FOOTER)
+                self._flush()
+                self._stream.close()
+                self._stream = None
+            self._zip.close()
+            self._zip = None
+            os.replace(self._temp_path, self.file_path)
+        except BaseException:
+            self.abort()
+            raise
+
+    def abort(self):
+        """放弃写入，删除临时文件"""
+        try:
+            if self._stream is not None:
+                self._stream.close()
+            if self._zip is not None:
+                self._zip.close()
+        finally:
+            self._stream = None
+            self._zip = None
+            if self._temp_path is not None and os.path.exists(self._temp_path):
+                os.remove(self._temp_path)
+
+    def _write(self, fragment: str):
+        self._buffer.append(fragment)
+        self._buffered += len(fragment)
+        if self._buffered >= WRITE_BUFFER_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        data = "".join(self._buffer).encode("utf-8")
+        self._stream.write(data)
+        self.bytes_written += len(data)
+        self._buffer = []
+        self._buffered = 0
+
+    def __enter__(self) -> "DocxStreamWriter":
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_docx(file_path: str, paragraphs: Iterable[str], title: str = "") -> Dict[str, Any]:
+    """
+    将段落流写入DOCX文件
+
+    Args:
+        file_path: 输出文件路径
+        paragraphs: 段落迭代器
+        title: 文档标题（写入文档属性）
+
+    Returns:
+        写入统计信息
+    """
+    with DocxStreamWriter(file_path, title=title) as writer:
+        writer.add_paragraphs(paragraphs)
+    return {
+        "paragraphs": writer.paragraph_count,
+        "document_xml_bytes": writer.bytes_written,
+    }
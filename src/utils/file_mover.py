@@ -0,0 +1,194 @@
+"""
+文件移动模块
+同一文件系统内直接重命名；跨文件系统（EXDEV）时使用内核零拷贝复制，落盘后再删除源文件
+"""
+
+import os
+import errno
+import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+# 单次零拷贝调用复制的字节数
+COPY_CHUNK_SIZE = 64 * 1024 * 1024
+
+# 用户态复制的缓冲区大小
+COPY_BUFFER_SIZE = 4 * 1024 * 1024
+
+# 批量移动的默认并发数
+DEFAULT_MOVE_WORKERS = 4
+
+# 零拷贝不可用时回退到下一种方式的错误码
+_FALLBACK_ERRNOS = {
+    errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EPERM, errno.EBADF, errno.ENOTSOCK
+}
+
+
+def _copy_file_range(src_fd: int, dst_fd: int, copied: int, size: int) -> int:
+    while copied < size:
+        n = os.copy_file_range(src_fd, dst_fd, min(COPY_CHUNK_SIZE, size - copied), copied, copied)
+        if n == 0:
+            break
+        copied += n
+    return copied
+
+
+def _sendfile(src_fd: int, dst_fd: int, copied: int, size: int) -> int:
+    os.lseek(dst_fd, copied, os.SEEK_SET)
+    while copied < size:
+        n = os.sendfile(dst_fd, src_fd, copied, min(COPY_CHUNK_SIZE, size - copied))
+        if n == 0:
+            break
+        copied += n
+    return copied
+
+
+def copy_file_data(src_fd: int, dst_fd: int, size: int) -> str:
+    """
+    在两个文件描述符之间复制数据，优先使用零拷贝
+
+    依次尝试 copy_file_range、sendfile，都不可用时使用用户态缓冲复制，
+    后一种方式从前一种已复制的位置继续。
+
+    Args:
+        src_fd: 源文件描述符
+        dst_fd: 目标文件描述符
+        size: 源文件大小
+
+    Returns:
+        实际使用的复制方式
+    """
+    copied = 0
+    for method, copy in (("copy_file_range", _copy_file_range), ("sendfile", _sendfile)):
+        if not hasattr(os, method):
+            continue
+        try:
+            copied = copy(src_fd, dst_fd, copied, size)
+            if copied >= size:
+                return method
+        except OSError as e:
+            if e.errno not in _FALLBACK_ERRNOS:
+                raise
+            # 目标文件中已写入的部分无需重复复制
+            copied = os.fstat(dst_fd).st_size
+    os.lseek(src_fd, copied, os.SEEK_SET)
+    os.lseek(dst_fd, copied, os.SEEK_SET)
+    while True:
+        chunk = os.read(src_fd, COPY_BUFFER_SIZE)
+        if not chunk:
+            break
+        view = memoryview(chunk)
+        while view:
+            written = os.write(dst_fd, view)
+            view = view[written:]
+    return "copy"
+
+
+def _fsync_directory(directory: str):
+    # Windows 不支持对目录调用fsync
+    if os.name != "posix":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _cross_device_move(source_path: str, destination_path: str) -> Dict[str, Any]:
+    dest_dir = os.path.dirname(os.path.abspath(destination_path))
+    # 先写入同目录下的临时文件，落盘后再原子替换，避免留下不完整的目标文件
+    temp_path = os.path.join(dest_dir, f".{os.path.basename(destination_path)}.{uuid.uuid4().hex}.part")
+    size = os.stat(source_path).st_size
+    try:
+        src_fd = os.open(source_path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        try:
+            dst_fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o600)
+            try:
+                method = copy_file_data(src_fd, dst_fd, size)
+                os.fsync(dst_fd)
+            finally:
+                os.close(dst_fd)
+        finally:
+            os.close(src_fd)
+        shutil.copystat(source_path, temp_path)
+        os.replace(temp_path, destination_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    _fsync_directory(dest_dir)
+    os.unlink(source_path)
+    return {"bytes": size, "method": method}
+
+
+def move_path(source_path: str, destination_path: str) -> Dict[str, Any]:
+    """
+    移动文件，跨文件系统时复制后删除源文件
+
+    Args:
+        source_path: 源文件路径
+        destination_path: 目标文件路径
+
+    Returns:
+        移动信息，包含字节数和使用的方式
+    """
+    try:
+        os.rename(source_path, destination_path)
+        size = os.stat(destination_path).st_size if os.path.isfile(destination_path) else 0
+        return {"bytes": size, "method": "rename"}
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    if os.path.isdir(source_path):
+        # 目录逐个文件复制
+        shutil.move(source_path, destination_path)
+        return {"bytes": 0, "method": "copytree"}
+    return _cross_device_move(source_path, destination_path)
+
+
+def _move_one(move: Dict[str, str]) -> Dict[str, Any]:
+    source_path = move.get("source_path", "")
+    destination_path = move.get("destination_path", "")
+    try:
+        dest_dir = os.path.dirname(destination_path)
+        if dest_dir:
+            os.makedirs(dest_dir, exist_ok=True)
+        info = move_path(source_path, destination_path)
+        return {"source_path": source_path, "destination_path": destination_path, "success": True, **info}
+    except Exception as e:
+        return {
+            "source_path": source_path,
+            "destination_path": destination_path,
+            "success": False,
+            "message": str(e),
+        }
+
+
+def move_many(moves: List[Dict[str, str]], max_workers: int = DEFAULT_MOVE_WORKERS) -> Dict[str, Any]:
+    """
+    使用有界线程池批量移动文件
+
+    Args:
+        moves: 移动任务列表，每项包含"source_path"和"destination_path"
+        max_workers: 最大并发数
+
+    Returns:
+        按输入顺序排列的逐项结果及总吞吐量
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        results = list(executor.map(_move_one, moves))
+    elapsed = time.perf_counter() - start
+    total_bytes = sum(item.get("bytes", 0) for item in results if item["success"])
+    succeeded = sum(1 for item in results if item["success"])
+    return {
+        "results": results,
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "total_bytes": total_bytes,
+        "elapsed_seconds": round(elapsed, 6),
+        "throughput_mb_s": round(total_bytes / (1024 * 1024) / elapsed, 3) if elapsed > 0 else None,
+    }
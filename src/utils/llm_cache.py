@@ -0,0 +1,247 @@
+"""
+模型响应缓存模块
+按 (提供商, 模型, 消息, 参数) 的规范化哈希缓存确定性调用（temperature 为0、非流式）的响应：
+内存中的 LRU 层限制总字节数，可选的 SQLite 层记录总字节数，超出容量时按过期时间和访问时间淘汰，并统计命中率
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from openai.types.chat import ChatCompletion
+
+# 内存层的默认容量（字节）
+MEMORY_CACHE_BYTES = 16 * 1024 * 1024
+
+# SQLite 层的默认容量（字节）
+DISK_CACHE_BYTES = 256 * 1024 * 1024
+
+# 缓存条目的默认有效期（秒）
+CACHE_TTL = 24 * 3600
+
+# 只影响请求方式、不影响响应内容的参数，不计入缓存键
+TRANSPORT_PARAMS = frozenset({"timeout", "extra_headers", "extra_query", "extra_body"})
+
+
+def _jsonable(value: Any) -> Any:
+    # 上一轮响应中的消息对象等
+    if hasattr(value, "model_dump"):
+        return value.model_dump(exclude_none=True)
+    raise TypeError(f"无法序列化的参数类型: {type(value).__name__}")
+
+
+def request_hash(provider: str, params: Dict[str, Any]) -> str:
+    """
+    请求的规范化哈希
+
+    参数按键排序后序列化，参数的书写顺序不影响结果。
+
+    Args:
+        provider: 模型提供商
+        params: 请求参数（含 model 和 messages）
+
+    Returns:
+        十六进制 SHA-256
+    """
+    content = {name: value for name, value in params.items() if name not in TRANSPORT_PARAMS}
+    text = json.dumps([provider, content], sort_keys=True, ensure_ascii=False, separators=(",", ":"),
+                      default=_jsonable)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def is_deterministic(params: Dict[str, Any]) -> bool:
+    """temperature 明确为0且不是流式调用"""
+    temperature = params.get("temperature")
+    return temperature is not None and temperature == 0 and not params.get("stream")
+
+
+class ResponseCache:
+    """
+    两级响应缓存
+
+    内存层保存最近使用的响应，超出 memory_max_bytes 时淘汰最久未使用的条目；
+    指定 path 时响应同时写入 SQLite 文件，超出 disk_max_bytes 时淘汰最久未访问的条目，可跨进程共享。
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            value BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            expires_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed_at);
+        CREATE INDEX IF NOT EXISTS responses_expires ON responses(expires_at);
+        CREATE TABLE IF NOT EXISTS responses_size (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            total INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO responses_size (id, total) SELECT 1, COALESCE(SUM(size), 0) FROM responses;
+        CREATE TRIGGER IF NOT EXISTS responses_size_insert AFTER INSERT ON responses BEGIN
+            UPDATE responses_size SET total = total + NEW.size WHERE id = 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS responses_size_update AFTER UPDATE OF size ON responses BEGIN
+            UPDATE responses_size SET total = total + NEW.size - OLD.size WHERE id = 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS responses_size_delete AFTER DELETE ON responses BEGIN
+            UPDATE responses_size SET total = total - OLD.size WHERE id = 1;
+        END;
+    """
+
+    def __init__(self, path: Optional[str] = None, memory_max_bytes: int = MEMORY_CACHE_BYTES,
+                 disk_max_bytes: int = DISK_CACHE_BYTES, ttl: float = CACHE_TTL):
+        """
+        Args:
+            path: SQLite 缓存文件路径，为None时只使用内存层
+            memory_max_bytes: 内存层容量（字节）
+            disk_max_bytes: SQLite 层容量（字节）
+            ttl: 条目有效期（秒）
+        """
+        self.path = path
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self.ttl = ttl
+        # 键 -> (响应JSON, 过期时间)，按使用顺序排列
+        self._memory: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._counts = dict.fromkeys(("memory_hits", "disk_hits", "misses", "bypassed", "stores", "evictions"), 0)
+        self._lock = threading.Lock()
+        self.conn: Optional[sqlite3.Connection] = None
+        if path is not None:
+            # 异步调用和线程池中的调用共用一个连接，由锁保证串行访问
+            self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(self.SCHEMA)
+
+    def key_for(self, provider: str, params: Dict[str, Any]) -> Optional[str]:
+        """
+        请求的缓存键
+
+        Args:
+            provider: 模型提供商
+            params: 请求参数
+
+        Returns:
+            缓存键；非确定性调用返回None（计为绕过）
+        """
+        if not is_deterministic(params):
+            with self._lock:
+                self._counts["bypassed"] += 1
+            return None
+        return request_hash(provider, params)
+
+    def get(self, key: str) -> Optional[ChatCompletion]:
+        """读取缓存的响应，未命中或已过期时返回None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._memory.move_to_end(key)
+                    self._counts["memory_hits"] += 1
+                    return ChatCompletion.model_validate_json(entry[0])
+                self._memory_discard(key)
+
+            if self.conn is not None:
+                row = self.conn.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None and row[1] > now:
+                    self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                    self._memory_put(key, row[0], row[1])
+                    self._counts["disk_hits"] += 1
+                    return ChatCompletion.model_validate_json(row[0])
+                if row is not None:
+                    self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+            self._counts["misses"] += 1
+            return None
+
+    def put(self, key: str, response: Any):
+        """保存响应"""
+        value = response.model_dump_json().encode("utf-8")
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._counts["stores"] += 1
+            self._memory_put(key, value, expires_at)
+            if self.conn is not None:
+                # 用 UPSERT 而不是 INSERT OR REPLACE：REPLACE 删除旧行时不触发删除触发器，总字节数会偏大
+                self.conn.execute(
+                    "INSERT INTO responses (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+                    "expires_at = excluded.expires_at, accessed_at = excluded.accessed_at",
+                    (key, value, len(value), expires_at, now)
+                )
+                self._disk_evict(now)
+
+    def clear(self):
+        """清空缓存（不重置统计）"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if self.conn is not None:
+                self.conn.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, Any]:
+        """命中统计"""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counts)
+            stats["memory_entries"] = len(self._memory)
+            stats["memory_bytes"] = self._memory_bytes
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hits"] = hits
+        stats["hit_rate"] = round(hits / lookups, 4) if lookups else None
+        return stats
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self) -> "ResponseCache":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _memory_put(self, key: str, value: bytes, expires_at: float):
+        if len(value) > self.memory_max_bytes:
+            return
+        self._memory_discard(key)
+        self._memory[key] = (value, expires_at)
+        self._memory_bytes += len(value)
+        while self._memory_bytes > self.memory_max_bytes:
+            _, (old, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old)
+            self._counts["evictions"] += 1
+
+    def _memory_discard(self, key: str):
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= len(entry[0])
+
+    def _disk_total(self) -> int:
+        # 总字节数由触发器随增删改维护，多个进程共用同一个文件时也保持准确
+        return self.conn.execute("SELECT total FROM responses_size WHERE id = 1").fetchone()[0]
+
+    def _disk_evict(self, now: float):
+        """总大小超出容量时先删除过期条目，仍然超出时按访问时间从旧到新删除"""
+        total = self._disk_total()
+        if total <= self.disk_max_bytes:
+            return
+        self.conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        total = self._disk_total()
+        victims = []
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            if total <= self.disk_max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self._counts["evictions"] += len(victims)
@@ -0,0 +1,252 @@
+"""
+模型客户端池模块
+按 (提供商, base_url, API密钥哈希) 复用 OpenAI 客户端：所有同步客户端共享一个 httpx 连接池，
+异步客户端按事件循环共享一个 httpx 异步连接池，避免每个 LLMManager 实例重新建立 TCP/TLS 连接
+"""
+
+import atexit
+import asyncio
+import hashlib
+import threading
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+
+try:
+    import h2
+except ImportError:  # 未安装 httpx[http2] 时只能使用 HTTP/1.1
+    h2 = None
+
+# 连接池的默认参数
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+KEEPALIVE_EXPIRY = 30.0
+
+ClientKey = Tuple[str, str, str]
+
+_settings: Dict[str, Any] = {
+    "max_connections": MAX_CONNECTIONS,
+    "max_keepalive_connections": MAX_KEEPALIVE_CONNECTIONS,
+    "keepalive_expiry": KEEPALIVE_EXPIRY,
+    "http2": False,
+}
+_http_client: Optional[httpx.Client] = None
+_clients: Dict[ClientKey, OpenAI] = {}
+# 事件循环 -> (异步连接池, {客户端键: 异步客户端})；事件循环被回收后对应条目自动移除
+_async_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[httpx.AsyncClient, Dict[ClientKey, AsyncOpenAI]]]" = \
+    weakref.WeakKeyDictionary()
+# 事件循环 -> 已被替换、尚未关闭的异步连接池，由该事件循环中的 aclose_clients 关闭
+_retired_async_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, List[httpx.AsyncClient]]" = \
+    weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+class _TrackedStream(httpx.SyncByteStream):
+    """响应体关闭时通知传输层请求已结束"""
+
+    def __init__(self, stream: httpx.SyncByteStream, release):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            release, self._release = self._release, None
+            if release is not None:
+                release()
+
+
+class _TrackedTransport(httpx.BaseTransport):
+    """
+    记录在途请求数的传输层
+
+    连接池被替换后调用 retire：没有在途请求时立即关闭，否则在最后一个请求结束后关闭，
+    其他线程中正在进行的请求不会因连接池被关闭而失败。
+    """
+
+    def __init__(self, transport: httpx.BaseTransport):
+        self._transport = transport
+        self._active = 0
+        self._retired = False
+        self._lock = threading.Lock()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with self._lock:
+            self._active += 1
+        try:
+            response = self._transport.handle_request(request)
+        except BaseException:
+            self._release()
+            raise
+        response.stream = _TrackedStream(response.stream, self._release)
+        return response
+
+    def retire(self):
+        with self._lock:
+            self._retired = True
+            idle = self._active == 0
+        if idle:
+            self._transport.close()
+
+    def close(self):
+        self.retire()
+
+    def _release(self):
+        with self._lock:
+            self._active -= 1
+            idle = self._retired and self._active == 0
+        if idle:
+            self._transport.close()
+
+
+def client_key(provider: str, base_url: str, api_key: str) -> ClientKey:
+    """客户端键，API密钥只保存哈希值"""
+    return provider, base_url, hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+def _pool_options() -> Dict[str, Any]:
+    return {
+        "limits": httpx.Limits(
+            max_connections=_settings["max_connections"],
+            max_keepalive_connections=_settings["max_keepalive_connections"],
+            keepalive_expiry=_settings["keepalive_expiry"],
+        ),
+        "http2": _settings["http2"],
+    }
+
+
+def _new_http_client() -> httpx.Client:
+    options = _pool_options()
+    transport = httpx.HTTPTransport(limits=options["limits"], http2=options["http2"])
+    return DefaultHttpxClient(transport=_TrackedTransport(transport), **options)
+
+
+def _retire_pools() -> Optional[httpx.Client]:
+    # 调用方持有 _lock；返回被替换的同步连接池，由调用方在锁外关闭
+    global _http_client
+    http_client = _http_client
+    _http_client = None
+    _clients.clear()
+    # 其他事件循环中的异步连接池不能在这里关闭，保留到各自的 aclose_clients
+    for loop, (async_client, _) in list(_async_pools.items()):
+        _retired_async_pools.setdefault(loop, []).append(async_client)
+    _async_pools.clear()
+    return http_client
+
+
+def configure_clients(max_connections: Optional[int] = None, max_keepalive_connections: Optional[int] = None,
+                      keepalive_expiry: Optional[float] = None, http2: Optional[bool] = None):
+    """
+    设置共享连接池的参数
+
+    之后获取的客户端使用新的参数；原有的同步连接池在其中的请求全部结束后关闭，
+    异步连接池由各事件循环中的 aclose_clients 关闭。
+
+    Args:
+        max_connections: 最大连接数
+        max_keepalive_connections: 最多保持的空闲连接数
+        keepalive_expiry: 空闲连接的保持时间（秒）
+        http2: 是否启用HTTP/2（需要安装 h2）
+    """
+    if http2 and h2 is None:
+        raise ValueError("启用HTTP/2需要安装 h2: pip install httpx[http2]")
+    updates = {
+        "max_connections": max_connections,
+        "max_keepalive_connections": max_keepalive_connections,
+        "keepalive_expiry": keepalive_expiry,
+        "http2": http2,
+    }
+    global _http_client
+    with _lock:
+        _settings.update({name: value for name, value in updates.items() if value is not None})
+        old_client = _retire_pools()
+        # 先换上新的连接池再关闭旧的，不会出现没有可用连接池的间隙
+        _http_client = _new_http_client()
+    if old_client is not None:
+        old_client.close()
+
+
+def get_client(provider: str, base_url: str, api_key: str) -> OpenAI:
+    """
+    获取共享的同步客户端
+
+    返回的客户端由所有调用方共享，不要单独关闭，统一使用 close_clients。
+
+    Args:
+        provider: 模型提供商
+        base_url: 接口地址
+        api_key: API密钥
+
+    Returns:
+        OpenAI 客户端
+    """
+    global _http_client
+    key = client_key(provider, base_url, api_key)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            if _http_client is None:
+                _http_client = _new_http_client()
+            client = OpenAI(api_key=api_key, base_url=base_url, http_client=_http_client)
+            _clients[key] = client
+        return client
+
+
+def get_async_client(provider: str, base_url: str, api_key: str) -> AsyncOpenAI:
+    """
+    获取当前事件循环中共享的异步客户端
+
+    异步连接池中的连接属于创建它的事件循环，每个事件循环使用各自的连接池。
+
+    Args:
+        provider: 模型提供商
+        base_url: 接口地址
+        api_key: API密钥
+
+    Returns:
+        AsyncOpenAI 客户端
+    """
+    loop = asyncio.get_running_loop()
+    key = client_key(provider, base_url, api_key)
+    with _lock:
+        pool = _async_pools.get(loop)
+        if pool is None:
+            pool = (DefaultAsyncHttpxClient(**_pool_options()), {})
+            _async_pools[loop] = pool
+        http_client, clients = pool
+        client = clients.get(key)
+        if client is None:
+            client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+            clients[key] = client
+        return client
+
+
+async def aclose_clients():
+    """关闭当前事件循环中的异步客户端、已被替换的异步连接池（在事件循环结束前调用）"""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        pool = _async_pools.pop(loop, None)
+        http_clients = _retired_async_pools.pop(loop, [])
+    if pool is not None:
+        http_clients.append(pool[0])
+    for http_client in http_clients:
+        await http_client.aclose()
+
+
+@atexit.register
+def close_clients():
+    """
+    关闭同步客户端的连接池并清空客户端缓存，之后获取客户端时重新创建
+
+    连接池中仍有在途请求时，在这些请求结束后关闭。
+    """
+    with _lock:
+        http_client = _retire_pools()
+    if http_client is not None:
+        http_client.close()
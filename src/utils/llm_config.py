@@ -0,0 +1,293 @@
+"""
+模型配置模块
+进程内只解析一次 config/config.yaml 并缓存结果，文件修改时间变化或收到 SIGHUP 时重新加载，
+提供经过校验的 default_provider、default_model、api_keys、model_params 和 rate_limits
+"""
+
+import os
+import re
+import time
+import signal
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+import yaml
+
+# 项目的配置目录和配置文件
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "config")
+CONFIG_PATH = os.path.join(CONFIG_DIR, "config.yaml")
+
+# 两次检查配置文件修改时间的最小间隔（秒），间隔内直接返回缓存的配置
+CHECK_INTERVAL = 1.0
+
+# 示例配置中的占位密钥，视为未配置
+PLACEHOLDER_KEY = re.compile(r"^YOUR_\w*API_KEY$")
+
+
+class ConfigError(ValueError):
+    """配置文件无法解析或取值不合法"""
+
+
+@dataclass(frozen=True)
+class ModelParams:
+    """调用模型时的默认参数"""
+    temperature: Optional[float] = None
+    max_tokens: Optional[int] = None
+    top_p: Optional[float] = None
+    # 其他参数，原样传给接口
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    def as_kwargs(self) -> Dict[str, Any]:
+        """已设置的参数"""
+        params = {name: getattr(self, name) for name in ("temperature", "max_tokens", "top_p")}
+        return {**{k: v for k, v in params.items() if v is not None}, **self.extra}
+
+
+@dataclass(frozen=True)
+class RateLimits:
+    """单个 (提供商, 模型) 的速率限制"""
+    # 每分钟请求数和令牌数，为None时不限制
+    rpm: Optional[float] = None
+    tpm: Optional[float] = None
+    # 并发上限的调整范围，初始为 max_concurrency
+    max_concurrency: int = 16
+    min_concurrency: int = 1
+    # 收到429或5xx后重新排队的次数
+    retries: int = 2
+
+
+@dataclass(frozen=True)
+class LLMConfig:
+    """模型配置（不要修改其中的字典）"""
+    default_provider: str = "openai"
+    default_model: str = "gpt-4o-mini"
+    # 提供商 -> API密钥，不含空值和占位密钥
+    api_keys: Dict[str, str] = field(default_factory=dict)
+    model_params: ModelParams = field(default_factory=ModelParams)
+    # (提供商, 模型) -> 速率限制，模型为None的条目是提供商的默认限制
+    rate_limits: Dict[Tuple[str, Optional[str]], RateLimits] = field(default_factory=dict)
+
+    def api_key(self, provider: str) -> Optional[str]:
+        """提供商的API密钥，未配置时返回None"""
+        return self.api_keys.get(provider)
+
+    def rate_limits_for(self, provider: str, model: str) -> Optional[RateLimits]:
+        """模型的速率限制（没有单独配置时使用提供商的限制），未配置时返回None"""
+        return self.rate_limits.get((provider, model)) or self.rate_limits.get((provider, None))
+
+
+def _number(params: Dict[str, Any], name: str, low: float, high: float) -> Optional[float]:
+    value = params.pop(name, None)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not low <= value <= high:
+        raise ConfigError(f"model_params.{name} 必须是 {low} 到 {high} 之间的数字: {value!r}")
+    return float(value)
+
+
+def _parse_rate_limits(name: str, values: Any, base: RateLimits) -> RateLimits:
+    if not isinstance(values, dict):
+        raise ConfigError(f"rate_limits.{name} 必须是映射")
+    fields = {}
+    for key in ("rpm", "tpm"):
+        value = values.get(key, getattr(base, key))
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0):
+            raise ConfigError(f"rate_limits.{name}.{key} 必须是正数: {value!r}")
+        fields[key] = value
+    for key, low in (("max_concurrency", 1), ("min_concurrency", 1), ("retries", 0)):
+        value = values.get(key, getattr(base, key))
+        if isinstance(value, bool) or not isinstance(value, int) or value < low:
+            raise ConfigError(f"rate_limits.{name}.{key} 必须是不小于 {low} 的整数: {value!r}")
+        fields[key] = value
+    if fields["min_concurrency"] > fields["max_concurrency"]:
+        raise ConfigError(f"rate_limits.{name}.min_concurrency 不能大于 max_concurrency")
+    return RateLimits(**fields)
+
+
+def parse_config(data: Any) -> LLMConfig:
+    """
+    校验配置文件内容
+
+    Args:
+        data: yaml.safe_load 的结果
+
+    Returns:
+        模型配置
+    """
+    if data is None:
+        return LLMConfig()
+    if not isinstance(data, dict):
+        raise ConfigError("配置文件的顶层必须是映射")
+
+    defaults = LLMConfig()
+    values = {}
+    for name in ("default_provider", "default_model"):
+        value = data.get(name)
+        if value is None:
+            value = getattr(defaults, name)
+        if not isinstance(value, str) or not value.strip():
+            raise ConfigError(f"{name} 必须是非空字符串: {value!r}")
+        values[name] = value.strip()
+
+    api_keys = data.get("api_keys") or {}
+    if not isinstance(api_keys, dict):
+        raise ConfigError("api_keys 必须是 提供商: 密钥 的映射")
+    keys = {}
+    for provider, key in api_keys.items():
+        if key is None:
+            continue
+        if not isinstance(key, str):
+            raise ConfigError(f"api_keys.{provider} 必须是字符串")
+        key = key.strip()
+        if key and not PLACEHOLDER_KEY.match(key):
+            keys[str(provider)] = key
+
+    params = data.get("model_params") or {}
+    if not isinstance(params, dict):
+        raise ConfigError("model_params 必须是映射")
+    params = dict(params)
+    temperature = _number(params, "temperature", 0, 2)
+    top_p = _number(params, "top_p", 0, 1)
+    max_tokens = params.pop("max_tokens", None)
+    if max_tokens is not None and (isinstance(max_tokens, bool) or not isinstance(max_tokens, int) or max_tokens < 1):
+        raise ConfigError(f"model_params.max_tokens 必须是正整数: {max_tokens!r}")
+
+    rate_limits = {}
+    providers = data.get("rate_limits") or {}
+    if not isinstance(providers, dict):
+        raise ConfigError("rate_limits 必须是 提供商: 限制 的映射")
+    for provider, provider_limits in providers.items():
+        provider = str(provider)
+        limits = _parse_rate_limits(provider, provider_limits, RateLimits())
+        rate_limits[(provider, None)] = limits
+        models = provider_limits.get("models") or {}
+        if not isinstance(models, dict):
+            raise ConfigError(f"rate_limits.{provider}.models 必须是 模型: 限制 的映射")
+        # 模型的限制未设置的项继承提供商的限制
+        for model, model_values in models.items():
+            rate_limits[(provider, str(model))] = _parse_rate_limits(f"{provider}.models.{model}", model_values, limits)
+
+    return LLMConfig(
+        api_keys=keys,
+        rate_limits=rate_limits,
+        model_params=ModelParams(temperature=temperature, max_tokens=max_tokens, top_p=top_p, extra=params),
+        **values
+    )
+
+
+class ConfigService:
+    """
+    缓存的配置文件
+
+    读取时最多每 check_interval 秒检查一次文件的修改时间，变化时重新解析；
+    重新加载失败时保留之前的配置，错误记录在 error 中。
+    """
+
+    def __init__(self, path: str = CONFIG_PATH, check_interval: float = CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        # 解析次数和最近一次重新加载失败的原因
+        self.loads = 0
+        self.error: Optional[str] = None
+        self._config: Optional[LLMConfig] = None
+        self._version: Optional[Tuple[int, int, int]] = None
+        self._next_check = 0.0
+        self._reload_requested = False
+        self._lock = threading.Lock()
+
+    def get(self) -> LLMConfig:
+        """当前配置"""
+        config = self._config
+        if config is not None and not self._reload_requested and time.monotonic() < self._next_check:
+            return config
+        return self._refresh(force=False)
+
+    def reload(self) -> LLMConfig:
+        """立即重新解析配置文件"""
+        return self._refresh(force=True)
+
+    def request_reload(self):
+        """下次读取时重新解析配置文件（可在信号处理函数中调用）"""
+        self._reload_requested = True
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _refresh(self, force: bool) -> LLMConfig:
+        with self._lock:
+            force = force or self._reload_requested
+            self._reload_requested = False
+            self._next_check = time.monotonic() + self.check_interval
+            version = self._stat()
+            if self._config is not None and not force and version == self._version:
+                return self._config
+            try:
+                config = self._parse(version)
+            except ConfigError as e:
+                # 首次加载失败时抛出异常，重新加载失败时继续使用之前的配置
+                if self._config is None:
+                    raise
+                self.error = str(e)
+                return self._config
+            self._config, self._version, self.error = config, version, None
+            return config
+
+    def _parse(self, version: Optional[Tuple[int, int, int]]) -> LLMConfig:
+        self.loads += 1
+        if version is None:
+            return LLMConfig()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = yaml.safe_load(f)
+        except FileNotFoundError:
+            return LLMConfig()
+        except (OSError, yaml.YAMLError) as e:
+            raise ConfigError(f"无法读取配置文件 {self.path}: {e}")
+        return parse_config(data)
+
+
+_service: Optional[ConfigService] = None
+_service_lock = threading.Lock()
+
+
+def get_config_service() -> ConfigService:
+    """进程内共享的配置服务，首次获取时在主线程中安装 SIGHUP 处理函数"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = ConfigService()
+                install_reload_signal()
+    return _service
+
+
+def get_llm_config() -> LLMConfig:
+    """当前的模型配置"""
+    return get_config_service().get()
+
+
+def install_reload_signal() -> bool:
+    """
+    收到 SIGHUP 时重新加载配置
+
+    只在主线程中、且 SIGHUP 未被其他代码处理时安装。
+
+    Returns:
+        是否已安装
+    """
+    if not hasattr(signal, "SIGHUP") or threading.current_thread() is not threading.main_thread():
+        return False
+    if signal.getsignal(signal.SIGHUP) not in (signal.SIG_DFL, None):
+        return False
+
+    def handle(signum, frame):
+        if _service is not None:
+            _service.request_reload()
+
+    signal.signal(signal.SIGHUP, handle)
+    return True
@@ -0,0 +1,115 @@
+"""
+流式响应模块
+逐块处理 chat.completion.chunk：提取文本增量，累计用量，记录首个令牌时间、每秒令牌数和总耗时
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class StreamMetrics:
+    """一次流式调用的指标（时间单位为秒）"""
+    provider: Optional[str] = None
+    model: Optional[str] = None
+    started_at: float = field(default_factory=time.perf_counter)
+    # 首个文本增量到达的时间、结束时间（perf_counter）
+    first_token_at: Optional[float] = None
+    ended_at: Optional[float] = None
+    chunks: int = 0
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    total_tokens: Optional[int] = None
+    # 提供商没有返回用量时，completion_tokens 按含文本的块数估算
+    usage_estimated: bool = False
+    finish_reason: Optional[str] = None
+    content_parts: List[str] = field(default_factory=list, repr=False)
+
+    @property
+    def content(self) -> str:
+        """已收到的全部文本"""
+        return "".join(self.content_parts)
+
+    @property
+    def ttft(self) -> Optional[float]:
+        """首个令牌时间"""
+        return None if self.first_token_at is None else self.first_token_at - self.started_at
+
+    @property
+    def latency(self) -> Optional[float]:
+        """总耗时"""
+        return None if self.ended_at is None else self.ended_at - self.started_at
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """首个令牌之后的生成速度"""
+        if self.ended_at is None or self.first_token_at is None or not self.completion_tokens:
+            return None
+        elapsed = self.ended_at - self.first_token_at
+        return self.completion_tokens / elapsed if elapsed > 0 else None
+
+    def observe(self, chunk: Any) -> Optional[str]:
+        """
+        记录一个响应块
+
+        Args:
+            chunk: ChatCompletionChunk
+
+        Returns:
+            块中的文本增量，没有文本时返回None
+        """
+        self.chunks += 1
+        self._observe_usage(getattr(chunk, "usage", None))
+        text = None
+        for choice in getattr(chunk, "choices", None) or []:
+            if choice.index != 0:
+                continue
+            if choice.finish_reason:
+                self.finish_reason = choice.finish_reason
+            # 部分提供商（如 moonshot）把用量放在最后一个 choice 中
+            self._observe_usage(getattr(choice, "usage", None))
+            delta = choice.delta
+            if delta is not None and delta.content:
+                text = delta.content
+        if text:
+            if self.first_token_at is None:
+                self.first_token_at = time.perf_counter()
+            self.content_parts.append(text)
+        return text
+
+    def finish(self):
+        """结束计时；没有收到用量时估算生成的令牌数"""
+        if self.ended_at is None:
+            self.ended_at = time.perf_counter()
+        if self.completion_tokens is None:
+            self.completion_tokens = len(self.content_parts)
+            self.usage_estimated = True
+
+    def _observe_usage(self, usage: Any):
+        if not usage:
+            return
+        if not isinstance(usage, dict):
+            usage = usage.model_dump() if hasattr(usage, "model_dump") else vars(usage)
+        for name in ("prompt_tokens", "completion_tokens", "total_tokens"):
+            if usage.get(name) is not None:
+                setattr(self, name, usage[name])
+
+    def as_dict(self) -> Dict[str, Any]:
+        """指标摘要"""
+        def rounded(value):
+            return None if value is None else round(value, 4)
+
+        return {
+            "provider": self.provider,
+            "model": self.model,
+            "ttft_seconds": rounded(self.ttft),
+            "latency_seconds": rounded(self.latency),
+            "tokens_per_second": rounded(self.tokens_per_second),
+            "chunks": self.chunks,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "usage_estimated": self.usage_estimated,
+            "finish_reason": self.finish_reason,
+        }
@@ -0,0 +1,33 @@
+"""
+分页游标模块
+把键集分页的最后位置和查询参数指纹编码为不透明游标
+"""
+
+import json
+import base64
+import hashlib
+from typing import Any
+
+
+def query_fingerprint(*parts: Any) -> str:
+    """计算查询参数的指纹，用于校验游标是否属于同一查询"""
+    return hashlib.sha1(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def encode_cursor(fingerprint: str, last_key: list) -> str:
+    """将分页位置编码为不透明游标"""
+    payload = json.dumps({"q": fingerprint, "k": last_key}, ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, fingerprint: str) -> list:
+    """解析游标，并校验其是否属于当前查询"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        last_key = payload["k"]
+        cursor_fingerprint = payload["q"]
+    except Exception:
+        raise ValueError("无效的分页游标")
+    if cursor_fingerprint != fingerprint:
+        raise ValueError("分页游标与当前查询参数不匹配")
+    return last_key
@@ -0,0 +1,609 @@
+"""
+PPTX写入模块
+模板的母版、版式和主题只解析一次并缓存为预压缩的基础压缩包，
+每次生成演示文稿时只序列化新的幻灯片XML
+"""
+
+import io
+import os
+import re
+import uuid
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+from src.utils.docx_writer import _INVALID_XML_CHARS
+
+# 模板缓存容量
+TEMPLATE_CACHE_SIZE = 8
+
+NS_P = "http://schemas.openxmlformats.org/presentationml/2006/main"
+NS_A = "http://schemas.openxmlformats.org/drawingml/2006/main"
+NS_R = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_RELS = "http://schemas.openxmlformats.org/package/2006/relationships"
+NS_CT = "http://schemas.openxmlformats.org/package/2006/content-types"
+
+REL_SLIDE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/slide"
+REL_SLIDE_LAYOUT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/slideLayout"
+REL_SLIDE_MASTER = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/slideMaster"
+REL_NOTES_SLIDE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/notesSlide"
+REL_THEME = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/theme"
+REL_PRES_PROPS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/presProps"
+REL_VIEW_PROPS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/viewProps"
+REL_TABLE_STYLES = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/tableStyles"
+REL_OFFICE_DOCUMENT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+
+CT_PRESENTATION = "application/vnd.openxmlformats-officedocument.presentationml.presentation.main+xml"
+CT_SLIDE = "application/vnd.openxmlformats-officedocument.presentationml.slide+xml"
+CT_SLIDE_LAYOUT = "application/vnd.openxmlformats-officedocument.presentationml.slideLayout+xml"
+CT_SLIDE_MASTER = "application/vnd.openxmlformats-officedocument.presentationml.slideMaster+xml"
+CT_THEME = "application/vnd.openxmlformats-officedocument.theme+xml"
+CT_PRES_PROPS = "application/vnd.openxmlformats-officedocument.presentationml.presProps+xml"
+CT_VIEW_PROPS = "application/vnd.openxmlformats-officedocument.presentationml.viewProps+xml"
+CT_TABLE_STYLES = "application/vnd.openxmlformats-officedocument.presentationml.tableStyles+xml"
+CT_RELS = "application/vnd.openxmlformats-package.relationships+xml"
+
+_XML_DECL = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+_NS_DECL = f'xmlns:a="{NS_A}" xmlns:r="{NS_R}" xmlns:p="{NS_P}"'
+
+_SP_TREE_HEAD = (
+    '<p:nvGrpSpPr><p:cNvPr id="1" name=""/><p:cNvGrpSpPr/><p:nvPr/></p:nvGrpSpPr>'
+    '<p:grpSpPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="0" cy="0"/>'
+    '<a:chOff x="0" y="0"/><a:chExt cx="0" cy="0"/></a:xfrm></p:grpSpPr>'
+)
+
+_SLD_ID_LST = re.compile(r"<(?:\w+:)?sldIdLst\b[^>]*?(?:/>|>.*?</(?:\w+:)?sldIdLst>)", re.S)
+_CUST_SHOW_LST = re.compile(r"<(?:\w+:)?custShowLst\b[^>]*?(?:/>|>.*?</(?:\w+:)?custShowLst>)", re.S)
+_SLD_SZ = re.compile(r"<(?:\w+:)?(?:sldSz|notesSz)\b")
+_ROOT_PREFIX = re.compile(r"<(?:(\w+):)?presentation\b")
+_SLIDE_PART = re.compile(r"^ppt/slides/slide\d+\.xml$")
+
+
+@dataclass
+class LayoutInfo:
+    """幻灯片版式信息"""
+    name: str
+    part_name: str
+    layout_type: str
+    # 占位符 (type, idx) 列表，按版式中的出现顺序排列
+    placeholders: List[Tuple[str, Optional[str]]] = field(default_factory=list)
+
+    def title_placeholder(self) -> Optional[Tuple[str, Optional[str]]]:
+        for ph in self.placeholders:
+            if ph[0] in ("title", "ctrTitle"):
+                return ph
+        return None
+
+    def body_placeholder(self) -> Optional[Tuple[str, Optional[str]]]:
+        for ph in self.placeholders:
+            if ph[0] in ("body", "subTitle", "obj"):
+                return ph
+        return None
+
+
+@dataclass
+class PresentationTemplate:
+    """解析后的演示文稿模板"""
+    # 不含幻灯片及聚合部件的预压缩基础压缩包
+    base_archive: bytes
+    presentation_head: str
+    presentation_tail: str
+    slide_prefix: str
+    rel_prefix: str
+    relationships: List[Tuple[str, str, str, Optional[str]]]
+    next_rel_id: int
+    content_defaults: List[Tuple[str, str]]
+    content_overrides: List[Tuple[str, str]]
+    layouts: List[LayoutInfo]
+
+    def find_layout(self, name: Optional[str] = None) -> LayoutInfo:
+        """
+        查找版式
+
+        Args:
+            name: 版式名称（不区分大小写），为None时返回默认的"标题和内容"版式
+
+        Returns:
+            版式信息
+        """
+        if name:
+            for layout in self.layouts:
+                if layout.name.lower() == name.lower():
+                    return layout
+            raise ValueError(f"模板中不存在版式: {name}")
+        for layout in self.layouts:
+            if layout.layout_type == "obj":
+                return layout
+        for layout in self.layouts:
+            if layout.title_placeholder() and layout.body_placeholder():
+                return layout
+        return self.layouts[0]
+
+    def presentation_xml(self, slide_count: int) -> str:
+        p = self.slide_prefix
+        ids = "".join(
+            f'<{p}sldId id="{256 + i}" {self.rel_prefix}id="rId{self.next_rel_id + i}"/>'
+            for i in range(slide_count)
+        )
+        slide_list = f"<{p}sldIdLst>{ids}</{p}sldIdLst>" if slide_count else ""
+        return self.presentation_head + slide_list + self.presentation_tail
+
+    def presentation_rels_xml(self, slide_count: int) -> str:
+        rels = [_relationship_xml(*rel) for rel in self.relationships]
+        rels.extend(
+            _relationship_xml(f"rId{self.next_rel_id + i}", REL_SLIDE, f"slides/slide{i + 1}.xml")
+            for i in range(slide_count)
+        )
+        return f'{_XML_DECL}<Relationships xmlns="{NS_RELS}">{"".join(rels)}</Relationships>'
+
+    def content_types_xml(self, slide_count: int) -> str:
+        parts = [
+            f"<Default Extension={quoteattr(ext)} ContentType={quoteattr(ct)}/>"
+            for ext, ct in self.content_defaults
+        ]
+        parts.extend(
+            f"<Override PartName={quoteattr(name)} ContentType={quoteattr(ct)}/>"
+            for name, ct in self.content_overrides
+        )
+        parts.extend(
+            f'<Override PartName="/ppt/slides/slide{i + 1}.xml" ContentType="{CT_SLIDE}"/>'
+            for i in range(slide_count)
+        )
+        return f'{_XML_DECL}<Types xmlns="{NS_CT}">{"".join(parts)}</Types>'
+
+
+def _relationship_xml(rel_id: str, rel_type: str, target: str, target_mode: Optional[str] = None) -> str:
+    mode = f" TargetMode={quoteattr(target_mode)}" if target_mode else ""
+    return f"<Relationship Id={quoteattr(rel_id)} Type={quoteattr(rel_type)} Target={quoteattr(target)}{mode}/>"
+
+
+def _rels_path(part_name: str) -> str:
+    directory, name = posixpath.split(part_name)
+    return posixpath.join(directory, "_rels", f"{name}.rels")
+
+
+def _resolve_target(part_name: str, target: str) -> str:
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(part_name), target))
+
+
+def _read_relationships(archive: zipfile.ZipFile, part_name: str) -> List[Tuple[str, str, str, Optional[str]]]:
+    rels_name = _rels_path(part_name)
+    if rels_name not in archive.namelist():
+        return []
+    root = ET.fromstring(archive.read(rels_name))
+    return [
+        (rel.get("Id"), rel.get("Type"), rel.get("Target"), rel.get("TargetMode"))
+        for rel in root.iter(f"{{{NS_RELS}}}Relationship")
+    ]
+
+
+def _parse_layout(part_name: str, data: bytes) -> LayoutInfo:
+    root = ET.fromstring(data)
+    c_sld = root.find(f"{{{NS_P}}}cSld")
+    name = c_sld.get("name", "") if c_sld is not None else ""
+    placeholders = []
+    for ph in root.iter(f"{{{NS_P}}}ph"):
+        placeholders.append((ph.get("type", "obj"), ph.get("idx")))
+    return LayoutInfo(
+        name=name or posixpath.basename(part_name),
+        part_name=part_name,
+        layout_type=root.get("type", "cust"),
+        placeholders=placeholders,
+    )
+
+
+def parse_template(data: bytes) -> PresentationTemplate:
+    """
+    解析演示文稿模板（.pptx/.potx）
+
+    模板中已有的幻灯片会被丢弃，其余部件按原样放入预压缩的基础压缩包。
+
+    Args:
+        data: 模板文件内容
+
+    Returns:
+        解析后的模板
+    """
+    with zipfile.ZipFile(io.BytesIO(data)) as src:
+        names = set(src.namelist())
+        if "ppt/presentation.xml" not in names:
+            raise ValueError("模板缺少 ppt/presentation.xml")
+
+        # 丢弃已有幻灯片及其备注页
+        dropped = {"[Content_Types].xml", "ppt/presentation.xml", "ppt/_rels/presentation.xml.rels"}
+        kept_rels = []
+        for rel in _read_relationships(src, "ppt/presentation.xml"):
+            rel_type, target = rel[1], rel[2]
+            if rel_type == REL_SLIDE:
+                slide_part = _resolve_target("ppt/presentation.xml", target)
+                dropped.update((slide_part, _rels_path(slide_part)))
+                for _, slide_rel_type, slide_target, _ in _read_relationships(src, slide_part):
+                    if slide_rel_type == REL_NOTES_SLIDE:
+                        notes_part = _resolve_target(slide_part, slide_target)
+                        dropped.update((notes_part, _rels_path(notes_part)))
+            else:
+                kept_rels.append(rel)
+        # 未被引用的残留幻灯片部件也一并丢弃，避免与新幻灯片重名
+        dropped.update(name for name in names if _SLIDE_PART.match(name))
+        dropped.update(_rels_path(name) for name in names if _SLIDE_PART.match(name))
+
+        rel_numbers = [int(rel_id[3:]) for rel_id, *_ in kept_rels if re.fullmatch(r"rId\d+", rel_id)]
+        next_rel_id = max(rel_numbers, default=0) + 1
+
+        # 内容类型
+        types_root = ET.fromstring(src.read("[Content_Types].xml"))
+        content_defaults = [
+            (item.get("Extension"), item.get("ContentType"))
+            for item in types_root.iter(f"{{{NS_CT}}}Default")
+        ]
+        content_overrides = []
+        for item in types_root.iter(f"{{{NS_CT}}}Override"):
+            part_name = item.get("PartName")
+            if part_name.lstrip("/") in dropped and part_name != "/ppt/presentation.xml":
+                continue
+            content_type = item.get("ContentType")
+            if part_name == "/ppt/presentation.xml":
+                # .potx 模板的主部件类型需要改为演示文稿
+                content_type = CT_PRESENTATION
+            content_overrides.append((part_name, content_type))
+
+        # 版式
+        layouts = []
+        layout_names = sorted(
+            (name for name in names if re.match(r"^ppt/slideLayouts/slideLayout\d+\.xml$", name)),
+            key=lambda name: int(re.search(r"(\d+)\.xml$", name).group(1)),
+        )
+        for name in layout_names:
+            layouts.append(_parse_layout(name, src.read(name)))
+        if not layouts:
+            raise ValueError("模板中没有幻灯片版式")
+
+        # presentation.xml 拆分为幻灯片列表前后两段
+        presentation = src.read("ppt/presentation.xml").decode("utf-8")
+        presentation = _CUST_SHOW_LST.sub("", _SLD_ID_LST.sub("", presentation))
+        match = _SLD_SZ.search(presentation)
+        if match is None:
+            raise ValueError("presentation.xml 缺少 sldSz 元素")
+        prefix_match = _ROOT_PREFIX.search(presentation)
+        slide_prefix = f"{prefix_match.group(1)}:" if prefix_match and prefix_match.group(1) else ""
+        rel_prefix_match = re.search(rf'xmlns:(\w+)="{re.escape(NS_R)}"', presentation)
+        rel_prefix = f"{rel_prefix_match.group(1)}:" if rel_prefix_match else "r:"
+
+        # 静态部件只压缩一次
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as base:
+            for info in src.infolist():
+                if info.filename in dropped or info.is_dir():
+                    continue
+                base.writestr(info.filename, src.read(info.filename))
+
+    return PresentationTemplate(
+        base_archive=buffer.getvalue(),
+        presentation_head=presentation[:match.start()],
+        presentation_tail=presentation[match.start():],
+        slide_prefix=slide_prefix,
+        rel_prefix=rel_prefix,
+        relationships=kept_rels,
+        next_rel_id=next_rel_id,
+        content_defaults=content_defaults,
+        content_overrides=content_overrides,
+        layouts=layouts,
+    )
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _load_template_cached(template_path: Optional[str], mtime_ns: int, size: int) -> PresentationTemplate:
+    # mtime_ns 与 size 只参与缓存键，文件变化后自动使用新条目
+    if template_path is None:
+        return parse_template(build_default_template())
+    with open(template_path, "rb") as f:
+        return parse_template(f.read())
+
+
+def load_template(template_path: Optional[str] = None) -> PresentationTemplate:
+    """
+    加载模板，文件修改时间或大小变化时重新解析
+
+    Args:
+        template_path: 模板文件路径，为None时使用内置默认模板
+
+    Returns:
+        解析后的模板
+    """
+    if template_path is None:
+        return _load_template_cached(None, 0, 0)
+    template_path = os.path.realpath(template_path)
+    stat = os.stat(template_path)
+    return _load_template_cached(template_path, stat.st_mtime_ns, stat.st_size)
+
+
+def clear_template_cache():
+    """清空模板缓存"""
+    _load_template_cached.cache_clear()
+
+
+def _text_body_xml(lines: List[str]) -> str:
+    paragraphs = []
+    for line in lines:
+        # 去掉XML 1.0不允许的控制字符，否则生成的幻灯片无法解析
+        line = _INVALID_XML_CHARS.sub("", line)
+        if line:
+            paragraphs.append(f'<a:p><a:r><a:rPr lang="zh-CN" altLang="en-US"/><a:t>{escape(line)}</a:t></a:r></a:p>')
+        else:
+            paragraphs.append("<a:p/>")
+    return f'<p:txBody><a:bodyPr/><a:lstStyle/>{"".join(paragraphs) or "<a:p/>"}</p:txBody>'
+
+
+def _placeholder_sp_xml(shape_id: int, name: str, ph: Tuple[str, Optional[str]], lines: List[str]) -> str:
+    ph_type, ph_idx = ph
+    attrs = ""
+    if ph_type != "obj":
+        attrs += f' type="{ph_type}"'
+    if ph_idx is not None:
+        attrs += f' idx="{ph_idx}"'
+    return (
+        f'<p:sp><p:nvSpPr><p:cNvPr id="{shape_id}" name="{name}"/>'
+        f'<p:cNvSpPr><a:spLocks noGrp="1"/></p:cNvSpPr><p:nvPr><p:ph{attrs}/></p:nvPr></p:nvSpPr>'
+        f'<p:spPr/>{_text_body_xml(lines)}</p:sp>'
+    )
+
+
+def _content_lines(content: Any) -> List[str]:
+    if content is None:
+        return []
+    if isinstance(content, (list, tuple)):
+        return [str(item) for item in content]
+    return str(content).splitlines()
+
+
+def slide_xml(layout: LayoutInfo, title: Any = None, content: Any = None) -> str:
+    """
+    生成幻灯片XML
+
+    Args:
+        layout: 幻灯片使用的版式
+        title: 标题
+        content: 正文，字符串按行拆分为段落，列表的每个元素为一个段落
+
+    Returns:
+        幻灯片XML
+    """
+    shapes = []
+    shape_id = 2
+    title_ph = layout.title_placeholder()
+    if title_ph and title is not None:
+        shapes.append(_placeholder_sp_xml(shape_id, "Title 1", title_ph, [str(title)]))
+        shape_id += 1
+    body_ph = layout.body_placeholder()
+    lines = _content_lines(content)
+    if body_ph and lines:
+        shapes.append(_placeholder_sp_xml(shape_id, f"Content Placeholder {shape_id - 1}", body_ph, lines))
+    return (
+        f'{_XML_DECL}<p:sld {_NS_DECL}><p:cSld><p:spTree>{_SP_TREE_HEAD}'
+        f'{"".join(shapes)}</p:spTree></p:cSld>'
+        '<p:clrMapOvr><a:masterClrMapping/></p:clrMapOvr></p:sld>'
+    )
+
+
+def write_pptx(file_path: str, slides: Iterable[Dict[str, Any]],
+               template_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    基于模板生成PPTX文件
+
+    Args:
+        file_path: 输出文件路径
+        slides: 幻灯片数据，每个元素包含"title"、"content"以及可选的"layout"（版式名称）
+        template_path: 模板文件路径，为None时使用内置默认模板
+
+    Returns:
+        写入统计信息
+    """
+    template = load_template(template_path)
+    # 先写入同目录下的临时文件，成功后再替换，版式不存在等错误不会留下损坏的文件
+    temp_path = os.path.join(os.path.dirname(os.path.abspath(file_path)),
+                             f".{os.path.basename(file_path)}.{uuid.uuid4().hex}.part")
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(template.base_archive)
+
+        slide_count = 0
+        with zipfile.ZipFile(temp_path, "a", zipfile.ZIP_DEFLATED) as zf:
+            for slide in slides:
+                slide_count += 1
+                layout = template.find_layout(slide.get("layout"))
+                zf.writestr(f"ppt/slides/slide{slide_count}.xml",
+                            slide_xml(layout, slide.get("title"), slide.get("content")))
+                target = posixpath.relpath(layout.part_name, "ppt/slides")
+                zf.writestr(
+                    f"ppt/slides/_rels/slide{slide_count}.xml.rels",
+                    f'{_XML_DECL}<Relationships xmlns="{NS_RELS}">'
+                    f'{_relationship_xml("rId1", REL_SLIDE_LAYOUT, target)}</Relationships>',
+                )
+            zf.writestr("ppt/presentation.xml", template.presentation_xml(slide_count))
+            zf.writestr("ppt/_rels/presentation.xml.rels", template.presentation_rels_xml(slide_count))
+            zf.writestr("[Content_Types].xml", template.content_types_xml(slide_count))
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return {"slides": slide_count}
+
+
+# ---------------------------------------------------------------------------
+# 内置默认模板
+# ---------------------------------------------------------------------------
+
+
+def _default_sp(shape_id: int, name: str, ph_attrs: str, x: int, y: int, cx: int, cy: int,
+                with_geometry: bool = True) -> str:
+    sp_pr = (
+        f'<p:spPr><a:xfrm><a:off x="{x}" y="{y}"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm>'
+        '<a:prstGeom prst="rect"><a:avLst/></a:prstGeom></p:spPr>'
+        if with_geometry else "<p:spPr/>"
+    )
+    return (
+        f'<p:sp><p:nvSpPr><p:cNvPr id="{shape_id}" name="{name}"/>'
+        f'<p:cNvSpPr><a:spLocks noGrp="1"/></p:cNvSpPr><p:nvPr><p:ph{ph_attrs}/></p:nvPr></p:nvSpPr>'
+        f'{sp_pr}<p:txBody><a:bodyPr/><a:lstStyle/><a:p><a:endParaRPr lang="zh-CN"/></a:p></p:txBody></p:sp>'
+    )
+
+
+def _default_theme_xml() -> str:
+    colors = (
+        '<a:dk1><a:sysClr val="windowText" lastClr="000000"/></a:dk1>'
+        '<a:lt1><a:sysClr val="window" lastClr="FFFFFF"/></a:lt1>'
+        '<a:dk2><a:srgbClr val="44546A"/></a:dk2><a:lt2><a:srgbClr val="E7E6E6"/></a:lt2>'
+        '<a:accent1><a:srgbClr val="4472C4"/></a:accent1><a:accent2><a:srgbClr val="ED7D31"/></a:accent2>'
+        '<a:accent3><a:srgbClr val="A5A5A5"/></a:accent3><a:accent4><a:srgbClr val="FFC000"/></a:accent4>'
+        '<a:accent5><a:srgbClr val="5B9BD5"/></a:accent5><a:accent6><a:srgbClr val="70AD47"/></a:accent6>'
+        '<a:hlink><a:srgbClr val="0563C1"/></a:hlink><a:folHlink><a:srgbClr val="954F72"/></a:folHlink>'
+    )
+    fonts = (
+        '<a:majorFont><a:latin typeface="Calibri Light"/><a:ea typeface=""/><a:cs typeface=""/>'
+        '<a:font script="Hans" typeface="等线 Light"/></a:majorFont>'
+        '<a:minorFont><a:latin typeface="Calibri"/><a:ea typeface=""/><a:cs typeface=""/>'
+        '<a:font script="Hans" typeface="等线"/></a:minorFont>'
+    )
+    solid = '<a:solidFill><a:schemeClr val="phClr"/></a:solidFill>'
+    line = '<a:ln w="{w}" cap="flat" cmpd="sng" algn="ctr">' + solid + '<a:prstDash val="solid"/></a:ln>'
+    fmt = (
+        f'<a:fillStyleLst>{solid * 3}</a:fillStyleLst>'
+        f'<a:lnStyleLst>{line.format(w=6350)}{line.format(w=12700)}{line.format(w=19050)}</a:lnStyleLst>'
+        f'<a:effectStyleLst>{"<a:effectStyle><a:effectLst/></a:effectStyle>" * 3}</a:effectStyleLst>'
+        f'<a:bgFillStyleLst>{solid * 3}</a:bgFillStyleLst>'
+    )
+    return (
+        f'{_XML_DECL}<a:theme xmlns:a="{NS_A}" name="Office Theme"><a:themeElements>'
+        f'<a:clrScheme name="Office">{colors}</a:clrScheme>'
+        f'<a:fontScheme name="Office">{fonts}</a:fontScheme>'
+        f'<a:fmtScheme name="Office">{fmt}</a:fmtScheme>'
+        '</a:themeElements><a:objectDefaults/><a:extraClrSchemeLst/></a:theme>'
+    )
+
+
+def _default_master_xml() -> str:
+    def level_style(size: int, bullet: bool) -> str:
+        bullet_xml = '<a:buFont typeface="Arial"/><a:buChar char="&#8226;"/>' if bullet else "<a:buNone/>"
+        return (
+            f'<a:lvl1pPr marL="{228600 if bullet else 0}" indent="{-228600 if bullet else 0}" algn="l">'
+            f'{bullet_xml}<a:defRPr sz="{size}"><a:solidFill><a:schemeClr val="tx1"/></a:solidFill>'
+            '<a:latin typeface="+mn-lt"/><a:ea typeface="+mn-ea"/><a:cs typeface="+mn-cs"/></a:defRPr></a:lvl1pPr>'
+        )
+
+    shapes = (
+        _default_sp(2, "Title Placeholder 1", ' type="title"', 838200, 365125, 10515600, 1325563)
+        + _default_sp(3, "Text Placeholder 2", ' type="body" idx="1"', 838200, 1825625, 10515600, 4351338)
+    )
+    return (
+        f'{_XML_DECL}<p:sldMaster {_NS_DECL}><p:cSld>'
+        '<p:bg><p:bgRef idx="1001"><a:schemeClr val="bg1"/></p:bgRef></p:bg>'
+        f'<p:spTree>{_SP_TREE_HEAD}{shapes}</p:spTree></p:cSld>'
+        '<p:clrMap bg1="lt1" tx1="dk1" bg2="lt2" tx2="dk2" accent1="accent1" accent2="accent2" '
+        'accent3="accent3" accent4="accent4" accent5="accent5" accent6="accent6" hlink="hlink" folHlink="folHlink"/>'
+        '<p:sldLayoutIdLst><p:sldLayoutId id="2147483649" r:id="rId1"/>'
+        '<p:sldLayoutId id="2147483650" r:id="rId2"/></p:sldLayoutIdLst>'
+        f'<p:txStyles><p:titleStyle>{level_style(4400, False)}</p:titleStyle>'
+        f'<p:bodyStyle>{level_style(2800, True)}</p:bodyStyle>'
+        f'<p:otherStyle>{level_style(1800, False)}</p:otherStyle></p:txStyles>'
+        '</p:sldMaster>'
+    )
+
+
+def _default_layout_xml(layout_type: str, name: str, shapes: str) -> str:
+    return (
+        f'{_XML_DECL}<p:sldLayout {_NS_DECL} type="{layout_type}" preserve="1">'
+        f'<p:cSld name="{name}"><p:spTree>{_SP_TREE_HEAD}{shapes}</p:spTree></p:cSld>'
+        '<p:clrMapOvr><a:masterClrMapping/></p:clrMapOvr></p:sldLayout>'
+    )
+
+
+def build_default_template() -> bytes:
+    """
+    构建内置默认模板（16:9，"标题幻灯片"与"标题和内容"两个版式）
+
+    Returns:
+        模板文件内容
+    """
+    def rels(*items: Tuple[str, str, str]) -> str:
+        return (
+            f'{_XML_DECL}<Relationships xmlns="{NS_RELS}">'
+            f'{"".join(_relationship_xml(*item) for item in items)}</Relationships>'
+        )
+
+    title_layout = _default_layout_xml(
+        "title", "Title Slide",
+        _default_sp(2, "Title 1", ' type="ctrTitle"', 1524000, 1122363, 9144000, 2387600)
+        + _default_sp(3, "Subtitle 2", ' type="subTitle" idx="1"', 1524000, 3602038, 9144000, 1655762),
+    )
+    content_layout = _default_layout_xml(
+        "obj", "Title and Content",
+        _default_sp(2, "Title 1", ' type="title"', 0, 0, 0, 0, with_geometry=False)
+        + _default_sp(3, "Content Placeholder 2", ' idx="1"', 0, 0, 0, 0, with_geometry=False),
+    )
+    overrides = [
+        ("/ppt/presentation.xml", CT_PRESENTATION),
+        ("/ppt/slideMasters/slideMaster1.xml", CT_SLIDE_MASTER),
+        ("/ppt/slideLayouts/slideLayout1.xml", CT_SLIDE_LAYOUT),
+        ("/ppt/slideLayouts/slideLayout2.xml", CT_SLIDE_LAYOUT),
+        ("/ppt/theme/theme1.xml", CT_THEME),
+        ("/ppt/presProps.xml", CT_PRES_PROPS),
+        ("/ppt/viewProps.xml", CT_VIEW_PROPS),
+        ("/ppt/tableStyles.xml", CT_TABLE_STYLES),
+    ]
+    content_types = (
+        f'{_XML_DECL}<Types xmlns="{NS_CT}">'
+        f'<Default Extension="rels" ContentType="{CT_RELS}"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        + "".join(f'<Override PartName="{name}" ContentType="{ct}"/>' for name, ct in overrides)
+        + "</Types>"
+    )
+    parts = {
+        "[Content_Types].xml": content_types,
+        "_rels/.rels": rels(("rId1", REL_OFFICE_DOCUMENT, "ppt/presentation.xml")),
+        "ppt/presentation.xml": (
+            f'{_XML_DECL}<p:presentation {_NS_DECL} saveSubsetFonts="1">'
+            '<p:sldMasterIdLst><p:sldMasterId id="2147483648" r:id="rId1"/></p:sldMasterIdLst>'
+            '<p:sldSz cx="12192000" cy="6858000"/><p:notesSz cx="6858000" cy="9144000"/>'
+            '</p:presentation>'
+        ),
+        "ppt/_rels/presentation.xml.rels": rels(
+            ("rId1", REL_SLIDE_MASTER, "slideMasters/slideMaster1.xml"),
+            ("rId2", REL_THEME, "theme/theme1.xml"),
+            ("rId3", REL_PRES_PROPS, "presProps.xml"),
+            ("rId4", REL_VIEW_PROPS, "viewProps.xml"),
+            ("rId5", REL_TABLE_STYLES, "tableStyles.xml"),
+        ),
+        "ppt/slideMasters/slideMaster1.xml": _default_master_xml(),
+        "ppt/slideMasters/_rels/slideMaster1.xml.rels": rels(
+            ("rId1", REL_SLIDE_LAYOUT, "../slideLayouts/slideLayout1.xml"),
+            ("rId2", REL_SLIDE_LAYOUT, "../slideLayouts/slideLayout2.xml"),
+            ("rId3", REL_THEME, "../theme/theme1.xml"),
+        ),
+        "ppt/slideLayouts/slideLayout1.xml": title_layout,
+        "ppt/slideLayouts/_rels/slideLayout1.xml.rels": rels(
+            ("rId1", REL_SLIDE_MASTER, "../slideMasters/slideMaster1.xml"),
+        ),
+        "ppt/slideLayouts/slideLayout2.xml": content_layout,
+        "ppt/slideLayouts/_rels/slideLayout2.xml.rels": rels(
+            ("rId1", REL_SLIDE_MASTER, "../slideMasters/slideMaster1.xml"),
+        ),
+        "ppt/theme/theme1.xml": _default_theme_xml(),
+        "ppt/presProps.xml": f'{_XML_DECL}<p:presentationPr {_NS_DECL}/>',
+        "ppt/viewProps.xml": f'{_XML_DECL}<p:viewPr {_NS_DECL}/>',
+        "ppt/tableStyles.xml": (
+            f'{_XML_DECL}<a:tblStyleLst xmlns:a="{NS_A}" def="{{5C22544A-7EE6-4342-B048-85BDC9FD1C3A}}"/>'
+        ),
+    }
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, xml in parts.items():
+            zf.writestr(name, xml)
+    return buffer.getvalue()
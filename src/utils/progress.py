@@ -0,0 +1,55 @@
+"""
+进度通知模块
+在线程中运行耗时的同步任务，并把任务回调的进度转发为MCP进度通知
+"""
+
+import asyncio
+import functools
+from typing import Any, Callable, Optional
+
+# 相邻两次进度通知之间的最小进度差（占总量的比例），避免逐个成员发送大量通知
+MIN_PROGRESS_STEP = 0.01
+
+
+async def run_with_progress(func: Callable[..., Any], ctx: Optional[Any], *args, **kwargs) -> Any:
+    """
+    在线程中运行同步函数，通过 ctx.report_progress 发送进度通知
+
+    函数需接受 progress 关键字参数，其调用方式为 progress(已完成量, 总量, 消息=None)。
+    不带消息的进度按 MIN_PROGRESS_STEP 合并，带消息的进度（如逐个文档的完成情况）每次都发送。
+    没有上下文（非MCP调用或客户端未请求进度）时不发送通知。
+
+    Args:
+        func: 同步函数
+        ctx: MCP请求上下文，可为None
+        *args: 传给函数的位置参数
+        **kwargs: 传给函数的关键字参数
+
+    Returns:
+        函数的返回值
+    """
+    if ctx is None:
+        return await asyncio.to_thread(functools.partial(func, *args, **kwargs))
+
+    loop = asyncio.get_running_loop()
+    pending = []
+    last_sent = None
+
+    def progress(done: float, total: Optional[float] = None, message: Optional[str] = None):
+        nonlocal last_sent
+        if (message is None and total and last_sent is not None and done < total
+                and done - last_sent < total * MIN_PROGRESS_STEP):
+            return
+        last_sent = done
+        # 回调在工作线程中执行，通知需要提交回事件循环发送
+        pending.append(asyncio.run_coroutine_threadsafe(ctx.report_progress(done, total, message), loop))
+
+    try:
+        return await asyncio.to_thread(functools.partial(func, *args, progress=progress, **kwargs))
+    finally:
+        # 等待已提交的通知发送完毕，保证进度通知先于结果到达客户端
+        for future in pending:
+            try:
+                await asyncio.wrap_future(future)
+            except Exception:
+                pass
@@ -0,0 +1,142 @@
+"""
+提示词模板模块
+一次性加载 config/prompt_templates 下的所有模板并预编译：模板中的 {{变量}} 在加载时解析，
+渲染前即可校验变量是否齐全，模板文件新增、修改或删除后在下次读取时重新加载
+"""
+
+import os
+import re
+import time
+import threading
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from src.utils.llm_config import CHECK_INTERVAL, CONFIG_DIR
+
+# 提示词模板目录
+TEMPLATE_DIR = os.path.join(CONFIG_DIR, "prompt_templates")
+
+# 模板文件扩展名
+TEMPLATE_SUFFIX = ".txt"
+
+# 模板变量：{{name}}，花括号内可以有空格；其他花括号原样保留
+PLACEHOLDER = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}")
+
+
+class PromptTemplate:
+    """预编译的提示词模板"""
+
+    def __init__(self, name: str, source: str):
+        self.name = name
+        self.source = source
+        parts = PLACEHOLDER.split(source)
+        # 编译为 str.format 格式串：字面部分的花括号转义，变量替换为命名字段
+        self._format = "".join(
+            part.replace("{", "{{").replace("}", "}}") if i % 2 == 0 else "{" + part + "}"
+            for i, part in enumerate(parts)
+        )
+        self.variables: FrozenSet[str] = frozenset(parts[1::2])
+
+    def missing(self, values: Dict[str, Any]) -> List[str]:
+        """缺少的变量（按名称排序）"""
+        return sorted(self.variables.difference(values))
+
+    def render(self, **kwargs) -> str:
+        """
+        渲染模板
+
+        Args:
+            **kwargs: 模板变量，多余的变量忽略
+
+        Returns:
+            渲染后的提示词
+        """
+        if not self.variables.issubset(kwargs):
+            raise ValueError(f"模板 '{self.name}' 缺少必要的变量: {', '.join(self.missing(kwargs))}")
+        return self._format.format_map(kwargs)
+
+
+class TemplateRegistry:
+    """
+    提示词模板目录
+
+    读取时最多每 check_interval 秒检查一次目录，只重新编译修改时间或大小变化的模板。
+    """
+
+    def __init__(self, directory: str = TEMPLATE_DIR, check_interval: float = CHECK_INTERVAL):
+        self.directory = directory
+        self.check_interval = check_interval
+        # 编译次数
+        self.compiles = 0
+        self._templates: Dict[str, Tuple[Tuple[int, int, int], PromptTemplate]] = {}
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> PromptTemplate:
+        """
+        获取模板
+
+        Args:
+            name: 模板名称（不包含文件扩展名）
+
+        Returns:
+            预编译的模板
+        """
+        if time.monotonic() >= self._next_check:
+            self.refresh()
+        entry = self._templates.get(name)
+        if entry is None:
+            raise FileNotFoundError(f"提示词模板 '{name}' 不存在")
+        return entry[1]
+
+    def render(self, name: str, **kwargs) -> str:
+        """渲染模板"""
+        return self.get(name).render(**kwargs)
+
+    def names(self) -> List[str]:
+        """所有模板名称"""
+        if time.monotonic() >= self._next_check:
+            self.refresh()
+        return sorted(self._templates)
+
+    def refresh(self):
+        """检查模板目录，重新加载变化的模板"""
+        with self._lock:
+            self._next_check = time.monotonic() + self.check_interval
+            found = {}
+            try:
+                with os.scandir(self.directory) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(TEMPLATE_SUFFIX) and entry.is_file():
+                            st = entry.stat()
+                            found[entry.name[:-len(TEMPLATE_SUFFIX)]] = (entry.path, (st.st_ino, st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                pass
+
+            templates = {}
+            for name, (path, version) in found.items():
+                current = self._templates.get(name)
+                if current is not None and current[0] == version:
+                    templates[name] = current
+                    continue
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        source = f.read()
+                except FileNotFoundError:
+                    continue
+                self.compiles += 1
+                templates[name] = (version, PromptTemplate(name, source))
+            self._templates = templates
+
+
+_registry: Optional[TemplateRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_template_registry() -> TemplateRegistry:
+    """进程内共享的提示词模板目录"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = TemplateRegistry()
+    return _registry
@@ -0,0 +1,242 @@
+"""
+文件区间读取模块
+通过mmap按字节区间或行区间读取文件，行偏移索引按需构建并按 (路径, 修改时间, 大小) 缓存
+"""
+
+import os
+import mmap
+import codecs
+import base64
+import threading
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+# 编码探测的采样大小
+SAMPLE_SIZE = 8192
+
+# 行索引的块大小，索引中记录每个块之前的换行符累计数量
+BLOCK_SIZE = 64 * 1024
+
+# 行索引缓存容量
+INDEX_CACHE_SIZE = 32
+
+# 默认读取的字节数和行数
+DEFAULT_READ_LENGTH = 64 * 1024
+DEFAULT_LINE_COUNT = 100
+
+# 常见文本文件扩展名，其余文件根据采样内容判断
+TEXT_EXTENSIONS = {
+    ".txt", ".md", ".py", ".json", ".jsonl", ".ndjson", ".csv", ".tsv", ".log",
+    ".xml", ".html", ".htm", ".yaml", ".yml", ".ini", ".cfg", ".toml",
+}
+
+
+def read_sample(file_path: str, sample_size: int = SAMPLE_SIZE) -> bytes:
+    """读取文件开头的采样数据"""
+    with open(file_path, "rb") as f:
+        return f.read(sample_size)
+
+
+def detect_encoding(sample: bytes) -> str:
+    """
+    根据采样数据探测文本编码
+
+    Args:
+        sample: 文件开头的采样数据
+
+    Returns:
+        编码名称
+    """
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    # 采样末尾可能截断多字节字符，使用增量解码器忽略不完整的尾部
+    for encoding in ("utf-8", "gb18030"):
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return "latin-1"
+
+
+def is_text_file(file_path: str, sample: bytes) -> bool:
+    """根据扩展名和采样内容判断是否为文本文件"""
+    _, ext = os.path.splitext(file_path)
+    if ext.lower() in TEXT_EXTENSIONS:
+        return True
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return True
+    return b"\x00" not in sample
+
+
+class LineIndex:
+    """
+    稀疏行偏移索引
+
+    只记录每个块之前的换行符累计数量，定位某一行时先二分查找块，
+    再在块内扫描。索引只在需要时向后扩展，已扫描的部分不会重复读取。
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.block_newlines = array("Q", [0])
+        self._lock = threading.Lock()
+
+    @property
+    def complete(self) -> bool:
+        return (len(self.block_newlines) - 1) * BLOCK_SIZE >= self.size
+
+    def _extend(self, mm: mmap.mmap, newline_target: Optional[int] = None):
+        with self._lock:
+            while not self.complete:
+                if newline_target is not None and self.block_newlines[-1] >= newline_target:
+                    return
+                start = (len(self.block_newlines) - 1) * BLOCK_SIZE
+                end = min(start + BLOCK_SIZE, self.size)
+                self.block_newlines.append(self.block_newlines[-1] + mm[start:end].count(b"\n"))
+
+    def total_lines(self, mm: mmap.mmap) -> int:
+        """文件总行数（会扫描整个文件）"""
+        self._extend(mm)
+        total = self.block_newlines[-1]
+        if self.size and mm[self.size - 1] != ord("\n"):
+            total += 1
+        return total
+
+    def line_offset(self, mm: mmap.mmap, line_no: int) -> Optional[int]:
+        """
+        获取某一行的起始字节偏移
+
+        Args:
+            mm: 文件的内存映射
+            line_no: 行号（从0开始）
+
+        Returns:
+            起始偏移，行号超出文件范围时返回None
+        """
+        if line_no == 0:
+            return 0 if self.size else None
+        self._extend(mm, line_no)
+        if self.block_newlines[-1] < line_no:
+            return None
+        # 第 line_no 个换行符所在的块
+        block = bisect_left(self.block_newlines, line_no) - 1
+        pos = block * BLOCK_SIZE
+        end = min(pos + BLOCK_SIZE, self.size)
+        for _ in range(line_no - self.block_newlines[block]):
+            pos = mm.find(b"\n", pos, end) + 1
+        return pos if pos < self.size else None
+
+
+@lru_cache(maxsize=INDEX_CACHE_SIZE)
+def _get_line_index(file_path: str, mtime_ns: int, size: int) -> LineIndex:
+    # mtime_ns 与 size 只参与缓存键，文件变化后自动使用新索引
+    return LineIndex(size)
+
+
+def _align_utf8(mm: mmap.mmap, start: int, end: int, size: int):
+    """将区间调整到UTF-8字符边界，避免截断多字节字符"""
+    while start < end and (mm[start] & 0xC0) == 0x80:
+        start += 1
+    while start < end < size and (mm[end] & 0xC0) == 0x80:
+        end -= 1
+    return start, end
+
+
+def read_range(file_path: str, offset: Optional[int] = None, length: Optional[int] = None,
+               line_start: Optional[int] = None, line_count: Optional[int] = None) -> Dict[str, Any]:
+    """
+    按字节区间或行区间读取文件
+
+    Args:
+        file_path: 文件路径
+        offset: 起始字节偏移
+        length: 读取的字节数
+        line_start: 起始行号（从1开始）
+        line_count: 读取的行数
+
+    Returns:
+        读取结果，二进制文件的内容以base64编码返回
+    """
+    by_lines = line_start is not None or line_count is not None
+    if by_lines and (offset is not None or length is not None):
+        raise ValueError("不能同时指定字节区间和行区间")
+
+    stat = os.stat(file_path)
+    size = stat.st_size
+    sample = read_sample(file_path)
+    text = is_text_file(file_path, sample)
+    encoding = detect_encoding(sample) if text else "base64"
+    result: Dict[str, Any] = {"encoding": encoding, "size": size}
+
+    if by_lines:
+        if not text:
+            raise ValueError("二进制文件不支持按行读取")
+        if encoding == "utf-16":
+            raise ValueError("UTF-16编码的文件不支持按行读取")
+        line_start = 1 if line_start is None else line_start
+        line_count = DEFAULT_LINE_COUNT if line_count is None else line_count
+        if line_start < 1 or line_count < 0:
+            raise ValueError("line_start 必须从1开始，line_count 不能为负数")
+    else:
+        offset = 0 if offset is None else offset
+        length = DEFAULT_READ_LENGTH if length is None else length
+        if offset < 0 or length < 0:
+            raise ValueError("offset 和 length 不能为负数")
+
+    if size == 0:
+        # 空文件无法建立内存映射
+        data, start, end = b"", 0, 0
+        if by_lines:
+            result.update({"line_start": line_start, "line_count": 0, "next_line": None,
+                           "total_lines": 0, "eof": True})
+        else:
+            result.update({"offset": 0, "length": 0, "next_offset": None, "eof": True})
+    else:
+        with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if by_lines:
+                index = _get_line_index(os.path.realpath(file_path), stat.st_mtime_ns, size)
+                start = index.line_offset(mm, line_start - 1)
+                if start is None:
+                    start = end = size
+                    returned = 0
+                else:
+                    end = index.line_offset(mm, line_start - 1 + line_count)
+                    if end is None:
+                        end = size
+                        returned = index.total_lines(mm) - (line_start - 1)
+                    else:
+                        returned = line_count
+                data = mm[start:end]
+                eof = end >= size
+                result.update({
+                    "line_start": line_start,
+                    "line_count": returned,
+                    "next_line": None if eof else line_start + returned,
+                    "eof": eof,
+                })
+                if index.complete:
+                    result["total_lines"] = index.total_lines(mm)
+            else:
+                start = min(offset, size)
+                end = min(start + length, size)
+                if text and encoding.startswith("utf-8"):
+                    start, end = _align_utf8(mm, start, end, size)
+                data = mm[start:end]
+                eof = end >= size
+                result.update({
+                    "offset": start,
+                    "length": end - start,
+                    "next_offset": None if eof else end,
+                    "eof": eof,
+                })
+
+    if text:
+        result["content"] = data.decode(encoding, errors="replace")
+    else:
+        result["content"] = base64.b64encode(data).decode("ascii")
+    return result
@@ -0,0 +1,404 @@
+"""
+速率限制模块
+按 (提供商, 模型) 限制每分钟请求数和令牌数（令牌桶），并发数按 AIMD 调整：
+收到429或5xx时减半，成功时逐步增加。排队的请求按截止时间先后获得许可，同步和异步调用共用同一个限制器
+"""
+
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.utils.llm_config import RateLimits
+
+# 估算令牌数时每个令牌对应的字符数
+CHARS_PER_TOKEN = 3
+
+# 收到429或5xx时并发上限的缩减系数
+DECREASE_FACTOR = 0.5
+
+# 重试前等待时间的上限（秒），Retry-After 超出时按上限等待
+MAX_RETRY_AFTER = 60.0
+
+
+class DeadlineExceeded(TimeoutError):
+    """请求在截止时间前没有获得许可"""
+
+
+def estimate_tokens(params: Dict[str, Any]) -> int:
+    """
+    估算请求消耗的令牌数：消息字符数折算的输入令牌加上 max_tokens
+
+    Args:
+        params: 请求参数
+
+    Returns:
+        令牌数
+    """
+    chars = 0
+    for message in params.get("messages") or []:
+        content = message.get("content") if isinstance(message, dict) else getattr(message, "content", None)
+        if isinstance(content, str):
+            chars += len(content)
+        elif isinstance(content, list):
+            chars += sum(len(part.get("text") or "") for part in content if isinstance(part, dict))
+    output = params.get("max_tokens") or params.get("max_completion_tokens") or 0
+    return chars // CHARS_PER_TOKEN + 1 + output
+
+
+def is_throttled(status: Optional[int]) -> bool:
+    """429或5xx：服务端过载，应降低并发并重试"""
+    return status is not None and (status == 429 or status >= 500)
+
+
+class TokenBucket:
+    """按每分钟速率补充的令牌桶，容量默认为一分钟的配额"""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """取出 amount 个令牌需要等待的秒数（超出容量的请求按容量计算）"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, amount: float):
+        """按实际用量补扣（amount 为负时退回），余额可以为负"""
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class _Waiter:
+    __slots__ = ("tokens", "granted", "cancelled", "event", "loop")
+
+    def __init__(self, tokens: int, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.tokens = tokens
+        self.granted = False
+        self.cancelled = False
+        self.loop = loop
+        self.event = asyncio.Event() if loop is not None else threading.Event()
+
+    def notify(self):
+        if self.loop is None:
+            self.event.set()
+        elif not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.event.set)
+
+
+class Permit:
+    """一次请求的许可，请求结束后必须调用 release"""
+
+    def __init__(self, limiter: "RateLimiter", tokens: int):
+        self.limiter = limiter
+        self.tokens = tokens
+        self.started_at = time.monotonic()
+        self.released = False
+
+    def release(self, status: Optional[int] = 200, tokens_used: Optional[int] = None,
+                retry_after: Optional[float] = None):
+        """
+        归还许可
+
+        Args:
+            status: 响应状态码；429或5xx时缩减并发上限，2xx时增加，为None（如连接错误）时不调整
+            tokens_used: 实际消耗的令牌数，用于修正估算值
+            retry_after: 服务端要求的等待时间（秒），期间不再发出新请求
+        """
+        if not self.released:
+            self.released = True
+            self.limiter._release(self, status, tokens_used, retry_after)
+
+
+class RateLimiter:
+    """
+    单个 (提供商, 模型) 的速率限制器
+
+    同时满足并发上限、每分钟请求数和每分钟令牌数时发放许可；
+    队首的请求等待令牌时后面的请求也等待，保证按截止时间先后发放。
+    """
+
+    def __init__(self, limits: RateLimits):
+        self._lock = threading.Lock()
+        self._queue: List[Tuple[float, int, _Waiter]] = []
+        self._seq = itertools.count()
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._counts = dict.fromkeys(("granted", "succeeded", "throttled", "expired"), 0)
+        self.configure(limits)
+
+    def configure(self, limits: RateLimits):
+        """更新限制（配置文件重新加载后调用），当前并发上限限制在新的范围内"""
+        with self._lock:
+            previous = getattr(self, "limits", None)
+            self.limits = limits
+            if previous is None or previous.rpm != limits.rpm:
+                self._requests = TokenBucket(limits.rpm) if limits.rpm else None
+            if previous is None or previous.tpm != limits.tpm:
+                self._tokens = TokenBucket(limits.tpm) if limits.tpm else None
+            current = getattr(self, "limit", limits.max_concurrency)
+            self.limit = float(min(max(current, limits.min_concurrency), limits.max_concurrency))
+            self._dispatch()
+
+    def acquire(self, tokens: int = 0, deadline: Optional[float] = None) -> Permit:
+        """
+        等待许可
+
+        Args:
+            tokens: 预计消耗的令牌数
+            deadline: 截止时间（time.monotonic() 时间戳），为None时排在有截止时间的请求之后
+
+        Returns:
+            许可
+        """
+        waiter = _Waiter(tokens)
+        delay = self._enqueue(waiter, deadline)
+        while True:
+            if waiter.granted:
+                return Permit(self, tokens)
+            timeout = self._timeout(delay, deadline)
+            if timeout is not None and timeout <= 0:
+                delay = self._expire(waiter)
+                continue
+            waiter.event.wait(timeout)
+            waiter.event.clear()
+            with self._lock:
+                delay = self._dispatch(waiter)
+
+    async def aacquire(self, tokens: int = 0, deadline: Optional[float] = None) -> Permit:
+        """异步等待许可，参数同 acquire"""
+        waiter = _Waiter(tokens, asyncio.get_running_loop())
+        delay = self._enqueue(waiter, deadline)
+        try:
+            while True:
+                if waiter.granted:
+                    return Permit(self, tokens)
+                timeout = self._timeout(delay, deadline)
+                if timeout is not None and timeout <= 0:
+                    delay = self._expire(waiter)
+                    continue
+                try:
+                    await asyncio.wait_for(waiter.event.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                waiter.event.clear()
+                with self._lock:
+                    delay = self._dispatch(waiter)
+        except asyncio.CancelledError:
+            with self._lock:
+                waiter.cancelled = True
+                granted = waiter.granted
+            if granted:
+                Permit(self, tokens).release(status=None)
+            raise
+
+    def pause(self, seconds: float):
+        """在 seconds 秒内不发放新许可"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + min(seconds, MAX_RETRY_AFTER))
+
+    def stats(self) -> Dict[str, Any]:
+        """当前状态和计数"""
+        with self._lock:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "queued": sum(1 for _, _, waiter in self._queue if not waiter.cancelled),
+                **self._counts,
+            }
+
+    def _enqueue(self, waiter: _Waiter, deadline: Optional[float]) -> Optional[float]:
+        with self._lock:
+            heapq.heappush(self._queue, (float("inf") if deadline is None else deadline, next(self._seq), waiter))
+            return self._dispatch(waiter)
+
+    @staticmethod
+    def _timeout(delay: Optional[float], deadline: Optional[float]) -> Optional[float]:
+        if deadline is None:
+            return delay
+        remaining = deadline - time.monotonic()
+        return remaining if delay is None else min(delay, remaining)
+
+    def _expire(self, waiter: _Waiter) -> Optional[float]:
+        """截止时间已过：仍未获得许可时移出队列并抛出 DeadlineExceeded"""
+        with self._lock:
+            if waiter.granted:
+                return None
+            if time.monotonic() < self._queue_deadline(waiter):
+                return self._dispatch(waiter)
+            waiter.cancelled = True
+            self._counts["expired"] += 1
+            self._dispatch()
+        raise DeadlineExceeded("请求在截止时间前没有获得速率限制许可")
+
+    def _queue_deadline(self, waiter: _Waiter) -> float:
+        for deadline, _, queued in self._queue:
+            if queued is waiter:
+                return deadline
+        return float("-inf")
+
+    def _dispatch(self, caller: Optional[_Waiter] = None) -> Optional[float]:
+        """
+        按队列顺序发放许可（调用方持有锁）
+
+        Returns:
+            队首请求需要等待令牌补充的秒数，受并发上限限制或队列为空时返回None
+        """
+        while self._queue:
+            waiter = self._queue[0][2]
+            if waiter.cancelled:
+                heapq.heappop(self._queue)
+                continue
+            if self.in_flight >= max(1, int(self.limit)):
+                return None
+            now = time.monotonic()
+            delay = self.blocked_until - now
+            if self._requests is not None:
+                delay = max(delay, self._requests.delay(1, now))
+            if self._tokens is not None:
+                delay = max(delay, self._tokens.delay(waiter.tokens, now))
+            if delay > 0:
+                # 由队首请求负责定时唤醒
+                if waiter is not caller:
+                    waiter.notify()
+                return delay
+            heapq.heappop(self._queue)
+            if self._requests is not None:
+                self._requests.take(1)
+            if self._tokens is not None:
+                self._tokens.take(waiter.tokens)
+            self.in_flight += 1
+            self._counts["granted"] += 1
+            waiter.granted = True
+            if waiter is not caller:
+                waiter.notify()
+        return None
+
+    def _release(self, permit: Permit, status: Optional[int], tokens_used: Optional[int],
+                 retry_after: Optional[float]):
+        with self._lock:
+            now = time.monotonic()
+            self.in_flight -= 1
+            if tokens_used is not None and self._tokens is not None:
+                self._tokens.adjust(tokens_used - min(permit.tokens, self._tokens.capacity))
+            if is_throttled(status):
+                self._counts["throttled"] += 1
+                # 同一批在途请求的失败只缩减一次
+                if permit.started_at >= self._last_decrease:
+                    self.limit = max(float(self.limits.min_concurrency), self.limit * DECREASE_FACTOR)
+                    self._last_decrease = now
+                if retry_after:
+                    self.blocked_until = max(self.blocked_until, now + min(retry_after, MAX_RETRY_AFTER))
+            elif status is not None and 200 <= status < 300:
+                self._counts["succeeded"] += 1
+                self.limit = min(float(self.limits.max_concurrency), self.limit + 1.0 / self.limit)
+            self._dispatch()
+
+
+_limiters: Dict[Tuple[str, str], RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str, model: str, limits: RateLimits) -> RateLimiter:
+    """
+    获取进程内共享的速率限制器，限制变化时更新
+
+    Args:
+        provider: 模型提供商
+        model: 模型名称
+        limits: 限制
+
+    Returns:
+        速率限制器
+    """
+    key = (provider, model)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = RateLimiter(limits)
+            return limiter
+    if limiter.limits != limits:
+        limiter.configure(limits)
+    return limiter
+
+
+def _error_details(error: Exception) -> Tuple[Optional[int], Optional[float]]:
+    """异常对应的状态码和 Retry-After 秒数"""
+    status = getattr(error, "status_code", None)
+    response = getattr(error, "response", None)
+    retry_after = None
+    if response is not None:
+        try:
+            retry_after = float(response.headers.get("retry-after"))
+        except (TypeError, ValueError):
+            retry_after = None
+    return status, retry_after
+
+
+def _usage_tokens(response: Any) -> Optional[int]:
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", None)
+
+
+def call_with_limiter(limiter: RateLimiter, call: Callable[[], Any], tokens: int,
+                      deadline: Optional[float] = None) -> Any:
+    """
+    在速率限制下调用，429或5xx时重新排队重试（最多 limits.retries 次）
+
+    Args:
+        limiter: 速率限制器
+        call: 发出请求的函数（客户端应关闭自身的重试）
+        tokens: 预计消耗的令牌数
+        deadline: 截止时间（time.monotonic() 时间戳）
+
+    Returns:
+        响应
+    """
+    attempt = 0
+    while True:
+        permit = limiter.acquire(tokens, deadline)
+        try:
+            response = call()
+        except Exception as e:
+            status, retry_after = _error_details(e)
+            permit.release(status, retry_after=retry_after)
+            if not is_throttled(status) or attempt >= limiter.limits.retries:
+                raise
+            attempt += 1
+            continue
+        permit.release(200, _usage_tokens(response))
+        return response
+
+
+async def acall_with_limiter(limiter: RateLimiter, call: Callable[[], Any], tokens: int,
+                             deadline: Optional[float] = None) -> Any:
+    """call_with_limiter 的异步版本，call 返回可等待对象"""
+    attempt = 0
+    while True:
+        permit = await limiter.aacquire(tokens, deadline)
+        try:
+            response = await call()
+        except asyncio.CancelledError:
+            permit.release(None)
+            raise
+        except Exception as e:
+            status, retry_after = _error_details(e)
+            permit.release(status, retry_after=retry_after)
+            if not is_throttled(status) or attempt >= limiter.limits.retries:
+                raise
+            attempt += 1
+            continue
+        permit.release(200, _usage_tokens(response))
+        return response
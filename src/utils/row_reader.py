@@ -0,0 +1,129 @@
+"""
+行数据流式读取模块
+按块读取NDJSON或CSV文件，避免将整个数据集加载到内存
+"""
+
+import csv
+import json
+import os
+from itertools import islice
+from typing import Any, Iterator, List, Optional
+
+# 默认每块读取的行数
+DEFAULT_CHUNK_SIZE = 10000
+
+_FORMAT_BY_EXTENSION = {
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".csv": "csv",
+    ".tsv": "tsv",
+}
+
+
+def detect_format(file_path: str, fmt: Optional[str] = None) -> str:
+    """
+    根据扩展名判断数据文件格式
+
+    Args:
+        file_path: 数据文件路径
+        fmt: 显式指定的格式（"ndjson"、"csv"、"tsv"），为None时按扩展名判断
+
+    Returns:
+        文件格式
+    """
+    if fmt:
+        fmt = fmt.lower()
+        if fmt == "jsonl":
+            fmt = "ndjson"
+        if fmt not in ("ndjson", "csv", "tsv"):
+            raise ValueError(f"不支持的数据文件格式: {fmt}")
+        return fmt
+    _, ext = os.path.splitext(file_path)
+    if ext.lower() not in _FORMAT_BY_EXTENSION:
+        raise ValueError(f"无法识别的数据文件格式: {file_path}")
+    return _FORMAT_BY_EXTENSION[ext.lower()]
+
+
+def _cell_value(value: Any) -> Any:
+    """嵌套结构无法直接写入单元格，转换为JSON字符串"""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def _iter_ndjson_rows(file_path: str) -> Iterator[List[Any]]:
+    header: Optional[List[str]] = None
+    columns: set = set()
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"第 {line_no} 行不是合法的JSON: {e}")
+            if isinstance(record, dict):
+                # 对象行以第一行的键作为表头；表头已经写出，之后的行不能再增加列
+                if header is None:
+                    header = list(record.keys())
+                    columns = set(header)
+                    yield header
+                extra = [key for key in record if key not in columns]
+                if extra:
+                    raise ValueError(f"第 {line_no} 行包含表头中没有的字段: {', '.join(map(str, extra))}，"
+                                     "NDJSON 以第一个对象的键作为表头")
+                yield [_cell_value(record.get(key)) for key in header]
+            elif isinstance(record, list):
+                yield [_cell_value(value) for value in record]
+            else:
+                yield [record]
+
+
+def _iter_csv_rows(file_path: str, delimiter: str) -> Iterator[List[Any]]:
+    with open(file_path, "r", encoding="utf-8-sig", newline="") as f:
+        for row in csv.reader(f, delimiter=delimiter):
+            yield row
+
+
+def iter_rows(file_path: str, fmt: Optional[str] = None) -> Iterator[List[Any]]:
+    """
+    逐行读取数据文件
+
+    NDJSON 每行可以是数组（一行单元格）或对象。对象行以第一个对象的键作为表头，
+    之后的对象缺少的字段留空，包含表头中没有的字段时抛出ValueError。
+
+    Args:
+        file_path: 数据文件路径
+        fmt: 文件格式，为None时按扩展名判断
+
+    Returns:
+        行迭代器
+    """
+    fmt = detect_format(file_path, fmt)
+    if fmt == "ndjson":
+        return _iter_ndjson_rows(file_path)
+    return _iter_csv_rows(file_path, "\t" if fmt == "tsv" else ",")
+
+
+def iter_row_chunks(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                    fmt: Optional[str] = None) -> Iterator[List[List[Any]]]:
+    """
+    按块读取数据文件
+
+    Args:
+        file_path: 数据文件路径
+        chunk_size: 每块的行数
+        fmt: 文件格式，为None时按扩展名判断
+
+    Returns:
+        行块迭代器，每块最多包含 chunk_size 行
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size 必须大于0")
+    rows = iter_rows(file_path, fmt)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
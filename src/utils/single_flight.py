@@ -0,0 +1,128 @@
+"""
+请求合并模块
+同一时刻相同键的调用只执行一次：第一个调用执行，其余调用等待并共享它的结果或异常。
+同步调用在线程之间合并，异步调用在同一事件循环的任务之间合并
+"""
+
+import asyncio
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 1
+
+
+class SingleFlight:
+    """按键合并并发的相同调用"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        # 事件循环 -> {键: 执行中的任务}
+        self._flights: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, _Flight]]" = \
+            weakref.WeakKeyDictionary()
+        self._counts = dict.fromkeys(("calls", "executed", "coalesced"), 0)
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        执行调用，已有相同键的调用在执行时等待它的结果
+
+        Args:
+            key: 调用的键
+            func: 执行调用的函数
+
+        Returns:
+            (结果, 是否为共享的结果)
+        """
+        with self._lock:
+            self._counts["calls"] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._counts["executed"] += 1
+            else:
+                self._counts["coalesced"] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result, False
+
+    async def ado(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        异步执行调用，参见 do
+
+        调用在单独的任务中执行：某个等待者被取消不影响其他等待者，所有等待者都被取消时任务也被取消。
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._counts["calls"] += 1
+            flights = self._flights.get(loop)
+            if flights is None:
+                flights = self._flights[loop] = {}
+            flight = flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = flights[key] = _Flight(loop.create_task(func()))
+                flight.task.add_done_callback(lambda _, key=key, flight=flight: self._forget(flights, key, flight))
+                self._counts["executed"] += 1
+            else:
+                flight.waiters += 1
+                self._counts["coalesced"] += 1
+
+        try:
+            result = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.done():
+                with self._lock:
+                    flight.waiters -= 1
+                    if flight.waiters == 0:
+                        flight.task.cancel()
+            raise
+        return result, not leader
+
+    def _forget(self, flights: Dict[Hashable, _Flight], key: Hashable, flight: _Flight):
+        with self._lock:
+            if flights.get(key) is flight:
+                del flights[key]
+
+    def stats(self) -> Dict[str, int]:
+        """调用数、实际执行数和被合并的调用数"""
+        with self._lock:
+            return dict(self._counts)
+
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """进程内共享的请求合并器"""
+    return _single_flight
@@ -0,0 +1,190 @@
+"""
+任务导入模块
+从CSV或NDJSON文件流式导入任务：逐行校验并规范化，合格的任务分批写入任务存储，
+不合格的行计数并记录原因，整个文件不会一次性加载到内存
+"""
+
+import io
+import re
+import csv
+import json
+import os
+import time
+from datetime import date
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.utils.row_reader import detect_format
+from src.utils.task_index import PRIORITY_ORDER
+from src.utils.task_store import TaskStore, normalize_task, open_task_store
+
+# 导入时每个事务包含的任务数；事务越大，提交时的检查点开销分摊得越少
+DEFAULT_IMPORT_BATCH_SIZE = 10000
+
+# 结果中最多列出的被拒绝行数
+MAX_REPORTED_REJECTIONS = 20
+
+# 已知的任务字段，表头匹配时不区分大小写
+TASK_FIELDS = ("id", "title", "description", "priority", "status", "due_date")
+
+# 可识别的截止日期：2025-04-10、2025/4/10、2025.04.10、20250410，其后的时间部分忽略
+DATE_PATTERN = re.compile(r"(\d{4})(?:([-/.])(\d{1,2})\2(\d{1,2})|(\d{2})(\d{2}))(?:[T ].*)?$")
+
+
+class RowRejected(ValueError):
+    """数据行未通过校验"""
+
+
+def _parse_date(value: Any) -> str:
+    # 逐行调用，用预编译的正则代替 strptime
+    text = str(value).strip()
+    match = DATE_PATTERN.match(text)
+    if match:
+        year, _, month, day, month2, day2 = match.groups()
+        try:
+            return date(int(year), int(month or month2), int(day or day2)).isoformat()
+        except ValueError:
+            pass
+    raise RowRejected(f"无法识别的截止日期: {text}")
+
+
+@lru_cache(maxsize=256)
+def _field_name(key: str) -> str:
+    key = key.strip()
+    return key.lower() if key.lower() in TASK_FIELDS else key
+
+
+def validate_task(record: Any) -> Dict[str, Any]:
+    """
+    校验并规范化一条任务记录
+
+    空值视为缺失；标题必填，优先级须为已知取值，截止日期统一为 YYYY-MM-DD。
+    源文件中的 id 保存为 source_id，任务ID由任务列表重新分配。
+
+    Args:
+        record: 从文件读取的一条记录
+
+    Returns:
+        规范化后的任务
+    """
+    if not isinstance(record, dict):
+        raise RowRejected("记录必须是对象")
+    task: Dict[str, Any] = {}
+    for key, value in record.items():
+        if key is None:
+            raise RowRejected("列数多于表头")
+        if isinstance(value, str):
+            value = value.strip()
+            if not value:
+                continue
+        elif value is None:
+            continue
+        task[_field_name(str(key))] = value
+
+    if not isinstance(task.get("title"), (str, int, float)):
+        raise RowRejected("缺少标题")
+    task["title"] = str(task["title"])
+    if "id" in task:
+        task["source_id"] = task.pop("id")
+    if "priority" in task:
+        task["priority"] = str(task["priority"]).lower()
+        if task["priority"] not in PRIORITY_ORDER:
+            raise RowRejected(f"未知的优先级: {task['priority']}，可选: {', '.join(PRIORITY_ORDER)}")
+    if "status" in task:
+        task["status"] = str(task["status"]).lower()
+    if "due_date" in task:
+        task["due_date"] = _parse_date(task["due_date"])
+    return normalize_task(task)
+
+
+def _iter_ndjson_records(f) -> Iterator[Tuple[int, Any]]:
+    for line_no, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, RowRejected(f"不是合法的JSON: {e.msg}")
+
+
+def _iter_csv_records(f, delimiter: str) -> Iterator[Tuple[int, Any]]:
+    reader = csv.DictReader(f, delimiter=delimiter)
+    for record in reader:
+        # 记录所在的行号（多行单元格取最后一行）
+        yield reader.line_num, record
+
+
+def import_tasks(task_list_path: str, file_path: str, fmt: Optional[str] = None,
+                 batch_size: int = DEFAULT_IMPORT_BATCH_SIZE,
+                 progress: Optional[Callable[[float, Optional[float]], None]] = None) -> Dict[str, Any]:
+    """
+    从CSV或NDJSON文件导入任务
+
+    CSV 第一行为表头；NDJSON 每行一个任务对象。任务列表不存在时按扩展名新建。
+
+    Args:
+        task_list_path: 目标任务列表文件路径
+        file_path: 数据文件路径
+        fmt: 文件格式（"csv"、"tsv"、"ndjson"），为None时按扩展名判断
+        batch_size: 每个事务写入的任务数
+        progress: 进度回调 progress(已读取字节数, 文件总字节数)
+
+    Returns:
+        导入统计：imported、rejected、rejected_rows（前若干个被拒绝的行号和原因）、
+        total_tasks、elapsed_seconds、rows_per_second
+    """
+    fmt = detect_format(file_path, fmt)
+    if batch_size < 1:
+        raise ValueError("batch_size 必须大于0")
+    # SQLite 打开时就会创建文件，需在打开前判断
+    is_new = not os.path.exists(task_list_path)
+    with open_task_store(task_list_path) as store:
+        if is_new:
+            store.create([])
+        stats = _import_into(store, file_path, fmt, batch_size, progress)
+        stats["total_tasks"] = store.count()
+    return stats
+
+
+def _import_into(store: TaskStore, file_path: str, fmt: str, batch_size: int,
+                 progress: Optional[Callable[[float, Optional[float]], None]]) -> Dict[str, Any]:
+    total_size = os.path.getsize(file_path)
+    stats = {"rows": 0, "rejected": 0}
+    rejected_rows: List[Dict[str, Any]] = []
+    start = time.perf_counter()
+
+    with open(file_path, "rb") as raw:
+        f = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="" if fmt != "ndjson" else None)
+        records = _iter_ndjson_records(f) if fmt == "ndjson" else \
+            _iter_csv_records(f, "\t" if fmt == "tsv" else ",")
+
+        def valid_tasks() -> Iterator[Dict[str, Any]]:
+            for line_no, record in records:
+                stats["rows"] += 1
+                try:
+                    if isinstance(record, RowRejected):
+                        raise record
+                    task = validate_task(record)
+                except RowRejected as e:
+                    stats["rejected"] += 1
+                    if len(rejected_rows) < MAX_REPORTED_REJECTIONS:
+                        rejected_rows.append({"line": line_no, "reason": str(e)})
+                    continue
+                yield task
+                if progress is not None and (stats["rows"] - stats["rejected"]) % batch_size == 0:
+                    # 按底层文件已读取的字节数报告进度（含文本层的预读）
+                    progress(raw.tell(), total_size)
+
+        imported = store.add_many(valid_tasks(), batch_size=batch_size)
+
+    if progress is not None:
+        progress(total_size, total_size)
+    elapsed = time.perf_counter() - start
+    return {
+        "imported": imported,
+        "rejected": stats["rejected"],
+        "rejected_rows": rejected_rows,
+        "rows": stats["rows"],
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(stats["rows"] / elapsed) if elapsed > 0 else None,
+    }
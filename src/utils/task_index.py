@@ -0,0 +1,296 @@
+"""
+任务索引模块
+JSON 任务列表的二级索引：按 (截止日期, ID) 排序的列表和ID列表用 bisect 维护，状态和优先级使用ID集合，
+增删改时增量更新，并以JSON格式保存在任务列表旁边
+"""
+
+import os
+import json
+import math
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# 优先级从高到低，未列出的优先级排在最后
+PRIORITY_ORDER = ("urgent", "high", "medium", "low")
+
+# 索引文件格式版本（版本1按任务ID分配位图，读取时重建索引）
+INDEX_FORMAT = 2
+
+
+def priority_rank(priority: str) -> int:
+    """优先级的排序值，越小越靠前"""
+    try:
+        return PRIORITY_ORDER.index(priority)
+    except ValueError:
+        return len(PRIORITY_ORDER)
+
+
+def task_sort_key(task: Dict[str, Any], field: str) -> list:
+    """
+    任务的排序键，用于键集分页
+
+    第一项为分段号：按截止日期排序时，没有截止日期的任务在第二段。
+
+    Args:
+        task: 任务信息（含ID）
+        field: 排序字段，"id"、"due_date" 或 "priority"
+
+    Returns:
+        可JSON序列化的排序键
+    """
+    if field == "due_date":
+        due = task.get("due_date")
+        return [0, due, task["id"]] if due is not None else [1, task["id"]]
+    if field == "priority":
+        return [0, priority_rank(task["priority"]), task["id"]]
+    return [0, task["id"]]
+
+
+class _Mask:
+    """过滤结果：ID集合（None表示全部任务），按ID顺序遍历成员"""
+
+    def __init__(self, members: Optional[set], ids: List[int]):
+        self.members = members
+        # 所有任务ID，升序
+        self._ids = ids
+
+    def __contains__(self, task_id: int) -> bool:
+        return self.members is None or task_id in self.members
+
+    def ids(self, start: Optional[int] = None, descending: bool = False, end: Optional[int] = None) -> Iterator[int]:
+        """从 start（含）开始按ID顺序遍历成员；降序时从 end（不含）向前"""
+        # 结果较少时直接排序结果，否则按顺序扫描全部ID并逐个判断
+        if self.members is not None and len(self.members) * 4 < len(self._ids):
+            ordered = sorted(self.members)
+            check = False
+        else:
+            ordered = self._ids
+            check = self.members is not None
+        lo = 0 if start is None else bisect_left(ordered, start)
+        hi = len(ordered) if end is None else bisect_left(ordered, end)
+        for pos in (range(hi - 1, lo - 1, -1) if descending else range(lo, hi)):
+            task_id = ordered[pos]
+            if not check or task_id in self.members:
+                yield task_id
+
+
+class TaskIndex:
+    """
+    任务二级索引
+
+    due: 有截止日期的任务，按 (截止日期, ID) 排序
+    no_due: 没有截止日期的任务ID，升序
+    ids: 所有任务ID，升序
+    status / priority: 每个取值一个ID集合（任务ID可以是任意整数，不按ID分配位图）
+    """
+
+    def __init__(self):
+        self.due: List[Tuple[str, int]] = []
+        self.no_due: List[int] = []
+        self.ids: List[int] = []
+        self.status: Dict[str, set] = {}
+        self.priority: Dict[str, set] = {}
+
+    @classmethod
+    def from_tasks(cls, tasks) -> "TaskIndex":
+        index = cls()
+        due = []
+        for task in tasks:
+            index._add_to_sets(task)
+            index.ids.append(task["id"])
+            if task.get("due_date") is not None:
+                due.append((task["due_date"], task["id"]))
+            else:
+                index.no_due.append(task["id"])
+        index.due = sorted(due)
+        index.no_due.sort()
+        index.ids.sort()
+        return index
+
+    def _add_to_sets(self, task: Dict[str, Any]):
+        self.status.setdefault(task["status"], set()).add(task["id"])
+        self.priority.setdefault(task["priority"], set()).add(task["id"])
+
+    def add(self, task: Dict[str, Any]):
+        """加入一个任务"""
+        self._add_to_sets(task)
+        insort(self.ids, task["id"])
+        if task.get("due_date") is not None:
+            insort(self.due, (task["due_date"], task["id"]))
+        else:
+            insort(self.no_due, task["id"])
+
+    def remove(self, task: Dict[str, Any]):
+        """移除一个任务"""
+        task_id = task["id"]
+        pos = bisect_left(self.ids, task_id)
+        if pos < len(self.ids) and self.ids[pos] == task_id:
+            del self.ids[pos]
+        for sets, value in ((self.status, task["status"]), (self.priority, task["priority"])):
+            if value in sets:
+                sets[value].discard(task_id)
+        if task.get("due_date") is not None:
+            pos = bisect_left(self.due, (task["due_date"], task_id))
+            if pos < len(self.due) and self.due[pos] == (task["due_date"], task_id):
+                del self.due[pos]
+        else:
+            pos = bisect_left(self.no_due, task_id)
+            if pos < len(self.no_due) and self.no_due[pos] == task_id:
+                del self.no_due[pos]
+
+    def _mask(self, status: Optional[List[str]], priority: Optional[List[str]],
+              due_from: Optional[str], due_to: Optional[str]) -> _Mask:
+        members = None
+        for sets, wanted in ((self.status, status), (self.priority, priority)):
+            if wanted:
+                selected = set().union(*(sets[item] for item in wanted if item in sets))
+                members = selected if members is None else members & selected
+        if due_from is not None or due_to is not None:
+            in_range = {task_id for _, task_id in self._due_range(due_from, due_to)}
+            members = in_range if members is None else members & in_range
+        return _Mask(members, self.ids)
+
+    def _due_range(self, due_from: Optional[str], due_to: Optional[str]) -> List[Tuple[str, int]]:
+        lo = 0 if due_from is None else bisect_left(self.due, (due_from,))
+        # 截止日期为 due_to 的任务也包含在内
+        hi = len(self.due) if due_to is None else bisect_right(self.due, (due_to, math.inf))
+        return self.due[lo:hi]
+
+    def query(self, status: Optional[List[str]] = None, priority: Optional[List[str]] = None,
+              due_from: Optional[str] = None, due_to: Optional[str] = None, field: str = "due_date",
+              descending: bool = False, last_key: Optional[list] = None, limit: int = 100) -> List[int]:
+        """
+        按过滤条件和排序返回任务ID
+
+        Args:
+            status: 状态列表（任一匹配）
+            priority: 优先级列表（任一匹配）
+            due_from: 截止日期下限（含）
+            due_to: 截止日期上限（含）
+            field: 排序字段
+            descending: 是否降序
+            last_key: 上一页最后一个任务的排序键
+            limit: 返回数量
+
+        Returns:
+            任务ID列表
+        """
+        if field == "due_date":
+            ids = self._by_due(status, priority, due_from, due_to, descending, last_key)
+        elif field == "priority":
+            mask = self._mask(status, priority, due_from, due_to)
+            ids = self._by_priority(mask, descending, last_key)
+        else:
+            mask = self._mask(status, priority, due_from, due_to)
+            if last_key is None:
+                ids = mask.ids(descending=descending)
+            elif descending:
+                ids = mask.ids(descending=True, end=last_key[1])
+            else:
+                ids = mask.ids(start=last_key[1] + 1)
+        result = []
+        for task_id in ids:
+            result.append(task_id)
+            if len(result) >= limit:
+                break
+        return result
+
+    def _by_due(self, status, priority, due_from, due_to, descending, last_key) -> Iterator[int]:
+        ranged = due_from is not None or due_to is not None
+        mask = self._mask(status, priority, None, None) if (status or priority) else None
+        entries = self._due_range(due_from, due_to) if ranged else self.due
+        # 有日期的任务为第0段，没有日期的任务为第1段（指定日期范围时不包含）
+        segments = [(0, entries), (1, [] if ranged else self.no_due)]
+        if descending:
+            segments.reverse()
+        for segment, items in segments:
+            if last_key is not None:
+                if (segment < last_key[0]) != descending and segment != last_key[0]:
+                    continue
+                if segment == last_key[0]:
+                    key = tuple(last_key[1:]) if segment == 0 else last_key[1]
+                    if descending:
+                        items = items[:bisect_left(items, key)]
+                    else:
+                        items = items[bisect_right(items, key):]
+            for item in (reversed(items) if descending else items):
+                task_id = item[1] if segment == 0 else item
+                if mask is None or task_id in mask:
+                    yield task_id
+
+    def _by_priority(self, mask: _Mask, descending: bool, last_key: Optional[list]) -> Iterator[int]:
+        groups: Dict[int, set] = {}
+        for value, members in self.priority.items():
+            groups.setdefault(priority_rank(value), set()).update(members if mask.members is None else members & mask.members)
+        for rank in sorted(groups, reverse=descending):
+            if last_key is not None and ((rank < last_key[1]) != descending) and rank != last_key[1]:
+                continue
+            group = _Mask(groups[rank], self.ids)
+            if last_key is not None and rank == last_key[1]:
+                yield from group.ids(descending=True, end=last_key[2]) if descending else group.ids(start=last_key[2] + 1)
+            else:
+                yield from group.ids(descending=descending)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "format": INDEX_FORMAT,
+            "due": self.due,
+            "no_due": self.no_due,
+            "ids": self.ids,
+            "status": {value: sorted(members) for value, members in self.status.items()},
+            "priority": {value: sorted(members) for value, members in self.priority.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TaskIndex":
+        if data.get("format") != INDEX_FORMAT:
+            raise ValueError("不支持的索引格式")
+        index = cls()
+        index.due = [(due, task_id) for due, task_id in data["due"]]
+        index.no_due = list(data["no_due"])
+        index.ids = list(data["ids"])
+        index.status = {value: set(members) for value, members in data["status"].items()}
+        index.priority = {value: set(members) for value, members in data["priority"].items()}
+        return index
+
+
+def index_path(task_list_path: str) -> str:
+    """索引文件路径（与任务列表同目录）"""
+    return f"{task_list_path}.idx"
+
+
+def save_index(path: str, index: TaskIndex, source: Tuple[int, ...]):
+    """
+    保存索引，并记录其对应的任务列表文件版本
+
+    Args:
+        path: 任务列表文件路径
+        index: 索引
+        source: 任务列表文件写入后的版本标识
+    """
+    data = {"source": list(source), **index.to_dict()}
+    temp_path = f"{index_path(path)}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(temp_path, index_path(path))
+
+
+def load_index(path: str, source: Tuple[int, ...]) -> Optional[TaskIndex]:
+    """
+    读取索引，索引不存在或与任务列表文件版本不一致时返回None
+
+    Args:
+        path: 任务列表文件路径
+        source: 任务列表文件当前的版本标识
+
+    Returns:
+        索引
+    """
+    try:
+        with open(index_path(path), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("source") != list(source):
+            return None
+        return TaskIndex.from_dict(data)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
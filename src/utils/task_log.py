@@ -0,0 +1,126 @@
+"""
+任务列表日志模块
+JSON 任务列表的预写日志：每次写入作为一行JSON追加到 <列表>.wal，追加和合并在 fcntl 排他锁下进行，
+读取持有共享锁；日志合并回快照时先落盘新快照，再截断日志
+"""
+
+import os
+import json
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # Windows 没有 fcntl，此时只保证单进程内的写入安全
+    fcntl = None
+
+
+def log_path(task_list_path: str) -> str:
+    """日志文件路径（与任务列表同目录）"""
+    return f"{task_list_path}.wal"
+
+
+def file_version(st: os.stat_result) -> Tuple[int, int, int]:
+    """文件版本标识：快照每次替换都会得到新的 inode"""
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+@contextmanager
+def locked_log(task_list_path: str, exclusive: bool) -> Iterator[Any]:
+    """
+    打开日志文件并加锁
+
+    Args:
+        task_list_path: 任务列表文件路径
+        exclusive: True 为写入用的排他锁，False 为读取用的共享锁
+
+    Yields:
+        以二进制方式打开的日志文件（共享锁时为只读，日志不存在时抛出 FileNotFoundError）
+    """
+    f = open(log_path(task_list_path), "a+b" if exclusive else "rb")
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield f
+    finally:
+        # 关闭文件时锁随之释放
+        f.close()
+
+
+def read_entries(f, offset: int) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    从指定位置读取完整的日志条目
+
+    末尾没有换行符的条目是中断的写入，不会被读取。
+
+    Args:
+        f: 日志文件
+        offset: 起始偏移
+
+    Returns:
+        (条目列表, 最后一个完整条目之后的偏移)
+    """
+    f.seek(offset)
+    data = f.read()
+    end = data.rfind(b"\n") + 1
+    entries = [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+    return entries, offset + end
+
+
+def append_entries(f, entries: List[Dict[str, Any]], valid_end: int) -> int:
+    """
+    追加日志条目（需持有排他锁）
+
+    Args:
+        f: 日志文件
+        entries: 条目列表
+        valid_end: 最后一个完整条目之后的偏移，之后的残留数据会被截掉
+
+    Returns:
+        追加后的文件末尾偏移
+    """
+    f.seek(0, os.SEEK_END)
+    if f.tell() != valid_end:
+        f.truncate(valid_end)
+    payload = b"".join(
+        json.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n" for entry in entries
+    )
+    # a+ 模式下写入总是追加到文件末尾
+    f.write(payload)
+    f.flush()
+    return valid_end + len(payload)
+
+
+def truncate_log(f):
+    """清空日志（需持有排他锁，且新快照已落盘）"""
+    f.truncate(0)
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def write_snapshot(task_list_path: str, data: Dict[str, Any]) -> Tuple[int, int, int]:
+    """
+    原子地写入快照并落盘
+
+    Args:
+        task_list_path: 任务列表文件路径
+        data: 快照内容
+
+    Returns:
+        新快照的文件版本标识
+    """
+    temp_path = f"{task_list_path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, task_list_path)
+    if os.name == "posix":
+        # 目录项也需要落盘，否则断电后可能仍是旧快照
+        fd = os.open(os.path.dirname(os.path.abspath(task_list_path)), os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    return file_version(os.stat(task_list_path))
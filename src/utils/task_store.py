@@ -0,0 +1,1046 @@
+"""
+任务存储模块
+任务列表的存储后端：SQLite 后端按状态、优先级和截止日期建立索引，每次写入都是独立事务；
+JSON 后端兼容原有的任务列表文件格式，写入追加到加锁的预写日志。后端可按名称注册扩展。
+两种后端都在每次修改时增量维护计数聚合，摘要只读取聚合而不扫描任务；
+每次写入使任务列表的版本号加1，写入时可传入期望版本做乐观并发检查
+"""
+
+import os
+import json
+import errno
+import heapq
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Type, Union
+
+from src.utils.pagination import decode_cursor, encode_cursor, query_fingerprint
+from src.utils.task_index import PRIORITY_ORDER, TaskIndex, load_index, save_index, task_sort_key
+from src.utils.task_log import (
+    append_entries,
+    file_version,
+    locked_log,
+    log_path,
+    read_entries,
+    truncate_log,
+    write_snapshot,
+)
+
+# 任务的默认状态和优先级
+DEFAULT_STATUS = "pending"
+DEFAULT_PRIORITY = "medium"
+
+# 已结束的状态，这些任务不计入逾期
+CLOSED_STATUSES = ("completed", "cancelled")
+
+# 批量写入时每个事务包含的任务数
+DEFAULT_BATCH_SIZE = 1000
+
+# 每个进程缓存的JSON任务列表数（缓存完整的任务、聚合和索引）
+JSON_STATE_CACHE_SIZE = 4
+
+# JSON任务列表的日志超过 max(COMPACT_MIN_BYTES, 快照大小 * COMPACT_RATIO) 时合并回快照
+COMPACT_MIN_BYTES = 64 * 1024
+COMPACT_RATIO = 0.5
+
+# 查询默认返回的任务数
+DEFAULT_QUERY_LIMIT = 100
+
+# 查询支持的排序字段，前缀"-"表示降序
+QUERY_SORT_KEYS = ("due_date", "priority", "id")
+
+
+class TaskNotFoundError(LookupError):
+    """任务ID不存在"""
+
+
+class VersionConflictError(RuntimeError):
+    """任务列表已被其他写入修改（乐观并发检查失败）"""
+
+    def __init__(self, current: int, expected: int):
+        super().__init__(f"任务列表版本冲突: 当前版本为 {current}，期望版本为 {expected}")
+        self.current = current
+        self.expected = expected
+
+
+def normalize_task(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    规范化任务字段
+
+    补全默认的状态和优先级，截止日期统一为字符串。
+
+    Args:
+        task: 任务信息
+
+    Returns:
+        规范化后的任务副本
+    """
+    if not isinstance(task, dict):
+        raise ValueError(f"任务必须是对象: {task!r}")
+    task = dict(task)
+    task["status"] = str(task.get("status") or DEFAULT_STATUS)
+    task["priority"] = str(task.get("priority") or DEFAULT_PRIORITY)
+    if task.get("due_date") is not None:
+        task["due_date"] = str(task["due_date"])
+    return task
+
+
+def is_task_id(value: Any) -> bool:
+    """是否可以直接用作任务ID（整数，不含布尔值）"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def renumber_task(task: Dict[str, Any], task_id: Optional[int]):
+    """
+    换用新的任务ID，原有的ID（如字符串ID或重复的ID）保留在 source_id 中
+
+    Args:
+        task: 任务信息（就地修改）
+        task_id: 新的任务ID，为None时去掉ID（由SQLite自动分配）
+    """
+    original = task.pop("id", None)
+    if original is not None:
+        task.setdefault("source_id", original)
+    if task_id is not None:
+        task["id"] = task_id
+
+
+def is_open(task: Dict[str, Any]) -> bool:
+    """任务是否未结束"""
+    return task["status"] not in CLOSED_STATUSES
+
+
+def build_summary(status_counts: Dict[str, int], priority_counts: Dict[str, int],
+                  earliest_due_date: Optional[str], overdue_tasks: int,
+                  created_at: Optional[str], version: Optional[int] = None) -> Dict[str, Any]:
+    """由聚合结果组装任务列表摘要"""
+    return {
+        "total_tasks": sum(status_counts.values()),
+        "pending_tasks": status_counts.get("pending", 0),
+        "completed_tasks": status_counts.get("completed", 0),
+        "priority_distribution": priority_counts,
+        "status_distribution": status_counts,
+        "earliest_due_date": earliest_due_date,
+        "overdue_tasks": overdue_tasks,
+        "created_at": created_at,
+        "version": version,
+    }
+
+
+class TaskStats:
+    """
+    任务列表的增量聚合
+
+    按状态和优先级计数，并记录未结束任务在每个截止日期上的数量，
+    最早截止日期和逾期数量只与不同日期的个数有关，与任务数无关。
+    """
+
+    def __init__(self, status_counts: Optional[Dict[str, int]] = None,
+                 priority_counts: Optional[Dict[str, int]] = None,
+                 open_due_counts: Optional[Dict[str, int]] = None):
+        self.status_counts = dict(status_counts or {})
+        self.priority_counts = dict(priority_counts or {})
+        self.open_due_counts = dict(open_due_counts or {})
+
+    @classmethod
+    def from_tasks(cls, tasks: Iterable[Dict[str, Any]]) -> "TaskStats":
+        stats = cls()
+        for task in tasks:
+            stats.add(task)
+        return stats
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TaskStats":
+        return cls(data.get("status"), data.get("priority"), data.get("open_due_dates"))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"status": self.status_counts, "priority": self.priority_counts,
+                "open_due_dates": self.open_due_counts}
+
+    @staticmethod
+    def _bump(counts: Dict[str, int], key: str, delta: int):
+        value = counts.get(key, 0) + delta
+        if value > 0:
+            counts[key] = value
+        else:
+            counts.pop(key, None)
+
+    def add(self, task: Dict[str, Any], delta: int = 1):
+        """计入一个任务（delta 为 -1 时移除）"""
+        self._bump(self.status_counts, task["status"], delta)
+        self._bump(self.priority_counts, task["priority"], delta)
+        if task.get("due_date") is not None and is_open(task):
+            self._bump(self.open_due_counts, task["due_date"], delta)
+
+    def remove(self, task: Dict[str, Any]):
+        """移除一个任务"""
+        self.add(task, -1)
+
+    @property
+    def total(self) -> int:
+        return sum(self.status_counts.values())
+
+    def summary(self, created_at: Optional[str] = None, today: Optional[str] = None,
+                version: Optional[int] = None) -> Dict[str, Any]:
+        """
+        生成任务列表摘要
+
+        Args:
+            created_at: 创建日期
+            today: 计算逾期使用的日期（ISO格式），默认为今天
+            version: 任务列表版本号
+
+        Returns:
+            摘要信息
+        """
+        today = today or date.today().isoformat()
+        return build_summary(
+            self.status_counts,
+            self.priority_counts,
+            min(self.open_due_counts, default=None),
+            sum(count for due, count in self.open_due_counts.items() if due < today),
+            created_at,
+            version,
+        )
+
+
+def _as_list(value: Union[str, List[str], None]) -> Optional[List[str]]:
+    if value is None or value == []:
+        return None
+    return [value] if isinstance(value, str) else [str(item) for item in value]
+
+
+def parse_sort(sort_by: str):
+    """解析排序参数，返回 (字段, 是否降序)"""
+    field = sort_by.lstrip("-")
+    if field not in QUERY_SORT_KEYS:
+        raise ValueError(f"不支持的排序字段: {sort_by}，可选: {', '.join(QUERY_SORT_KEYS)}")
+    return field, sort_by.startswith("-")
+
+
+def _batches(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class TaskStore(ABC):
+    """任务存储后端基类"""
+
+    # 后端名称及对应的文件扩展名（第一个为新建文件时使用的扩展名）
+    name = ""
+    extensions = ()
+
+    def __init__(self, path: str):
+        self.path = path
+        # 本对象最近一次写入后的版本号
+        self.last_version: Optional[int] = None
+
+    @abstractmethod
+    def create(self, tasks: Iterable[Dict[str, Any]], created_at: Optional[str] = None) -> int:
+        """新建任务列表（已存在时清空，版本号继续递增），返回写入的任务数"""
+
+    @abstractmethod
+    def add(self, task: Dict[str, Any], expected_version: Optional[int] = None) -> int:
+        """添加一个任务，返回任务ID；当前版本与 expected_version 不一致时抛出 VersionConflictError"""
+
+    @abstractmethod
+    def add_many(self, tasks: Iterable[Dict[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """分批添加任务，返回写入的任务数"""
+
+    @abstractmethod
+    def update(self, task_id: int, changes: Dict[str, Any], expected_version: Optional[int] = None) -> Dict[str, Any]:
+        """修改任务字段，返回修改后的任务；任务不存在时抛出 TaskNotFoundError"""
+
+    @abstractmethod
+    def delete(self, task_id: int, expected_version: Optional[int] = None):
+        """删除任务；任务不存在时抛出 TaskNotFoundError"""
+
+    @abstractmethod
+    def iter_tasks(self) -> Iterator[Dict[str, Any]]:
+        """按ID顺序遍历全部任务"""
+
+    @abstractmethod
+    def count(self) -> int:
+        """任务总数"""
+
+    @abstractmethod
+    def version(self) -> int:
+        """任务列表的当前版本号"""
+
+    @abstractmethod
+    def metadata(self) -> Dict[str, Any]:
+        """任务列表的元信息（如 created_at）"""
+
+    def compact(self):
+        """把尚未合并的写入合并到任务列表文件中，使文件可以单独复制"""
+
+    def summary(self, today: Optional[str] = None) -> Dict[str, Any]:
+        """
+        任务列表摘要
+
+        默认实现逐个扫描任务，维护了聚合的后端应覆盖此方法。
+
+        Args:
+            today: 计算逾期使用的日期（ISO格式），默认为今天
+
+        Returns:
+            摘要信息
+        """
+        return TaskStats.from_tasks(self.iter_tasks()).summary(self.metadata().get("created_at"), today,
+                                                               self.version())
+
+    def query(self, status: Union[str, List[str], None] = None, priority: Union[str, List[str], None] = None,
+              due_from: Optional[str] = None, due_to: Optional[str] = None, sort_by: str = "due_date",
+              limit: int = DEFAULT_QUERY_LIMIT, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        按条件查询任务，使用键集分页
+
+        按截止日期升序时，没有截止日期的任务排在最后；降序为升序的完全逆序。
+
+        Args:
+            status: 状态或状态列表（任一匹配）
+            priority: 优先级或优先级列表（任一匹配）
+            due_from: 截止日期下限（含）
+            due_to: 截止日期上限（含）
+            sort_by: 排序字段 "due_date"、"priority" 或 "id"，前缀"-"表示降序
+            limit: 返回的最大任务数
+            cursor: 上一页返回的 next_cursor
+
+        Returns:
+            {"tasks": 任务列表, "next_cursor": 下一页游标（没有更多时为None）}
+        """
+        field, descending = parse_sort(sort_by)
+        if limit < 1:
+            raise ValueError("limit 必须大于0")
+        status, priority = _as_list(status), _as_list(priority)
+        fingerprint = query_fingerprint(os.path.realpath(self.path), status, priority, due_from, due_to, sort_by)
+        last_key = decode_cursor(cursor, fingerprint) if cursor else None
+        # 多取一个用于判断是否还有下一页
+        tasks = self._select(status, priority, due_from, due_to, field, descending, last_key, limit + 1)
+        has_more = len(tasks) > limit
+        tasks = tasks[:limit]
+        return {
+            "tasks": tasks,
+            "next_cursor": encode_cursor(fingerprint, task_sort_key(tasks[-1], field)) if has_more else None,
+        }
+
+    def _select(self, status: Optional[List[str]], priority: Optional[List[str]], due_from: Optional[str],
+                due_to: Optional[str], field: str, descending: bool, last_key: Optional[list],
+                limit: int) -> List[Dict[str, Any]]:
+        """
+        返回排在 last_key 之后、满足条件的前 limit 个任务
+
+        默认实现逐个扫描任务，建有索引的后端应覆盖此方法。
+        """
+        def matches(task):
+            due = task.get("due_date")
+            if last_key is not None:
+                key = task_sort_key(task, field)
+                if (key <= last_key) if not descending else (key >= last_key):
+                    return False
+            return ((status is None or task["status"] in status)
+                    and (priority is None or task["priority"] in priority)
+                    and (due_from is None or (due is not None and due >= due_from))
+                    and (due_to is None or (due is not None and due <= due_to)))
+
+        select = heapq.nlargest if descending else heapq.nsmallest
+        return select(limit, filter(matches, self.iter_tasks()), key=lambda task: task_sort_key(task, field))
+
+    def close(self):
+        """释放后端占用的资源"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class _JsonListState:
+    """JSON任务列表在内存中的状态：快照加上已重放的日志"""
+
+    def __init__(self, created_at: Optional[str], version: int = 0):
+        self.created_at = created_at
+        self.version = version
+        self.tasks: Dict[int, Dict[str, Any]] = {}
+        self.stats = TaskStats()
+        self.index = TaskIndex()
+        self.next_id = 1
+        # 快照的文件版本标识，以及日志中已重放到的位置
+        self.snapshot = None
+        self.log_offset = 0
+
+    @classmethod
+    def load(cls, path: str) -> "_JsonListState":
+        with open(path, "r", encoding="utf-8") as f:
+            # 以打开的文件为准记录版本，避免读取期间文件被替换
+            snapshot = file_version(os.fstat(f.fileno()))
+            data = json.load(f)
+        state = cls(data.get("created_at"), data.get("version", 0))
+        tasks = [normalize_task(task) for task in data.get("tasks", [])]
+        # 旧文件中的任务可能没有ID、使用字符串ID或ID重复（手工编辑），按顺序重新编号并在 source_id 中保留原ID；
+        # 编号结果只取决于快照内容，日志可按ID引用
+        next_id = max((task["id"] for task in tasks if is_task_id(task.get("id"))), default=0) + 1
+        seen = set()
+        for task in tasks:
+            if is_task_id(task.get("id")) and task["id"] not in seen:
+                seen.add(task["id"])
+                continue
+            renumber_task(task, next_id)
+            next_id += 1
+        state.tasks = {task["id"]: task for task in tasks}
+        state.next_id = next_id
+        stats = TaskStats.from_dict(data["stats"]) if isinstance(data.get("stats"), dict) else None
+        # 旧文件没有聚合，或文件被手工修改过时重新统计
+        if stats is None or stats.total != len(tasks):
+            stats = TaskStats.from_tasks(tasks)
+        state.stats = stats
+        index = load_index(path, snapshot)
+        if index is None:
+            # 索引文件缺失或过期时重建并写回
+            index = TaskIndex.from_tasks(tasks)
+            try:
+                save_index(path, index, snapshot)
+            except OSError:
+                pass
+        state.index = index
+        state.snapshot = snapshot
+        return state
+
+    def insert(self, task: Dict[str, Any]):
+        self.tasks[task["id"]] = task
+        self.next_id = max(self.next_id, task["id"] + 1)
+        self.stats.add(task)
+        self.index.add(task)
+
+    def discard(self, task_id: int):
+        task = self.tasks.pop(task_id, None)
+        if task is not None:
+            self.stats.remove(task)
+            self.index.remove(task)
+
+    def apply(self, entry: Dict[str, Any]):
+        """应用一条日志；版本不大于当前版本的条目已包含在快照中"""
+        if entry["v"] <= self.version:
+            return
+        if entry["op"] == "add":
+            for task in entry["tasks"]:
+                self.insert(task)
+        elif entry["op"] == "update":
+            self.discard(entry["task"]["id"])
+            self.insert(entry["task"])
+        elif entry["op"] == "delete":
+            self.discard(entry["id"])
+        self.version = entry["v"]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "tasks": [self.tasks[task_id] for task_id in sorted(self.tasks)],
+            "created_at": self.created_at,
+            "total_tasks": self.stats.total,
+            "pending_tasks": self.stats.status_counts.get("pending", 0),
+            "version": self.version,
+            "stats": self.stats.to_dict(),
+        }
+
+
+# 各进程缓存最近使用的JSON任务列表状态，按真实路径索引
+_json_states: "OrderedDict[str, _JsonListState]" = OrderedDict()
+_json_lock = threading.RLock()
+
+
+class JsonTaskStore(TaskStore):
+    """
+    JSON 文件后端
+
+    与原有任务列表格式兼容：{"tasks": [...], "created_at", "total_tasks", "pending_tasks"}，
+    另在 "version" 和 "stats" 中保存版本号和聚合计数。
+    写入不再重写整个文件，而是在排他锁下向 <列表>.wal 追加一行日志，
+    日志超过快照大小的一定比例时合并回快照。读取时只重放上次之后新增的日志。
+    """
+
+    name = "json"
+    extensions = (".json",)
+
+    def _state(self, log) -> _JsonListState:
+        """返回与磁盘一致的状态（需持有日志锁）"""
+        key = os.path.realpath(self.path)
+        # 先移出缓存，出错时不会留下只更新了一部分的状态
+        state = _json_states.pop(key, None)
+        if state is None or state.snapshot != file_version(os.stat(self.path)):
+            state = _JsonListState.load(self.path)
+        if log is not None:
+            entries, state.log_offset = read_entries(log, state.log_offset)
+            for entry in entries:
+                state.apply(entry)
+        _json_states[key] = state
+        while len(_json_states) > JSON_STATE_CACHE_SIZE:
+            _json_states.popitem(last=False)
+        return state
+
+    @contextmanager
+    def _reading(self) -> Iterator[_JsonListState]:
+        """持有共享锁读取状态"""
+        with _json_lock:
+            if not os.path.exists(log_path(self.path)):
+                yield self._state(None)
+                return
+            with locked_log(self.path, exclusive=False) as log:
+                yield self._state(log)
+
+    @contextmanager
+    def _writing(self, expected_version: Optional[int] = None):
+        """持有排他锁写入，expected_version 与当前版本不一致时抛出 VersionConflictError"""
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), self.path)
+        with _json_lock, locked_log(self.path, exclusive=True) as log:
+            state = self._state(log)
+            if expected_version is not None and expected_version != state.version:
+                raise VersionConflictError(state.version, expected_version)
+            yield state, log
+
+    def _commit(self, state: _JsonListState, log, entry: Dict[str, Any]):
+        """追加一条日志并应用到状态，日志足够大时合并回快照"""
+        entry = {"v": state.version + 1, **entry}
+        state.log_offset = append_entries(log, [entry], state.log_offset)
+        state.apply(entry)
+        self.last_version = state.version
+        if state.log_offset > max(COMPACT_MIN_BYTES, state.snapshot[2] * COMPACT_RATIO):
+            self._compact(state, log)
+
+    def _compact(self, state: _JsonListState, log):
+        state.snapshot = write_snapshot(self.path, state.to_dict())
+        # 新快照已落盘，日志中的条目都已包含在内
+        truncate_log(log)
+        state.log_offset = 0
+        try:
+            save_index(self.path, state.index, state.snapshot)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _assign_ids(state: _JsonListState, tasks: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        next_id = state.next_id
+        assigned, seen = [], set()
+        for task in tasks:
+            task = normalize_task(task)
+            if not is_task_id(task.get("id")):
+                renumber_task(task, next_id)
+            if task["id"] in state.tasks or task["id"] in seen:
+                raise ValueError(f"任务ID已存在: {task['id']}")
+            next_id = max(next_id, task["id"]) + 1
+            seen.add(task["id"])
+            assigned.append(task)
+        return assigned
+
+    def create(self, tasks: Iterable[Dict[str, Any]], created_at: Optional[str] = None) -> int:
+        with _json_lock, locked_log(self.path, exclusive=True) as log:
+            version = 0
+            if os.path.exists(self.path):
+                try:
+                    version = self._state(log).version
+                except (OSError, ValueError):
+                    # 无法解析的旧文件直接覆盖
+                    pass
+            state = _JsonListState(created_at or date.today().isoformat(), version + 1)
+            for task in self._assign_ids(state, tasks):
+                state.insert(task)
+            self._compact(state, log)
+            _json_states[os.path.realpath(self.path)] = state
+            self.last_version = state.version
+        return len(state.tasks)
+
+    def add(self, task: Dict[str, Any], expected_version: Optional[int] = None) -> int:
+        with self._writing(expected_version) as (state, log):
+            task = self._assign_ids(state, [task])[0]
+            self._commit(state, log, {"op": "add", "tasks": [task]})
+        return task["id"]
+
+    def add_many(self, tasks: Iterable[Dict[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        added = 0
+        for batch in _batches(tasks, max(1, batch_size)):
+            with self._writing() as (state, log):
+                batch = self._assign_ids(state, batch)
+                self._commit(state, log, {"op": "add", "tasks": batch})
+            added += len(batch)
+        return added
+
+    def update(self, task_id: int, changes: Dict[str, Any], expected_version: Optional[int] = None) -> Dict[str, Any]:
+        with self._writing(expected_version) as (state, log):
+            if task_id not in state.tasks:
+                raise TaskNotFoundError(f"任务不存在: {task_id}")
+            task = normalize_task({**state.tasks[task_id], **changes, "id": task_id})
+            self._commit(state, log, {"op": "update", "task": task})
+        return dict(task)
+
+    def delete(self, task_id: int, expected_version: Optional[int] = None):
+        with self._writing(expected_version) as (state, log):
+            if task_id not in state.tasks:
+                raise TaskNotFoundError(f"任务不存在: {task_id}")
+            self._commit(state, log, {"op": "delete", "id": task_id})
+
+    def compact(self):
+        with self._writing() as (state, log):
+            if state.log_offset:
+                self._compact(state, log)
+
+    def iter_tasks(self) -> Iterator[Dict[str, Any]]:
+        with self._reading() as state:
+            tasks = [dict(state.tasks[task_id]) for task_id in sorted(state.tasks)]
+        return iter(tasks)
+
+    def count(self) -> int:
+        with self._reading() as state:
+            return state.stats.total
+
+    def version(self) -> int:
+        with self._reading() as state:
+            return state.version
+
+    def metadata(self) -> Dict[str, Any]:
+        with self._reading() as state:
+            return {"created_at": state.created_at, "version": state.version}
+
+    def summary(self, today: Optional[str] = None) -> Dict[str, Any]:
+        with self._reading() as state:
+            return state.stats.summary(state.created_at, today, state.version)
+
+    def _select(self, status, priority, due_from, due_to, field, descending, last_key, limit):
+        with self._reading() as state:
+            ids = state.index.query(status, priority, due_from, due_to, field, descending, last_key, limit)
+            return [dict(state.tasks[task_id]) for task_id in ids]
+
+
+# 优先级排序值的SQL表达式，与 task_index.priority_rank 一致
+PRIORITY_RANK_SQL = "CASE priority {} ELSE {} END".format(
+    " ".join(f"WHEN '{priority}' THEN {rank}" for rank, priority in enumerate(PRIORITY_ORDER)),
+    len(PRIORITY_ORDER),
+)
+
+
+def _aggregate_sql(row: str, delta: int) -> str:
+    """触发器中维护聚合计数的语句，row 为 NEW 或 OLD"""
+    closed = ", ".join(f"'{status}'" for status in CLOSED_STATUSES)
+    if delta > 0:
+        return f"""
+            INSERT INTO task_counts (field, value, count) VALUES ('status', {row}.status, 1)
+                ON CONFLICT (field, value) DO UPDATE SET count = count + 1;
+            INSERT INTO task_counts (field, value, count) VALUES ('priority', {row}.priority, 1)
+                ON CONFLICT (field, value) DO UPDATE SET count = count + 1;
+            INSERT INTO open_due_counts (due_date, count)
+                SELECT {row}.due_date, 1 WHERE {row}.due_date IS NOT NULL AND {row}.status NOT IN ({closed})
+                ON CONFLICT (due_date) DO UPDATE SET count = count + 1;
+        """
+    return f"""
+        UPDATE task_counts SET count = count - 1
+            WHERE (field = 'status' AND value = {row}.status) OR (field = 'priority' AND value = {row}.priority);
+        DELETE FROM task_counts
+            WHERE ((field = 'status' AND value = {row}.status) OR (field = 'priority' AND value = {row}.priority))
+            AND count <= 0;
+        UPDATE open_due_counts SET count = count - 1
+            WHERE due_date = {row}.due_date AND {row}.status NOT IN ({closed});
+        DELETE FROM open_due_counts WHERE due_date = {row}.due_date AND count <= 0;
+    """
+
+
+class SqliteTaskStore(TaskStore):
+    """
+    SQLite 后端
+
+    任务的完整字段以JSON保存，状态、优先级和截止日期另存为带索引的列；
+    添加任务只需一次B树插入，不再重写整个列表。
+    计数聚合由触发器在同一事务中维护，摘要只读取聚合表。
+    查询使用 (状态, 截止日期)、(优先级, 截止日期) 复合索引和优先级排序值的表达式索引。
+    """
+
+    name = "sqlite"
+    extensions = (".db", ".sqlite", ".sqlite3")
+
+    # 数据库结构版本，保存在 PRAGMA user_version 中
+    SCHEMA_VERSION = 2
+
+    SCHEMA = f"""
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value
+        );
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY,
+            status TEXT NOT NULL,
+            priority TEXT NOT NULL,
+            due_date TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, due_date);
+        CREATE INDEX IF NOT EXISTS idx_tasks_priority ON tasks (priority, due_date);
+        CREATE INDEX IF NOT EXISTS idx_tasks_due_date ON tasks (due_date);
+        CREATE INDEX IF NOT EXISTS idx_tasks_priority_rank ON tasks ({PRIORITY_RANK_SQL});
+
+        CREATE TABLE IF NOT EXISTS task_counts (
+            field TEXT NOT NULL,
+            value TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (field, value)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS open_due_counts (
+            due_date TEXT PRIMARY KEY,
+            count INTEGER NOT NULL
+        ) WITHOUT ROWID;
+
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_insert AFTER INSERT ON tasks BEGIN
+            {_aggregate_sql("NEW", 1)}
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_delete AFTER DELETE ON tasks BEGIN
+            {_aggregate_sql("OLD", -1)}
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_update AFTER UPDATE OF status, priority, due_date ON tasks BEGIN
+            {_aggregate_sql("OLD", -1)}
+            {_aggregate_sql("NEW", 1)}
+        END;
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        # 自行管理事务，写入使用 BEGIN IMMEDIATE 尽早获取写锁
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] < self.SCHEMA_VERSION:
+            self._migrate()
+
+    def _migrate(self):
+        with self._transaction():
+            # 其他连接可能已经完成升级
+            version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= self.SCHEMA_VERSION:
+                return
+            if version < 2:
+                # 状态和优先级索引改为带截止日期的复合索引
+                self.conn.execute("DROP INDEX IF EXISTS idx_tasks_status")
+                self.conn.execute("DROP INDEX IF EXISTS idx_tasks_priority")
+            for statement in _split_script(self.SCHEMA):
+                self.conn.execute(statement)
+            if version >= 1:
+                self.conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+                return
+            # 旧版本创建的列表没有聚合表，按现有任务重新统计
+            closed = ", ".join("?" for _ in CLOSED_STATUSES)
+            self.conn.execute("DELETE FROM task_counts")
+            self.conn.execute("DELETE FROM open_due_counts")
+            self.conn.execute("INSERT INTO task_counts SELECT 'status', status, COUNT(*) FROM tasks GROUP BY status")
+            self.conn.execute("INSERT INTO task_counts SELECT 'priority', priority, COUNT(*) FROM tasks GROUP BY priority")
+            self.conn.execute(
+                f"INSERT INTO open_due_counts SELECT due_date, COUNT(*) FROM tasks "
+                f"WHERE due_date IS NOT NULL AND status NOT IN ({closed}) GROUP BY due_date",
+                CLOSED_STATUSES,
+            )
+            self.conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    def _transaction(self):
+        return _Transaction(self.conn)
+
+    def _current_version(self) -> int:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return row[0] if row else 0
+
+    @contextmanager
+    def _writing(self, expected_version: Optional[int] = None):
+        """写事务：在写锁内检查期望版本，提交前把版本号加1"""
+        with self._transaction():
+            if expected_version is not None:
+                current = self._current_version()
+                if current != expected_version:
+                    raise VersionConflictError(current, expected_version)
+            yield
+            self.last_version = self.conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('version', 1) "
+                "ON CONFLICT (key) DO UPDATE SET value = value + 1 RETURNING value"
+            ).fetchall()[0][0]
+
+    @staticmethod
+    def _row(task: Dict[str, Any]):
+        task = normalize_task(task)
+        task_id = task.get("id")
+        if is_task_id(task_id):
+            del task["id"]
+        else:
+            renumber_task(task, None)
+            task_id = None
+        return (task_id, task["status"], task["priority"],
+                task.get("due_date"), json.dumps(task, ensure_ascii=False))
+
+    def _insert(self, tasks: Iterable[Dict[str, Any]]) -> int:
+        try:
+            cursor = self.conn.executemany(
+                "INSERT INTO tasks (id, status, priority, due_date, data) VALUES (?, ?, ?, ?, ?)",
+                (self._row(task) for task in tasks),
+            )
+        except sqlite3.IntegrityError as e:
+            # 与JSON后端一致，重复的任务ID报告为ValueError
+            raise ValueError(f"任务ID已存在: {e}") from e
+        return cursor.rowcount
+
+    def create(self, tasks: Iterable[Dict[str, Any]], created_at: Optional[str] = None) -> int:
+        with self._transaction():
+            version = self._current_version()
+            self.conn.execute("DELETE FROM tasks")
+            self.conn.execute("DELETE FROM meta")
+            self.conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)",
+                                  [("created_at", created_at or date.today().isoformat()),
+                                   ("version", version + 1)])
+            added = self._insert(tasks)
+        self.last_version = version + 1
+        return added
+
+    def add(self, task: Dict[str, Any], expected_version: Optional[int] = None) -> int:
+        with self._writing(expected_version):
+            try:
+                cursor = self.conn.execute(
+                    "INSERT INTO tasks (id, status, priority, due_date, data) VALUES (?, ?, ?, ?, ?)",
+                    self._row(task),
+                )
+            except sqlite3.IntegrityError as e:
+                raise ValueError(f"任务ID已存在: {e}") from e
+        return cursor.lastrowid
+
+    def add_many(self, tasks: Iterable[Dict[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        added = 0
+        for batch in _batches(tasks, max(1, batch_size)):
+            with self._writing():
+                added += self._insert(batch)
+        return added
+
+    def update(self, task_id: int, changes: Dict[str, Any], expected_version: Optional[int] = None) -> Dict[str, Any]:
+        with self._writing(expected_version):
+            row = self.conn.execute("SELECT id, data FROM tasks WHERE id = ?", (task_id,)).fetchone()
+            if row is None:
+                raise TaskNotFoundError(f"任务不存在: {task_id}")
+            task = normalize_task({**self._task(row), **changes, "id": task_id})
+            _, status, priority, due_date, data = self._row(task)
+            self.conn.execute("UPDATE tasks SET status = ?, priority = ?, due_date = ?, data = ? WHERE id = ?",
+                              (status, priority, due_date, data, task_id))
+        return task
+
+    def delete(self, task_id: int, expected_version: Optional[int] = None):
+        with self._writing(expected_version):
+            if self.conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,)).rowcount == 0:
+                raise TaskNotFoundError(f"任务不存在: {task_id}")
+
+    @staticmethod
+    def _task(row) -> Dict[str, Any]:
+        task = json.loads(row[1])
+        return {"id": row[0], **task}
+
+    def iter_tasks(self) -> Iterator[Dict[str, Any]]:
+        for row in self.conn.execute("SELECT id, data FROM tasks ORDER BY id"):
+            yield self._task(row)
+
+    def _counts(self, field: str) -> Dict[str, int]:
+        return dict(self.conn.execute("SELECT value, count FROM task_counts WHERE field = ?", (field,)))
+
+    def count(self) -> int:
+        return sum(self._counts("status").values())
+
+    def version(self) -> int:
+        return self._current_version()
+
+    def metadata(self) -> Dict[str, Any]:
+        return dict(self.conn.execute("SELECT key, value FROM meta"))
+
+    def compact(self):
+        # 把WAL检查点写回数据库文件并清空WAL
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def summary(self, today: Optional[str] = None) -> Dict[str, Any]:
+        today = today or date.today().isoformat()
+        # 在同一个读事务中读取，保证各项聚合来自同一版本
+        self.conn.execute("BEGIN")
+        try:
+            earliest, overdue = self.conn.execute(
+                "SELECT (SELECT MIN(due_date) FROM open_due_counts), "
+                "(SELECT COALESCE(SUM(count), 0) FROM open_due_counts WHERE due_date < ?)",
+                (today,),
+            ).fetchone()
+            meta = self.metadata()
+            return build_summary(self._counts("status"), self._counts("priority"), earliest, overdue,
+                                 meta.get("created_at"), meta.get("version", 0))
+        finally:
+            self.conn.execute("COMMIT")
+
+    def _select(self, status, priority, due_from, due_to, field, descending, last_key, limit):
+        where, params = [], []
+        for column, values in (("status", status), ("priority", priority)):
+            if values:
+                where.append(f"{column} IN ({', '.join('?' for _ in values)})")
+                params.extend(values)
+        if due_from is not None:
+            where.append("due_date >= ?")
+            params.append(due_from)
+        if due_to is not None:
+            where.append("due_date <= ?")
+            params.append(due_to)
+
+        # 每段按索引顺序读取：(分段号, 分段条件, 排序列)
+        if field == "due_date":
+            segments = [(0, "due_date IS NOT NULL", ["due_date", "id"])]
+            if due_from is None and due_to is None:
+                segments.append((1, "due_date IS NULL", ["id"]))
+        elif field == "priority":
+            segments = [(0, None, [PRIORITY_RANK_SQL, "id"])]
+        else:
+            segments = [(0, None, ["id"])]
+        if descending:
+            segments.reverse()
+
+        rows = []
+        for segment, condition, columns in segments:
+            if len(rows) >= limit:
+                break
+            clauses, clause_params = list(where), list(params)
+            if condition:
+                clauses.append(condition)
+            if last_key is not None:
+                # 跳过游标之前的分段，游标所在分段从游标之后开始
+                if segment != last_key[0] and (segment < last_key[0]) != descending:
+                    continue
+                if segment == last_key[0]:
+                    clauses.append(f"({', '.join(columns)}) {'<' if descending else '>'} "
+                                   f"({', '.join('?' for _ in columns)})")
+                    clause_params.extend(last_key[1:])
+            order = ", ".join(f"{column} {'DESC' if descending else 'ASC'}" for column in columns)
+            sql = (f"SELECT id, data FROM tasks {'WHERE ' + ' AND '.join(clauses) if clauses else ''} "
+                   f"ORDER BY {order} LIMIT ?")
+            rows.extend(self.conn.execute(sql, clause_params + [limit - len(rows)]))
+        return [self._task(row) for row in rows]
+
+    def close(self):
+        self.conn.close()
+
+
+def _split_script(script: str) -> List[str]:
+    """把建表脚本拆成单条语句（触发器内部的分号不拆分）"""
+    statements, current = [], ""
+    for line in script.splitlines(keepends=True):
+        current += line
+        if sqlite3.complete_statement(current):
+            statements.append(current.strip())
+            current = ""
+    return [statement for statement in statements if statement]
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT，出错时回滚"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+# 已注册的后端
+TASK_STORE_BACKENDS: Dict[str, Type[TaskStore]] = {}
+
+
+def register_backend(backend: Type[TaskStore]) -> Type[TaskStore]:
+    """
+    注册任务存储后端，可用作类装饰器
+
+    Args:
+        backend: TaskStore 子类，需定义 name 和 extensions
+
+    Returns:
+        传入的后端类
+    """
+    TASK_STORE_BACKENDS[backend.name] = backend
+    return backend
+
+
+register_backend(JsonTaskStore)
+register_backend(SqliteTaskStore)
+
+# 新建任务列表时默认使用的后端，与原有客户端一致保存为.json文件
+DEFAULT_BACKEND = JsonTaskStore.name
+
+
+def backend_for_path(path: str) -> str:
+    """根据文件扩展名判断任务列表使用的后端"""
+    _, ext = os.path.splitext(path)
+    for name, backend in TASK_STORE_BACKENDS.items():
+        if ext.lower() in backend.extensions:
+            return name
+    raise ValueError(f"无法识别的任务列表格式: {path}")
+
+
+def open_task_store(path: str, backend: Optional[str] = None) -> TaskStore:
+    """
+    打开任务列表
+
+    Args:
+        path: 任务列表文件路径
+        backend: 后端名称，为None时按扩展名判断
+
+    Returns:
+        任务存储对象
+    """
+    name = backend or backend_for_path(path)
+    if name not in TASK_STORE_BACKENDS:
+        raise ValueError(f"不支持的任务存储后端: {name}，可选: {', '.join(TASK_STORE_BACKENDS)}")
+    return TASK_STORE_BACKENDS[name](path)
+
+
+def task_list_filename(filename: str, backend: Optional[str] = None) -> str:
+    """
+    新建任务列表的文件名（含扩展名）
+
+    文件名以某个后端的扩展名结尾时保持不变，否则按后端添加扩展名。
+
+    Args:
+        filename: 文件名，可以不含扩展名
+        backend: 后端名称，为None时按扩展名判断，没有可识别的扩展名时使用 DEFAULT_BACKEND
+
+    Returns:
+        文件名
+    """
+    if backend is not None and backend not in TASK_STORE_BACKENDS:
+        raise ValueError(f"不支持的任务存储后端: {backend}，可选: {', '.join(TASK_STORE_BACKENDS)}")
+    try:
+        detected = backend_for_path(filename)
+    except ValueError:
+        return f"{filename}{TASK_STORE_BACKENDS[backend or DEFAULT_BACKEND].extensions[0]}"
+    if backend is not None and backend != detected:
+        raise ValueError(f"文件扩展名与任务存储后端 {backend} 不符: {filename}")
+    return filename
+
+
+def convert_tasks(source: TaskStore, destination: TaskStore, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    在两个后端之间复制任务列表（用于JSON导入导出），任务ID和创建日期保持不变
+
+    Args:
+        source: 源任务列表
+        destination: 目标任务列表（会被清空）
+        batch_size: 每个事务写入的任务数
+
+    Returns:
+        复制的任务数
+    """
+    destination.create([], created_at=source.metadata().get("created_at"))
+    copied = destination.add_many(source.iter_tasks(), batch_size=batch_size)
+    # 导出的文件应能单独使用，不依赖尚未合并的日志
+    destination.compact()
+    return copied
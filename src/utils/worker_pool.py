@@ -0,0 +1,62 @@
+"""
+进程池模块
+按并发数复用常驻的进程池，避免每次调用都重新启动工作进程
+"""
+
+import os
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+# 工作进程的启动方式：服务器进程中有多个线程，fork 可能复制其他线程持有的锁，
+# 因此使用 forkserver，不支持时（如Windows）退回 spawn
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+_pools: Dict[int, ProcessPoolExecutor] = {}
+_lock = threading.Lock()
+
+
+def default_workers() -> int:
+    """默认并发数（CPU核数）"""
+    return os.cpu_count() or 1
+
+
+def get_process_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """
+    获取指定并发数的常驻进程池
+
+    Args:
+        max_workers: 最大工作进程数，为None时使用CPU核数
+
+    Returns:
+        进程池
+    """
+    workers = max(1, max_workers or default_workers())
+    with _lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            context = multiprocessing.get_context(START_METHOD)
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            _pools[workers] = pool
+        return pool
+
+
+def discard_process_pool(pool: ProcessPoolExecutor):
+    """移除已损坏的进程池（如工作进程异常退出），下次获取时重新创建"""
+    with _lock:
+        for workers, existing in list(_pools.items()):
+            if existing is pool:
+                del _pools[workers]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def shutdown_process_pools():
+    """关闭所有常驻进程池"""
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True, cancel_futures=True)
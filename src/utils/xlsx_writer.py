@@ -0,0 +1,81 @@
+"""
+流式XLSX写入模块
+基于xlsxwriter的constant_memory模式按行写入，超出单表行数上限时自动续写到新工作表
+"""
+
+import os
+import uuid
+from typing import Any, Dict, Iterable, List
+
+import xlsxwriter
+
+# Excel 单个工作表的最大行数
+MAX_ROWS_PER_SHEET = 1048576
+
+
+def _sheet_title(sheet_name: str, index: int) -> str:
+    if index == 1:
+        return sheet_name
+    suffix = f"_{index}"
+    # 工作表名称最长31个字符
+    return sheet_name[:31 - len(suffix)] + suffix
+
+
+def write_xlsx(file_path: str, row_chunks: Iterable[List[List[Any]]], sheet_name: str = "Sheet1",
+               repeat_header: bool = False, use_zip64: bool = False) -> Dict[str, Any]:
+    """
+    将行块流写入XLSX文件
+
+    constant_memory 模式下每写完一行即刷新到临时文件，内存中只保留当前行。
+    工作簿先写入同目录下的临时文件，成功后再替换目标文件，出错时不留下不完整的文件。
+
+    Args:
+        file_path: 输出文件路径
+        row_chunks: 行块迭代器
+        sheet_name: 工作表名称，续写的工作表追加 "_2"、"_3" 等后缀
+        repeat_header: 是否在续写的工作表中重复第一行作为表头
+        use_zip64: 是否启用ZIP64（输出超过4GB时需要）
+
+    Returns:
+        写入统计信息
+    """
+    temp_path = os.path.join(os.path.dirname(os.path.abspath(file_path)),
+                             f".{os.path.basename(file_path)}.{uuid.uuid4().hex}.part")
+    workbook = xlsxwriter.Workbook(temp_path, {
+        "constant_memory": True,
+        "use_zip64": use_zip64,
+    })
+    try:
+        try:
+            sheet_index = 1
+            worksheet = workbook.add_worksheet(_sheet_title(sheet_name, sheet_index))
+            header = None
+            row_idx = 0
+            total_rows = 0
+            for chunk in row_chunks:
+                for row in chunk:
+                    if header is None:
+                        header = row
+                    if row_idx >= MAX_ROWS_PER_SHEET:
+                        sheet_index += 1
+                        worksheet = workbook.add_worksheet(_sheet_title(sheet_name, sheet_index))
+                        row_idx = 0
+                        if repeat_header:
+                            worksheet.write_row(row_idx, 0, header)
+                            row_idx += 1
+                    worksheet.write_row(row_idx, 0, row)
+                    row_idx += 1
+                    total_rows += 1
+        finally:
+            # 出错时也要关闭，以清理 constant_memory 模式的临时文件
+            workbook.close()
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return {
+        "rows": total_rows,
+        "sheets": sheet_index,
+    }
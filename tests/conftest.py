@@ -0,0 +1,17 @@
+import sys
+import os
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.llm import LLMManager
+from tests.mock_openai_server import MockOpenAIServer
+
+
+@pytest.fixture
+def mock_server(monkeypatch):
+    """本地模拟服务器，注册为 mock 提供商；测试可以修改其 latency、error 等属性"""
+    with MockOpenAIServer(latency=0.05) as server:
+        monkeypatch.setitem(LLMManager.MODEL_CONFIGS, "mock", {"base_url": server.base_url, "models": ["mock-model"]})
+        yield server
@@ -0,0 +1,200 @@
+"""
+模拟 OpenAI 兼容接口的本地服务器
+在后台线程中提供 /v1/chat/completions（含流式响应），按设定的延迟返回回显最后一条用户消息的响应，
+用于测试和基准测试，不访问真实的模型服务
+"""
+
+import re
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, Optional, Union
+
+
+def _message_text(messages: Any) -> str:
+    """最后一条用户消息的文本"""
+    for message in reversed(messages or []):
+        if isinstance(message, dict) and message.get("role") == "user":
+            content = message.get("content")
+            return content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)
+    return ""
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # 响应头和响应体合并发送，避免 Nagle 算法与延迟确认叠加出约40毫秒的额外延迟
+    wbufsize = -1
+    disable_nagle_algorithm = True
+    server: "_Server"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, request: Dict[str, Any]):
+        """以 server-sent events 逐块发送响应，使用分块传输以保持连接"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        owner = self.server.owner
+        for i, event in enumerate(owner.stream_chunks(request)):
+            if i > 1 and owner.token_latency:
+                self.wfile.flush()
+                time.sleep(owner.token_latency)
+            data = f"data: {event}\n\n".encode("utf-8")
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"未知的路径: {self.path}", "type": "not_found"}})
+            return
+
+        owner = self.server.owner
+        owner._enter(request)
+        try:
+            delay = owner.latency(request) if callable(owner.latency) else owner.latency
+            if delay:
+                time.sleep(delay)
+            status = owner.error(request) if owner.error is not None else None
+            if not status and "stream_options" in request and not owner.stream_options:
+                status = 400
+            if status:
+                self._send_json(status, {"error": {"message": f"模拟错误 {status}", "type": "mock_error"}})
+                return
+            if request.get("stream"):
+                self._send_stream(request)
+            else:
+                self._send_json(200, owner.completion(request))
+        finally:
+            owner._leave()
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    owner: "MockOpenAIServer"
+
+
+class MockOpenAIServer:
+    """
+    模拟 OpenAI 兼容接口的服务器
+
+    用法:
+        with MockOpenAIServer(latency=0.05) as server:
+            LLMManager.MODEL_CONFIGS["mock"] = {"base_url": server.base_url, "models": ["mock-model"]}
+    """
+
+    def __init__(self, latency: Union[float, Callable[[Dict[str, Any]], float]] = 0.0,
+                 error: Optional[Callable[[Dict[str, Any]], Optional[int]]] = None,
+                 token_latency: float = 0.0, stream_options: bool = True,
+                 host: str = "127.0.0.1", port: int = 0):
+        """
+        Args:
+            latency: 每个请求的响应延迟（秒），或根据请求体计算延迟的函数
+            error: 根据请求体返回要注入的错误状态码（如429），返回None时正常响应
+            token_latency: 流式响应中相邻两个文本块的间隔（秒）
+            stream_options: 是否支持 stream_options 参数，为False时带该参数的请求返回400
+            host: 监听地址
+            port: 监听端口，为0时自动分配
+        """
+        self.latency = latency
+        self.error = error
+        self.token_latency = token_latency
+        self.stream_options = stream_options
+        # 已处理的请求数、同时处理的最大请求数和最近一次的请求体
+        self.requests = 0
+        self.last_request: Optional[Dict[str, Any]] = None
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._httpd = _Server((host, port), _Handler)
+        self._httpd.owner = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockOpenAIServer":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-openai", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self) -> "MockOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _enter(self, request: Dict[str, Any]):
+        with self._lock:
+            self.last_request = request
+            self.requests += 1
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+
+    def _leave(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def stream_chunks(self, request: Dict[str, Any]) -> Iterator[str]:
+        """根据请求体构造 chat.completion.chunk 事件（JSON文本），最后是 [DONE]"""
+        response = self.completion(request)
+        pieces = re.findall(r"\S+\s*", response["choices"][0]["message"]["content"])
+        base = {"id": response["id"], "object": "chat.completion.chunk", "created": response["created"],
+                "model": response["model"]}
+
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+            choice = {"index": 0, "delta": delta, "finish_reason": finish_reason}
+            return json.dumps({**base, "choices": [choice]}, ensure_ascii=False)
+
+        yield chunk({"role": "assistant", "content": ""})
+        for piece in pieces:
+            yield chunk({"content": piece})
+        yield chunk({}, "stop")
+        if (request.get("stream_options") or {}).get("include_usage"):
+            yield json.dumps({**base, "choices": [], "usage": response["usage"]})
+        yield "[DONE]"
+
+    def completion(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """根据请求体构造 chat.completion 响应"""
+        prompt = _message_text(request.get("messages"))
+        content = f"echo: {prompt}"
+        prompt_tokens = len(prompt.split())
+        completion_tokens = len(content.split())
+        return {
+            "id": f"chatcmpl-mock-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", ""),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
@@ -0,0 +1,170 @@
+import sys
+import os
+import asyncio
+import zipfile
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.office_tools import compress_files, extract_archive
+from src.libs.zipfile_mcp import create_zip_archive, extract_zip_archive
+from src.utils import archive
+
+
+@pytest.fixture
+def sample_folder(tmp_path):
+    """创建包含多种文件类型的目录"""
+    folder = tmp_path / "reports"
+    (folder / "2025").mkdir(parents=True)
+    (folder / "summary.txt").write_text("季度总结\n" * 20000, encoding="utf-8")
+    (folder / "2025" / "data.csv").write_text("id,value\n" + "".join(f"{i},{i * i}\n" for i in range(50000)))
+    (folder / "2025" / "chart.png").write_bytes(os.urandom(300 * 1024))
+    (folder / "random.bin").write_bytes(os.urandom(64 * 1024))
+    return folder
+
+
+def _check_archive(zip_path, folder):
+    with zipfile.ZipFile(zip_path) as zf:
+        assert zf.testzip() is None
+        infos = {info.filename: info for info in zf.infolist()}
+        for name, info in infos.items():
+            source = folder.parent / name
+            assert zf.read(name) == source.read_bytes()
+    return infos
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_compress_files(tmp_path, sample_folder, monkeypatch, parallel):
+    """测试并行压缩目录"""
+    if parallel:
+        monkeypatch.setattr(archive, "PARALLEL_THRESHOLD", 0)
+    zip_path = tmp_path / "out" / "reports.zip"
+    
+    result = compress_files([str(sample_folder), str(tmp_path / "missing.txt")], str(zip_path), max_workers=2)
+    assert result["success"]
+    assert result["files"] == 4
+    
+    infos = _check_archive(zip_path, sample_folder)
+    assert set(infos) == {"reports/summary.txt", "reports/2025/data.csv", "reports/2025/chart.png", "reports/random.bin"}
+    assert infos["reports/summary.txt"].compress_type == zipfile.ZIP_DEFLATED
+    # 已压缩格式及压缩后变大的数据直接存储
+    assert infos["reports/2025/chart.png"].compress_type == zipfile.ZIP_STORED
+    assert infos["reports/random.bin"].compress_type == zipfile.ZIP_STORED
+
+
+def test_compress_large_member_spooled(tmp_path, monkeypatch):
+    """测试大成员的压缩结果经临时文件写入"""
+    monkeypatch.setattr(archive, "SPOOL_THRESHOLD", 1024)
+    source = tmp_path / "big.log"
+    source.write_text("".join(f"line {i}\n" for i in range(100000)))
+    zip_path = tmp_path / "big.zip"
+    
+    result = compress_files([str(source)], str(zip_path))
+    assert result["success"]
+    with zipfile.ZipFile(zip_path) as zf:
+        assert zf.read("big.log") == source.read_bytes()
+    assert sorted(os.listdir(tmp_path)) == ["big.log", "big.zip"]
+
+
+@pytest.mark.parametrize("zip64", [False, True])
+def test_build_zip_records(tmp_path, sample_folder, monkeypatch, zip64):
+    """测试自行写入的ZIP记录：存储与压缩成员混合、非ASCII成员名及ZIP64扩展字段均可被 zipfile 读取校验"""
+    if zip64:
+        # 降低阈值，使小文件也写入ZIP64扩展字段和目录结束记录
+        monkeypatch.setattr(archive, "ZIP64_LIMIT", 1024)
+        monkeypatch.setattr(archive, "ZIP_FILECOUNT_LIMIT", 2)
+    (sample_folder / "说明.txt").write_text("中文成员名\n" * 100, encoding="utf-8")
+    members = archive.collect_members([str(sample_folder)])
+    zip_path = tmp_path / "mixed.zip"
+    
+    stats = archive.build_zip(str(zip_path), members, max_workers=2)
+    assert stats["files"] == 5
+    assert 0 < stats["stored"] < 5
+    infos = _check_archive(zip_path, sample_folder)
+    assert {info.compress_type for info in infos.values()} == {zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED}
+    source = sample_folder / "说明.txt"
+    # ZIP中的时间精度为2秒
+    expected = zipfile.ZipInfo.from_file(source).date_time
+    assert infos["reports/说明.txt"].date_time == expected[:5] + (expected[5] // 2 * 2,)
+    assert infos["reports/说明.txt"].external_attr >> 16 == os.stat(source).st_mode
+    assert sorted(os.listdir(tmp_path)) == ["mixed.zip", "reports"]
+
+
+def test_create_zip_archive_missing_file(tmp_path, sample_folder):
+    """测试zipfile工具：文件不存在时返回错误"""
+    result = create_zip_archive([str(sample_folder / "summary.txt"), str(tmp_path / "nope.txt")],
+                                str(tmp_path / "a.zip"))
+    assert not result["success"]
+    
+    result = create_zip_archive([str(sample_folder)], str(tmp_path / "a.zip"))
+    assert result["success"]
+    _check_archive(tmp_path / "a.zip", sample_folder)
+
+
+class FakeContext:
+    """记录进度通知的MCP上下文"""
+
+    def __init__(self):
+        self.progress = []
+
+    async def report_progress(self, progress, total=None, message=None):
+        self.progress.append((progress, total))
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_extract_archive(tmp_path, sample_folder, monkeypatch, parallel):
+    """测试并行解压及进度通知"""
+    if parallel:
+        monkeypatch.setattr(archive, "PARALLEL_THRESHOLD", 0)
+    zip_path = tmp_path / "reports.zip"
+    assert compress_files([str(sample_folder)], str(zip_path))["success"]
+    extract_to = tmp_path / "out"
+    ctx = FakeContext()
+    
+    result = asyncio.run(extract_archive(str(zip_path), str(extract_to), max_workers=2, ctx=ctx))
+    assert result["success"]
+    assert result["files"] == 4
+    for path in sample_folder.rglob("*"):
+        if path.is_file():
+            assert (extract_to / path.relative_to(sample_folder.parent)).read_bytes() == path.read_bytes()
+    
+    total = sum(path.stat().st_size for path in sample_folder.rglob("*") if path.is_file())
+    assert ctx.progress[-1] == (total, total)
+    assert [done for done, _ in ctx.progress] == sorted(done for done, _ in ctx.progress)
+
+
+def test_extract_zip_archive_filters(tmp_path, sample_folder):
+    """测试zipfile工具按glob模式筛选成员"""
+    zip_path = tmp_path / "reports.zip"
+    assert create_zip_archive([str(sample_folder)], str(zip_path))["success"]
+    extract_to = tmp_path / "out"
+    
+    result = asyncio.run(extract_zip_archive(str(zip_path), str(extract_to), include=["*.csv", "*.txt"],
+                                             exclude=["reports/summary.*"]))
+    assert result["success"]
+    assert result["files"] == 1
+    assert result["skipped"] == 3
+    extracted = sorted(str(p.relative_to(extract_to)) for p in extract_to.rglob("*") if p.is_file())
+    assert extracted == [os.path.join("reports", "2025", "data.csv")]
+
+
+def test_extract_archive_unsafe_names(tmp_path):
+    """测试成员名包含绝对路径或上级目录时不会写到解压目录之外"""
+    zip_path = tmp_path / "evil.zip"
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        zf.writestr("../escape.txt", "a")
+        zf.writestr("/abs/path.txt", "b")
+        zf.writestr("dir/", "")
+    extract_to = tmp_path / "out"
+    
+    result = asyncio.run(extract_archive(str(zip_path), str(extract_to)))
+    assert result["success"]
+    assert (extract_to / "escape.txt").read_text() == "a"
+    assert (extract_to / "abs" / "path.txt").read_text() == "b"
+    assert (extract_to / "dir").is_dir()
+    assert not (tmp_path / "escape.txt").exists()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
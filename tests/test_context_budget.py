@@ -0,0 +1,115 @@
+import sys
+import os
+import asyncio
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.llm import LLMManager
+from src.utils.context_budget import BudgetReport, ContextBudgeter, count_tokens, get_tokenizer
+from tests.mock_openai_server import MockOpenAIServer
+
+
+def _conversation(document: str):
+    """带工具调用的多轮对话，最后一条 user 消息附带长文档"""
+    return [
+        {"role": "system", "content": "你是办公助手"},
+        {"role": "user", "content": "读取报告"},
+        {"role": "assistant", "content": None,
+         "tool_calls": [{"id": "1", "type": "function", "function": {"name": "read_file", "arguments": "{}"}}]},
+        {"role": "tool", "tool_call_id": "1", "content": "x" * 40000},
+        {"role": "assistant", "content": "报告已读取" * 100},
+        {"role": "user", "content": "总结这份文档：\n" + document},
+    ]
+
+
+def test_count_tokens():
+    """测试令牌数估算：中文按字符计，ASCII按4个字符计，同一系列的模型共享分词器"""
+    tokenizer = get_tokenizer("qwen-plus")
+    assert tokenizer is get_tokenizer("deepseek-chat")
+    assert tokenizer.count("a" * 400) == 100
+    assert tokenizer.count("文档" * 50) == 100
+    messages = [{"role": "user", "content": "a" * 400}]
+    assert count_tokens(messages, "qwen-plus") > 100
+    
+    truncated = tokenizer.truncate("开头" + "中间" * 1000 + "结尾", 100)
+    assert tokenizer.count(truncated) <= 100
+    assert truncated.startswith("开头") and truncated.endswith("结尾")
+    assert "省略" in truncated
+
+
+def test_fit_within_budget_unchanged():
+    """测试未超出预算时消息原样返回"""
+    messages = [{"role": "user", "content": "你好"}]
+    result, report = ContextBudgeter().fit(messages, 1000, "qwen-plus")
+    assert result is messages
+    assert report.tokens_saved == 0 and report.fits
+
+
+def test_fit_truncates_tool_output_first():
+    """测试只截断过长的工具输出即可满足预算时，其他消息保持不变"""
+    messages = _conversation("段落。" * 100)
+    original = count_tokens(messages, "qwen-plus")
+    result, report = ContextBudgeter().fit(messages, original - 5000, "qwen-plus")
+    assert [m["role"] for m in result] == [m["role"] for m in messages]
+    assert len(result[3]["content"]) < len(messages[3]["content"])
+    assert result[5] is messages[5]
+    assert report.truncated == 1 and report.dropped == 0
+    assert report.tokens_saved == original - report.final_tokens > 0
+    assert report.fits
+    # 原消息不被修改
+    assert len(messages[3]["content"]) == 40000
+
+
+def test_fit_drops_older_turns_and_truncates_document():
+    """测试丢弃较早的轮次（工具调用和输出一起），保留 system 和最后的 user 消息，再截断长文档"""
+    messages = _conversation("段落内容。" * 5000)
+    result, report = ContextBudgeter().fit(messages, 3000, "qwen-plus")
+    assert [m["role"] for m in result] == ["system", "user"]
+    assert result[1]["content"].startswith("总结这份文档")
+    assert report.dropped == 4 and report.truncated == 1
+    assert report.final_tokens == count_tokens(result, "qwen-plus") <= 3000
+    
+    summaries = []
+    
+    def summarize(text):
+        summaries.append(text)
+        return "用户让助手读取了报告"
+    
+    result, report = ContextBudgeter(summarizer=summarize).fit(messages, 3000, "qwen-plus")
+    assert [m["role"] for m in result] == ["system", "system", "user"]
+    assert "用户让助手读取了报告" in result[1]["content"]
+    assert summaries[0].startswith("user: 读取报告")
+    assert report.summarized and report.fits
+
+
+def test_llm_manager_budget(monkeypatch):
+    """测试管理器按模型的上下文窗口压缩消息，并报告节省的令牌数"""
+    with MockOpenAIServer() as server:
+        monkeypatch.setitem(LLMManager.MODEL_CONFIGS, "mock", {
+            "base_url": server.base_url, "models": ["mock-model", "mock-long"],
+            "context_window": 4096, "context_windows": {"mock-long": 131072},
+        })
+        budgeter = ContextBudgeter()
+        llm = LLMManager(provider="mock", model="mock-model", api_key="test-key", budgeter=budgeter)
+        assert llm.get_context_window() == 4096
+        assert llm.get_context_window("mock-long") == 131072
+        
+        messages = _conversation("段落内容。" * 5000)
+        report = BudgetReport()
+        llm.chat_completion(messages, max_tokens=512, budget_report=report)
+        assert report.budget == 4096 - 512
+        assert report.fits and report.tokens_saved > 0
+        assert llm.count_tokens(server.last_request["messages"]) == report.final_tokens
+        
+        report = BudgetReport()
+        asyncio.run(llm.achat_completion(messages, max_tokens=256, budget_report=report))
+        assert report.budget == 4096 - 256
+        assert budgeter.budget_for(4096) == 4096 - 1024
+        assert budgeter.stats()["compacted"] == 2
+        assert budgeter.stats()["tokens_saved"] > 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
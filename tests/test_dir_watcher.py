@@ -0,0 +1,130 @@
+import sys
+import os
+import json
+import time
+import asyncio
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core import office_tools
+from src.utils import dir_watcher
+from src.utils.dir_watcher import DirectorySnapshot
+
+MODES = [
+    pytest.param(True, marks=pytest.mark.skipif(dir_watcher._libc is None, reason="inotify 不可用")),
+    False,
+]
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+@pytest.mark.parametrize("use_inotify", MODES)
+def test_directory_snapshot(tmp_path, use_inotify):
+    """测试目录快照随文件增删、重命名更新，子目录不计入"""
+    (tmp_path / "a.txt").write_text("a")
+    (tmp_path / "sub").mkdir()
+    changes = []
+    snapshot = DirectorySnapshot(str(tmp_path), poll_interval=0.05, use_inotify=use_inotify)
+    snapshot.add_listener(lambda: changes.append(1))
+    try:
+        assert snapshot.files() == [str(tmp_path / "a.txt")]
+        assert _wait_for(lambda: snapshot.mode == ("inotify" if use_inotify else "poll"))
+        
+        (tmp_path / "b.txt").write_text("b")
+        (tmp_path / "other").mkdir()
+        assert _wait_for(lambda: snapshot.files() == [str(tmp_path / "a.txt"), str(tmp_path / "b.txt")])
+        
+        (tmp_path / "a.txt").unlink()
+        (tmp_path / "b.txt").rename(tmp_path / "c.txt")
+        assert _wait_for(lambda: snapshot.files() == [str(tmp_path / "c.txt")])
+        assert json.loads(snapshot.text()) == snapshot.files()
+        assert changes
+    finally:
+        snapshot.stop()
+
+
+@pytest.mark.parametrize("use_inotify", MODES)
+def test_directory_snapshot_missing_directory(tmp_path, use_inotify):
+    """测试目录不存在时返回空列表，目录创建或删除后快照随之更新"""
+    folder = tmp_path / "later"
+    snapshot = DirectorySnapshot(str(folder), poll_interval=0.05, use_inotify=use_inotify)
+    try:
+        assert snapshot.files() == []
+        folder.mkdir()
+        (folder / "x.docx").write_text("x")
+        assert _wait_for(lambda: snapshot.files() == [str(folder / "x.docx")])
+        assert _wait_for(lambda: snapshot.mode == ("inotify" if use_inotify else "poll"))
+        
+        (folder / "x.docx").unlink()
+        folder.rmdir()
+        assert _wait_for(lambda: snapshot.files() == [])
+    finally:
+        snapshot.stop()
+
+
+class FakeSession:
+    """记录资源变化通知的MCP会话"""
+
+    def __init__(self):
+        self.updated = asyncio.Queue()
+
+    async def send_resource_updated(self, uri):
+        await self.updated.put(str(uri))
+
+
+def test_resource_updated_notification(tmp_path, monkeypatch):
+    """测试资源读取使用快照，目录变化时向订阅的会话发送 resources/updated 通知"""
+    uri = office_tools._resource_key("file://documents")
+    monkeypatch.setitem(office_tools._resource_snapshots, uri, None)
+    monkeypatch.setitem(office_tools._resource_subscribers, uri, {})
+    snapshot = office_tools.watch_resource("file://documents", str(tmp_path), poll_interval=0.05)
+    
+    async def scenario():
+        session = FakeSession()
+        office_tools._resource_subscribers[uri][session] = asyncio.get_running_loop()
+        assert json.loads(office_tools.documents()) == []
+        (tmp_path / "report.docx").write_text("x")
+        assert await asyncio.wait_for(session.updated.get(), timeout=5) == uri
+    
+    try:
+        asyncio.run(scenario())
+        assert json.loads(office_tools.documents()) == [str(tmp_path / "report.docx")]
+    finally:
+        snapshot.stop()
+
+
+def test_resource_watchers_start_with_server(tmp_path, monkeypatch):
+    """测试导入模块时不创建目录快照，服务器启动时才开始监视资源目录"""
+    monkeypatch.setattr(office_tools, "RESOURCE_DIRECTORIES", {"file://documents": str(tmp_path)})
+    monkeypatch.setattr(office_tools, "_resource_snapshots", {})
+    
+    async def scenario():
+        async with office_tools._server_lifespan(office_tools.mcp):
+            return office_tools._resource_snapshots[office_tools._resource_key("file://documents")]
+    
+    snapshot = asyncio.run(scenario())
+    try:
+        assert snapshot.path == str(tmp_path)
+        assert snapshot._thread is not None
+    finally:
+        snapshot.stop()
+
+
+def test_subscription_handlers_version_check(monkeypatch):
+    """测试只在支持的 mcp 版本上通过底层服务器注册资源订阅处理函数"""
+    assert office_tools._register_subscription_handlers(office_tools.FastMCP("test"))
+    monkeypatch.setattr(office_tools.importlib.metadata, "version", lambda name: "2.0.0")
+    assert not office_tools._register_subscription_handlers(office_tools.FastMCP("test"))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
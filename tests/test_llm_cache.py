@@ -0,0 +1,101 @@
+import sys
+import os
+import time
+import asyncio
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.llm import LLMManager
+from src.utils.llm_cache import ResponseCache, request_hash
+
+
+def _response(llm, text):
+    return llm.chat_completion([{"role": "user", "content": text}], temperature=0)
+
+
+def test_request_hash():
+    """测试请求哈希与参数顺序无关，不受超时等传输参数影响"""
+    messages = [{"role": "user", "content": "你好"}]
+    base = request_hash("qwen", {"model": "qwen-plus", "messages": messages, "temperature": 0})
+    assert base == request_hash("qwen", {"temperature": 0, "messages": messages, "model": "qwen-plus", "timeout": 5})
+    assert base != request_hash("deepseek", {"model": "qwen-plus", "messages": messages, "temperature": 0})
+    assert base != request_hash("qwen", {"model": "qwen-plus", "messages": messages, "temperature": 0, "max_tokens": 9})
+
+
+def test_chat_completion_cache(tmp_path, mock_server):
+    """测试确定性调用命中缓存，非确定性调用绕过缓存，SQLite 层跨实例共享"""
+    path = str(tmp_path / "cache.db")
+    with ResponseCache(path) as cache:
+        llm = LLMManager(provider="mock", model="mock-model", api_key="test-key", cache=cache)
+        first = _response(llm, "分类")
+        second = _response(llm, "分类")
+        assert second.choices[0].message.content == first.choices[0].message.content == "echo: 分类"
+        assert second.id == first.id
+        assert asyncio.run(llm.achat_completion([{"role": "user", "content": "分类"}], temperature=0)).id == first.id
+        assert mock_server.requests == 1
+        
+        llm.chat_completion([{"role": "user", "content": "分类"}], temperature=0.7)
+        llm.chat_completion([{"role": "user", "content": "分类"}])
+        assert mock_server.requests == 3
+        stats = cache.stats()
+        assert (stats["memory_hits"], stats["misses"], stats["bypassed"]) == (2, 1, 2)
+    
+    with ResponseCache(path) as cache:
+        llm = LLMManager(provider="mock", model="mock-model", api_key="test-key", cache=cache)
+        assert _response(llm, "分类").id == first.id
+        assert cache.stats()["disk_hits"] == 1
+        assert mock_server.requests == 3
+
+
+def test_cache_eviction(tmp_path, mock_server):
+    """测试内存层按字节数淘汰，SQLite 层按过期时间和总字节数淘汰"""
+    llm = LLMManager(provider="mock", model="mock-model", api_key="test-key")
+    responses = [_response(llm, f"文档 {i}") for i in range(10)]
+    size = max(len(r.model_dump_json().encode("utf-8")) for r in responses)
+    
+    with ResponseCache(str(tmp_path / "cache.db"), memory_max_bytes=size * 3, disk_max_bytes=size * 5) as cache:
+        for i, response in enumerate(responses):
+            cache.put(str(i), response)
+        assert cache.stats()["memory_entries"] == 3
+        assert cache.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 5
+        assert cache.get("0") is None
+        assert cache.get("9").id == responses[9].id
+    
+    with ResponseCache(str(tmp_path / "ttl.db"), ttl=0.05) as cache:
+        cache.put("a", responses[0])
+        assert cache.get("a") is not None
+        time.sleep(0.1)
+        assert cache.get("a") is None
+        assert cache.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 0
+
+
+def test_disk_size_total(tmp_path, mock_server):
+    """测试 SQLite 层的总字节数随写入、覆盖和删除更新，旧版本的缓存文件打开时补齐"""
+    llm = LLMManager(provider="mock", model="mock-model", api_key="test-key")
+    short, long = _response(llm, "短"), _response(llm, "长" * 200)
+    short_size, long_size = (len(r.model_dump_json().encode("utf-8")) for r in (short, long))
+    path = str(tmp_path / "cache.db")
+    
+    def total(cache):
+        actual = cache.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        assert cache._disk_total() == actual
+        return actual
+    
+    with ResponseCache(path) as cache:
+        cache.put("a", short)
+        cache.put("b", short)
+        cache.put("a", long)
+        assert total(cache) == short_size + long_size
+        cache.clear()
+        assert total(cache) == 0
+        cache.put("a", long)
+        cache.conn.execute("DROP TABLE responses_size")
+    
+    with ResponseCache(path) as cache:
+        assert total(cache) == long_size
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,118 @@
+import sys
+import os
+import signal
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.llm import LLMManager
+from src.utils import llm_config
+from src.utils.llm_config import ConfigError, ConfigService, parse_config
+from tests.mock_openai_server import MockOpenAIServer
+
+CONFIG = """
+default_provider: qwen
+default_model: qwen-plus
+api_keys:
+  qwen: "sk-qwen"
+  openai: "YOUR_OPENAI_API_KEY"
+  ollama:
+model_params:
+  temperature: 0.2
+  max_tokens: 500
+  seed: 7
+"""
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    """使用临时配置文件的配置服务"""
+    path = tmp_path / "config.yaml"
+    path.write_text(CONFIG, encoding="utf-8")
+    service = ConfigService(str(path), check_interval=0)
+    monkeypatch.setattr(llm_config, "_service", service)
+    return service
+
+
+def test_parse_config():
+    """测试配置校验：占位密钥和空值视为未配置，不合法的取值抛出 ConfigError"""
+    config = parse_config({
+        "api_keys": {"qwen": "sk-qwen", "openai": "YOUR_OPENAI_API_KEY", "ollama": None},
+        "model_params": {"temperature": 0, "top_p": 1, "seed": 7},
+    })
+    assert config.default_provider == "openai"
+    assert config.api_keys == {"qwen": "sk-qwen"}
+    assert config.model_params.as_kwargs() == {"temperature": 0.0, "top_p": 1.0, "seed": 7}
+    assert parse_config(None) == llm_config.LLMConfig()
+    
+    for data in ([], {"default_provider": 1}, {"api_keys": ["x"]}, {"model_params": {"temperature": 3}},
+                 {"model_params": {"max_tokens": True}}, {"model_params": {"top_p": "1"}}):
+        with pytest.raises(ConfigError):
+            parse_config(data)
+
+
+def test_default_config_path():
+    """测试默认读取项目 config 目录下的配置文件"""
+    assert llm_config.CONFIG_PATH == os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "config.yaml")
+
+
+def test_config_reload(service, tmp_path):
+    """测试只在文件变化时重新解析，重新加载失败时保留之前的配置"""
+    path = tmp_path / "config.yaml"
+    llm = LLMManager()
+    assert (llm.provider, llm.model) == ("qwen", "qwen-plus")
+    assert llm._options["api_key"] == "sk-qwen"
+    for _ in range(10):
+        LLMManager()
+    assert service.loads == 1
+    
+    path.write_text(CONFIG.replace("qwen-plus", "qwen-max"), encoding="utf-8")
+    os.utime(path, ns=(0, 10 ** 18))
+    assert LLMManager().model == "qwen-max"
+    assert service.loads == 2
+    
+    path.write_text("model_params: [", encoding="utf-8")
+    os.utime(path, ns=(0, 2 * 10 ** 18))
+    assert service.get().default_model == "qwen-max"
+    assert service.error
+    
+    path.unlink()
+    assert service.get() == llm_config.LLMConfig()
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGHUP"), reason="没有 SIGHUP")
+def test_config_reload_on_sighup(service, monkeypatch):
+    """测试收到 SIGHUP 后重新加载，未到检查间隔时不检查文件"""
+    service.check_interval = 3600
+    service.get()
+    monkeypatch.setattr(signal, "getsignal", lambda signum: signal.SIG_DFL)
+    previous = signal.getsignal(signal.SIGHUP)
+    assert llm_config.install_reload_signal()
+    try:
+        service.get()
+        assert service.loads == 1
+        os.kill(os.getpid(), signal.SIGHUP)
+        service.get()
+        assert service.loads == 2
+    finally:
+        signal.signal(signal.SIGHUP, previous)
+
+
+def test_model_params_applied(service):
+    """测试配置文件中的 model_params 作为默认参数，调用参数优先"""
+    with MockOpenAIServer() as server:
+        LLMManager.MODEL_CONFIGS["mock"] = {"base_url": server.base_url, "models": ["mock-model"]}
+        try:
+            llm = LLMManager(provider="mock", model="mock-model", api_key="test-key")
+            llm.chat_completion([{"role": "user", "content": "hi"}], temperature=0)
+            assert server.last_request["temperature"] == 0
+            assert server.last_request["max_tokens"] == 500
+            assert server.last_request["seed"] == 7
+        finally:
+            del LLMManager.MODEL_CONFIGS["mock"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
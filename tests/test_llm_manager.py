@@ -1,11 +1,16 @@
 import sys
 import os
+import asyncio
+import openai
 import pytest
 
 # 添加项目根目录到Python路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.core.llm import LLMManager
+from src.utils import llm_clients
+from src.utils.llm_stream import StreamMetrics
+from tests.mock_openai_server import MockOpenAIServer
 
 
 def test_llm_manager_initialization():
@@ -76,5 +81,178 @@ def test_update_model():
     assert llm.model == original_model
 
 
+def test_achat_completion(mock_server):
+    """测试异步调用使用 MODEL_CONFIGS 中的 base_url，且可在多个事件循环中调用"""
+    llm = LLMManager(provider="mock", model="mock-model", api_key="test-key")
+    messages = [{"role": "user", "content": "你好"}]
+    
+    for _ in range(2):
+        response = asyncio.run(llm.achat_completion(messages, temperature=0))
+        assert response.choices[0].message.content == "echo: 你好"
+        assert response.model == "mock-model"
+    assert llm.chat_completion(messages).choices[0].message.content == "echo: 你好"
+    assert mock_server.requests == 3
+
+
+def test_achat_many(mock_server):
+    """测试并发调用按输入顺序返回结果，且不超过并发上限"""
+    llm = LLMManager(provider="mock", model="mock-model", api_key="test-key")
+    message_sets = [[{"role": "user", "content": f"文档 {i}"}] for i in range(20)]
+    
+    responses = asyncio.run(llm.achat_many(message_sets, concurrency=4))
+    assert [r.choices[0].message.content for r in responses] == [f"echo: 文档 {i}" for i in range(20)]
+    assert mock_server.requests == 20
+    assert 1 < mock_server.max_in_flight <= 4
+    
+    with pytest.raises(ValueError):
+        asyncio.run(llm.achat_many(message_sets, concurrency=0))
+
+
+def test_achat_many_return_exceptions(mock_server):
+    """测试失败的请求：return_exceptions 为True时以异常对象返回，否则抛出异常"""
+    mock_server.error = lambda request: 400 if request["messages"][-1]["content"] == "bad" else None
+    llm = LLMManager(provider="mock", model="mock-model", api_key="test-key")
+    message_sets = [[{"role": "user", "content": text}] for text in ("a", "bad", "b")]
+    
+    responses = asyncio.run(llm.achat_many(message_sets, return_exceptions=True))
+    assert responses[0].choices[0].message.content == "echo: a"
+    assert isinstance(responses[1], openai.BadRequestError)
+    assert responses[2].choices[0].message.content == "echo: b"
+    
+    with pytest.raises(openai.BadRequestError):
+        asyncio.run(llm.achat_many(message_sets))
+
+
+def test_shared_clients(mock_server):
+    """测试相同提供商和密钥的管理器共享客户端，所有客户端共享一个连接池"""
+    first = LLMManager(provider="mock", model="mock-model", api_key="key-a")
+    second = LLMManager(provider="mock", model="mock-model", api_key="key-a")
+    other = LLMManager(provider="mock", model="mock-model", api_key="key-b")
+    
+    assert first.client is second.client
+    assert other.client is not first.client
+    assert other.client._client is first.client._client
+    assert "key-a" not in str(list(llm_clients._clients))
+    
+    # 关闭后重新获取的客户端可以正常使用
+    llm_clients.close_clients()
+    messages = [{"role": "user", "content": "你好"}]
+    assert first.chat_completion(messages).choices[0].message.content == "echo: 你好"
+    
+    async def scenario():
+        a, b = first._get_async_client(), second._get_async_client()
+        await first.achat_completion(messages)
+        await llm_clients.aclose_clients()
+        return a, b
+    
+    a, b = asyncio.run(scenario())
+    assert a is b
+    assert a._client.is_closed
+    assert asyncio.run(first.achat_completion(messages)).choices[0].message.content == "echo: 你好"
+
+
+def test_stream_chat_completion(mock_server):
+    """测试同步和异步流式调用逐块返回文本，并记录首个令牌时间、用量和耗时"""
+    mock_server.latency = 0
+    mock_server.token_latency = 0.02
+    llm = LLMManager(provider="mock", model="mock-model", api_key="test-key")
+    messages = [{"role": "user", "content": "一 二 三 四"}]
+    
+    metrics = StreamMetrics()
+    deltas = list(llm.stream_chat_completion(messages, metrics=metrics))
+    assert deltas == ["echo: ", "一 ", "二 ", "三 ", "四"]
+    assert metrics.content == "echo: 一 二 三 四"
+    assert (metrics.prompt_tokens, metrics.completion_tokens, metrics.usage_estimated) == (4, 5, False)
+    assert metrics.finish_reason == "stop"
+    assert 0 < metrics.ttft < metrics.latency
+    assert metrics.latency >= 0.08
+    assert metrics.tokens_per_second > 0
+    assert mock_server.last_request["stream_options"] == {"include_usage": True}
+    
+    async def consume():
+        metrics = StreamMetrics()
+        deltas = [delta async for delta in llm.astream_chat_completion(messages, metrics=metrics)]
+        return deltas, metrics
+    
+    deltas, metrics = asyncio.run(consume())
+    assert "".join(deltas) == "echo: 一 二 三 四"
+    assert metrics.as_dict()["completion_tokens"] == 5
+    assert metrics.as_dict()["ttft_seconds"] is not None
+
+
+def test_stream_without_stream_options(monkeypatch):
+    """测试提供商拒绝 stream_options 时去掉该参数重试，并按块数估算用量"""
+    monkeypatch.setattr(LLMManager, "_stream_usage_unsupported", set())
+    with MockOpenAIServer(stream_options=False) as server:
+        monkeypatch.setitem(LLMManager.MODEL_CONFIGS, "mock", {"base_url": server.base_url, "models": ["mock-model"]})
+        llm = LLMManager(provider="mock", model="mock-model", api_key="test-key")
+        messages = [{"role": "user", "content": "一 二"}]
+        
+        metrics = StreamMetrics()
+        assert "".join(llm.stream_chat_completion(messages, metrics=metrics)) == "echo: 一 二"
+        assert (metrics.completion_tokens, metrics.usage_estimated) == (3, True)
+        assert server.requests == 2
+        
+        # 之后的调用不再发送 stream_options
+        assert "".join(llm.stream_chat_completion(messages)) == "echo: 一 二"
+        assert server.requests == 3
+        with pytest.raises(openai.BadRequestError):
+            list(llm.stream_chat_completion(messages, stream_options={"include_usage": True}))
+
+
+def test_stream_unrelated_error_keeps_stream_options(monkeypatch, mock_server):
+    """测试与 stream_options 无关的400错误不会让之后的流式调用停止请求用量"""
+    monkeypatch.setattr(LLMManager, "_stream_usage_unsupported", set())
+    mock_server.error = lambda request: 400 if request["messages"][-1]["content"] == "过长" else None
+    llm = LLMManager(provider="mock", model="mock-model", api_key="test-key")
+    
+    with pytest.raises(openai.BadRequestError):
+        list(llm.stream_chat_completion([{"role": "user", "content": "过长"}]))
+    assert "mock" not in LLMManager._stream_usage_unsupported
+    
+    metrics = StreamMetrics()
+    assert "".join(llm.stream_chat_completion([{"role": "user", "content": "你好"}], metrics=metrics)) == "echo: 你好"
+    assert "stream_options" in mock_server.last_request
+    assert not metrics.usage_estimated
+
+
+def test_configure_clients_keeps_requests_in_flight(mock_server):
+    """测试重新配置连接池时，进行中的流式请求不受影响，旧的异步连接池由 aclose_clients 关闭"""
+    mock_server.latency = 0
+    mock_server.token_latency = 0.05
+    llm = LLMManager(provider="mock", model="mock-model", api_key="test-key")
+    messages = [{"role": "user", "content": "一 二 三 四"}]
+    
+    async def open_async_pool():
+        await llm.achat_completion(messages)
+        return llm._get_async_client()
+    
+    loop = asyncio.new_event_loop()
+    try:
+        async_client = loop.run_until_complete(open_async_pool())
+        old_client = llm.client
+        stream = llm.stream_chat_completion(messages)
+        deltas = [next(stream)]
+        llm_clients.configure_clients(max_keepalive_connections=10)
+        assert llm.client is not old_client
+        deltas.extend(stream)
+        assert "".join(deltas) == "echo: 一 二 三 四"
+        
+        assert not async_client._client.is_closed
+        loop.run_until_complete(llm_clients.aclose_clients())
+        assert async_client._client.is_closed
+    finally:
+        loop.close()
+        llm_clients.configure_clients(max_keepalive_connections=llm_clients.MAX_KEEPALIVE_CONNECTIONS)
+
+
+@pytest.mark.skipif(llm_clients.h2 is not None, reason="已安装 h2")
+def test_configure_clients_http2_requires_h2():
+    """测试未安装 h2 时不能启用HTTP/2"""
+    with pytest.raises(ValueError):
+        llm_clients.configure_clients(http2=True)
+    assert llm_clients._settings["http2"] is False
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file
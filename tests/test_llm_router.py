@@ -0,0 +1,106 @@
+import sys
+import os
+import time
+import asyncio
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core import llm_router
+from src.core.llm import LLMManager
+from src.core.llm_router import LLMRouter
+from tests.mock_openai_server import MockOpenAIServer
+
+
+@pytest.fixture
+def servers(monkeypatch):
+    """两个模拟服务器，分别注册为 fast 和 slow 提供商"""
+    monkeypatch.setattr(llm_router, "EXPLORE_RATE", 0)
+    with MockOpenAIServer(latency=0.01) as fast, MockOpenAIServer(latency=0.08) as slow:
+        for name, server in (("fast", fast), ("slow", slow)):
+            monkeypatch.setitem(LLMManager.MODEL_CONFIGS, name, {"base_url": server.base_url, "models": ["m"]})
+        yield fast, slow
+
+
+def _ask(text):
+    return [{"role": "user", "content": text}]
+
+
+def test_router_prefers_fast_endpoint(servers):
+    """测试路由在尝试过所有端点后选择延迟较小的端点"""
+    fast, slow = servers
+    router = LLMRouter([("slow", "m"), ("fast", "m")], api_keys={"slow": "k", "fast": "k"})
+    for i in range(10):
+        assert router.chat_completion(_ask(str(i))).choices[0].message.content == f"echo: {i}"
+    assert slow.requests == 1
+    assert fast.requests == 9
+    stats = router.stats()["endpoints"]
+    assert stats["fast/m"]["latency_ewma"] < stats["slow/m"]["latency_ewma"]
+
+
+def test_router_failover(servers):
+    """测试端点返回5xx时换下一个端点，错误率升高后不再优先选择该端点"""
+    fast, slow = servers
+    fast.error = lambda request: 503
+    router = LLMRouter([("fast", "m"), ("slow", "m")], api_keys={"slow": "k", "fast": "k"})
+    for i in range(5):
+        assert router.chat_completion(_ask(str(i))).choices[0].message.content == f"echo: {i}"
+    assert fast.requests == 1
+    assert router.stats()["endpoints"]["fast/m"]["errors"] == 1
+    
+    responses = asyncio.run(router.achat_completion(_ask("async")))
+    assert responses.choices[0].message.content == "echo: async"
+    
+    slow.error = lambda request: 503
+    with pytest.raises(Exception) as info:
+        router.chat_completion(_ask("x"))
+    assert getattr(info.value, "status_code", None) == 503
+
+
+def test_router_all_endpoints_fail(servers):
+    """测试所有端点都出错时同步调用抛出最后一个端点的错误"""
+    fast, slow = servers
+    fast.error = lambda request: 503
+    slow.error = lambda request: 502
+    router = LLMRouter([("fast", "m"), ("slow", "m")], api_keys={"slow": "k", "fast": "k"})
+    with pytest.raises(Exception) as info:
+        router.chat_completion(_ask("x"))
+    assert info.value.status_code == 502
+    assert (fast.requests, slow.requests) == (1, 1)
+    stats = router.stats()["endpoints"]
+    assert stats["fast/m"]["errors"] == stats["slow/m"]["errors"] == 1
+
+
+def test_router_hedge(servers, monkeypatch):
+    """测试主请求超过 p95 后发送对冲请求，先返回的结果生效，落后的请求被取消"""
+    monkeypatch.setattr(llm_router, "HEDGE_MIN_SAMPLES", 5)
+    fast, slow = servers
+    # fast 偶尔出现长尾延迟
+    fast.latency = lambda request: 2.0 if request["messages"][-1]["content"] == "stall" else 0.01
+    router = LLMRouter([("fast", "m"), ("slow", "m")], api_keys={"slow": "k", "fast": "k"}, hedge=True)
+    
+    async def scenario():
+        # 预热连接，避免首次调用的开销计入端点延迟
+        for manager in router.managers.values():
+            await manager.achat_completion(_ask("warmup"))
+        for i in range(6):
+            await router.achat_completion(_ask(str(i)))
+        before = router.stats()["endpoints"]["fast/m"]
+        start = time.perf_counter()
+        response = await router.achat_completion(_ask("stall"))
+        return response, time.perf_counter() - start, before
+    
+    response, elapsed, before = asyncio.run(scenario())
+    assert response.choices[0].message.content == "echo: stall"
+    assert elapsed < 1.0
+    stats = router.stats()
+    assert (stats["hedges"], stats["hedge_wins"]) == (1, 1)
+    assert stats["endpoints"]["fast/m"]["in_flight"] == 0
+    # 被取消的主请求以已用时间计入 fast 的延迟
+    assert stats["endpoints"]["fast/m"]["requests"] == before["requests"] + 1
+    assert stats["endpoints"]["fast/m"]["latency_ewma"] > before["latency_ewma"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
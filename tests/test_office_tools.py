@@ -0,0 +1,538 @@
+import sys
+import os
+import json
+import time
+import errno
+import asyncio
+import threading
+import base64
+import zipfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.office_tools import (
+    create_word_document,
+    create_excel_spreadsheet,
+    create_powerpoint_presentation,
+    create_documents_batch,
+    list_files_in_directory,
+    read_file_content,
+    move_file,
+    move_files
+)
+from src.utils import batch_runner, dir_scanner, docx_writer, file_mover, pptx_writer, ranged_reader, xlsx_writer
+from src.utils.batch_runner import run_batch
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def test_create_word_document(tmp_path):
+    """测试创建Word文档"""
+    content = "第一段\n第二段 <b>&\"引号\"\n\n最后一段"
+    result = create_word_document(content, "report", str(tmp_path))
+    assert result["success"]
+    assert result["paragraphs"] == 4
+    
+    with zipfile.ZipFile(result["file_path"]) as zf:
+        assert zf.testzip() is None
+        assert "[Content_Types].xml" in zf.namelist()
+        root = ET.fromstring(zf.read("word/document.xml"))
+        
+    paragraphs = root.findall(f"{W_NS}body/{W_NS}p")
+    texts = ["".join(t.text or "" for t in p.iter(f"{W_NS}t")) for p in paragraphs]
+    assert texts == ["第一段", "第二段 <b>&\"引号\"", "", "最后一段"]
+
+
+def test_create_word_document_from_source_file(tmp_path):
+    """测试从文本文件流式创建Word文档"""
+    source = tmp_path / "source.txt"
+    source.write_text("".join(f"段落 {i}\n" for i in range(1000)), encoding="utf-8")
+    
+    result = create_word_document("", "from_file", str(tmp_path), source_path=str(source))
+    assert result["success"]
+    assert result["paragraphs"] == 1000
+    
+    with zipfile.ZipFile(result["file_path"]) as zf:
+        root = ET.fromstring(zf.read("word/document.xml"))
+    assert len(root.findall(f"{W_NS}body/{W_NS}p")) == 1000
+
+
+def test_create_word_document_missing_source(tmp_path):
+    """测试源文件不存在"""
+    result = create_word_document("", "missing", str(tmp_path), source_path=str(tmp_path / "nope.txt"))
+    assert not result["success"]
+
+
+def test_write_docx_error_removes_partial_file(tmp_path):
+    """测试写入过程中出错时不留下不完整的文档"""
+    def paragraphs():
+        yield "第一段"
+        raise OSError("读取失败")
+    
+    with pytest.raises(OSError):
+        docx_writer.write_docx(str(tmp_path / "broken.docx"), paragraphs())
+    assert os.listdir(tmp_path) == []
+
+
+def _sheet_rows(xlsx_path, sheet_index=1):
+    """读取工作表中的行数"""
+    with zipfile.ZipFile(xlsx_path) as zf:
+        sheet_xml = zf.read(f"xl/worksheets/sheet{sheet_index}.xml").decode("utf-8")
+    return sheet_xml.count("<row ")
+
+
+def test_create_excel_spreadsheet(tmp_path):
+    """测试创建Excel电子表格"""
+    data = [["姓名", "年龄"], ["张三", 30], ["李四", 25]]
+    result = create_excel_spreadsheet(data, "people", str(tmp_path))
+    assert result["success"]
+    assert result["rows"] == 3
+    
+    with zipfile.ZipFile(result["file_path"]) as zf:
+        assert "xl/workbook.xml" in zf.namelist()
+        sheet_xml = zf.read("xl/worksheets/sheet1.xml").decode("utf-8")
+    assert _sheet_rows(result["file_path"]) == 3
+    # constant_memory 模式下字符串以内联方式写入
+    assert "张三" in sheet_xml
+
+
+def test_create_excel_spreadsheet_from_ndjson(tmp_path):
+    """测试从NDJSON文件按块创建Excel电子表格"""
+    source = tmp_path / "rows.ndjson"
+    with open(source, "w", encoding="utf-8") as f:
+        for i in range(250):
+            f.write(json.dumps({"id": i, "name": f"任务{i}", "tags": ["a", "b"]}, ensure_ascii=False) + "\n")
+            
+    result = create_excel_spreadsheet([], "from_ndjson", str(tmp_path), source_path=str(source), chunk_size=64)
+    assert result["success"]
+    # 第一行为表头
+    assert result["rows"] == 251
+    assert _sheet_rows(result["file_path"]) == 251
+    
+    # 之后的行包含第一行没有的字段时报错，而不是丢弃该字段
+    with open(source, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"id": 250}) + "\n" + json.dumps({"id": 251, "owner": "张三"}, ensure_ascii=False) + "\n")
+    result = create_excel_spreadsheet([], "extra_key", str(tmp_path), source_path=str(source))
+    assert not result["success"]
+    assert "owner" in result["message"]
+
+
+def test_create_excel_spreadsheet_bad_row_leaves_no_file(tmp_path):
+    """测试读取到错误的行时不留下不完整的工作簿，已有的同名文件保持不变"""
+    source = tmp_path / "rows.ndjson"
+    source.write_text(json.dumps({"id": 1}) + "\n" + json.dumps({"id": 2, "extra": 1}) + "\n", encoding="utf-8")
+    out = tmp_path / "out"
+    out.mkdir()
+    
+    result = create_excel_spreadsheet([], "bad", str(out), source_path=str(source))
+    assert not result["success"]
+    assert os.listdir(out) == []
+    
+    (out / "bad.xlsx").write_bytes(b"old")
+    assert not create_excel_spreadsheet([], "bad", str(out), source_path=str(source))["success"]
+    assert os.listdir(out) == ["bad.xlsx"]
+    assert (out / "bad.xlsx").read_bytes() == b"old"
+
+
+def test_create_excel_spreadsheet_sheet_rollover(tmp_path, monkeypatch):
+    """测试超过单表行数上限时续写到新工作表"""
+    monkeypatch.setattr(xlsx_writer, "MAX_ROWS_PER_SHEET", 100)
+    source = tmp_path / "rows.csv"
+    source.write_text("id,value\n" + "".join(f"{i},{i * 2}\n" for i in range(149)), encoding="utf-8")
+    
+    result = create_excel_spreadsheet([], "rollover", str(tmp_path), source_path=str(source),
+                                      repeat_header=True)
+    assert result["success"]
+    assert result["rows"] == 150
+    assert result["sheets"] == 2
+    assert _sheet_rows(result["file_path"], 1) == 100
+    # 续写的工作表包含重复的表头
+    assert _sheet_rows(result["file_path"], 2) == 51
+
+
+def test_create_powerpoint_presentation(tmp_path):
+    """测试创建PowerPoint演示文稿"""
+    slides = [
+        {"title": "季度报告", "content": "第一点\n第二点 & <更多>"},
+        {"title": "封面", "content": "副标题", "layout": "Title Slide"}
+    ]
+    result = create_powerpoint_presentation(slides, "deck", str(tmp_path))
+    assert result["success"]
+    assert result["slides"] == 2
+    
+    with zipfile.ZipFile(result["file_path"]) as zf:
+        assert zf.testzip() is None
+        names = zf.namelist()
+        for name in names:
+            if name.endswith((".xml", ".rels")):
+                ET.fromstring(zf.read(name))
+        presentation = zf.read("ppt/presentation.xml").decode("utf-8")
+        slide_xml = zf.read("ppt/slides/slide1.xml").decode("utf-8")
+        content_types = zf.read("[Content_Types].xml").decode("utf-8")
+        slide2_rels = zf.read("ppt/slides/_rels/slide2.xml.rels").decode("utf-8")
+        
+    assert presentation.count("<p:sldId ") == 2
+    assert "/ppt/slides/slide2.xml" in content_types
+    assert "第二点 &amp; &lt;更多&gt;" in slide_xml
+    assert "slideLayout1.xml" in slide2_rels
+
+
+def test_powerpoint_control_characters(tmp_path):
+    """测试幻灯片文本中的XML非法控制字符被去掉"""
+    slides = [{"title": "标题\x0b换行", "content": ["要点\x1f一", "\x0b", "要点二"]}]
+    result = create_powerpoint_presentation(slides, "ctrl", str(tmp_path))
+    assert result["success"]
+    
+    with zipfile.ZipFile(result["file_path"]) as zf:
+        root = ET.fromstring(zf.read("ppt/slides/slide1.xml"))
+    texts = [node.text for node in root.iter("{http://schemas.openxmlformats.org/drawingml/2006/main}t")]
+    assert texts == ["标题换行", "要点一", "要点二"]
+
+
+def test_powerpoint_template_cache(tmp_path):
+    """测试模板缓存及修改后的失效"""
+    base = create_powerpoint_presentation([{"title": "旧幻灯片"}], "template", str(tmp_path))
+    template_path = base["file_path"]
+    
+    first = pptx_writer.load_template(template_path)
+    assert pptx_writer.load_template(template_path) is first
+    
+    # 以已有演示文稿为模板时，其中的幻灯片会被丢弃
+    result = create_powerpoint_presentation([{"title": "新幻灯片"}, {"title": "第二页"}], "from_template",
+                                            str(tmp_path), template_path=template_path)
+    assert result["success"]
+    with zipfile.ZipFile(result["file_path"]) as zf:
+        presentation = zf.read("ppt/presentation.xml").decode("utf-8")
+        assert "旧幻灯片" not in zf.read("ppt/slides/slide1.xml").decode("utf-8")
+    assert presentation.count("<p:sldId ") == 2
+    
+    # 模板文件修改后重新解析
+    create_powerpoint_presentation([{"title": "更新"}], "template", str(tmp_path))
+    stat = os.stat(template_path)
+    os.utime(template_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert pptx_writer.load_template(template_path) is not first
+
+
+def test_powerpoint_unknown_layout(tmp_path):
+    """测试版式不存在"""
+    result = create_powerpoint_presentation([{"title": "x", "layout": "不存在"}], "bad", str(tmp_path))
+    assert not result["success"]
+    # 不留下不完整的文件
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.fixture
+def sample_tree(tmp_path):
+    """创建测试目录树"""
+    root = tmp_path / "tree"
+    (root / "sub" / "deep").mkdir(parents=True)
+    (root / ".git").mkdir()
+    for i in range(5):
+        (root / f"file{i}.txt").write_text("x" * (i + 1))
+    (root / "report.docx").write_bytes(b"d" * 100)
+    (root / "sub" / "a.txt").write_text("a")
+    (root / "sub" / "deep" / "b.txt").write_text("b")
+    (root / ".git" / "config").write_text("c")
+    return root
+
+
+class FakeContext:
+    """记录进度通知的MCP上下文"""
+
+    def __init__(self):
+        self.progress = []
+
+    async def report_progress(self, progress, total=None, message=None):
+        self.progress.append((progress, total, message))
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_create_documents_batch(tmp_path, max_workers):
+    """测试批量创建文档：逐个报告进度，失败的文档不影响其他文档"""
+    documents = [
+        {"type": "word", "filename": "报告", "content": "第一段\n第二段"},
+        {"type": "xlsx", "filename": "数据", "data": [["a", "b"], [1, 2]]},
+        {"type": "powerpoint", "filename": "演示", "slides": [{"title": "标题", "content": "内容"}],
+         "save_path": str(tmp_path / "slides")},
+        {"type": "pdf", "filename": "不支持"},
+        {"type": "word", "filename": "参数错误", "colour": "red"},
+    ]
+    ctx = FakeContext()
+    result = asyncio.run(create_documents_batch(documents, save_path=str(tmp_path), max_workers=max_workers,
+                                                ctx=ctx))
+    assert not result["success"]
+    assert (result["total"], result["succeeded"], result["failed"]) == (5, 3, 2)
+    assert result["files"] == [str(tmp_path / "报告.docx"), str(tmp_path / "数据.xlsx"),
+                               str(tmp_path / "slides" / "演示.pptx")]
+    assert all(zipfile.is_zipfile(path) for path in result["files"])
+    assert [failure["index"] for failure in result["failures"]] == [3, 4]
+    assert "不支持的文档类型" in result["failures"][0]["message"]
+    
+    # 每个文档完成时发送一次带消息的进度通知
+    assert sorted(done for done, _, _ in ctx.progress) == [1, 2, 3, 4, 5]
+    assert all(total == 5 and message for _, total, message in ctx.progress)
+
+
+def test_create_documents_batch_manifest(tmp_path):
+    """测试从NDJSON清单批量创建文档，无法解析的行计为失败"""
+    manifest = tmp_path / "manifest.ndjson"
+    lines = [json.dumps({"type": "word", "filename": f"doc{i}", "content": f"内容{i}"}, ensure_ascii=False)
+             for i in range(6)]
+    lines.insert(2, "{bad json")
+    manifest.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    
+    result = asyncio.run(create_documents_batch(manifest_path=str(manifest), save_path=str(tmp_path / "out"),
+                                                max_workers=2, max_memory_mb=1))
+    assert result["total"] == 7
+    assert result["succeeded"] == 6
+    assert result["failures"][0]["index"] == 2
+    assert sorted(os.listdir(tmp_path / "out")) == [f"doc{i}.docx" for i in range(6)]
+    assert not asyncio.run(create_documents_batch(manifest_path=str(tmp_path / "missing.ndjson")))["success"]
+
+
+def test_run_batch_memory_budget(monkeypatch):
+    """测试在途内存预算：超出预算的作业等待，单个超大作业单独执行"""
+    pool = ThreadPoolExecutor(max_workers=4)
+    monkeypatch.setattr(batch_runner, "get_process_pool", lambda workers: pool)
+    lock = threading.Lock()
+    active, peaks = [], []
+    
+    def job(text):
+        with lock:
+            active.append(len(text))
+            peaks.append(sum(active))
+        time.sleep(0.02)
+        with lock:
+            active.remove(len(text))
+        return len(text)
+        
+    jobs = ["x" * 100] * 6 + ["y" * 5000] + ["z" * 100] * 3
+    try:
+        results = sorted(run_batch(job, jobs, max_workers=4, memory_budget=300))
+    finally:
+        pool.shutdown()
+    assert [result for _, _, result in results] == [len(text) for text in jobs]
+    assert 5000 in peaks
+    assert all(peak <= 300 or peak == 5000 for peak in peaks)
+    assert 200 in peaks
+
+
+def test_list_files_in_directory(sample_tree):
+    """测试列出目录文件"""
+    result = list_files_in_directory(str(sample_tree))
+    assert result["success"]
+    names = [f["name"] for f in result["files"]]
+    assert names == sorted(names)
+    assert "sub" in names and "b.txt" not in names
+    assert result["next_cursor"] is None
+    
+    report = next(f for f in result["files"] if f["name"] == "report.docx")
+    assert report["is_file"] and report["size"] == 100
+    sub = next(f for f in result["files"] if f["name"] == "sub")
+    assert not sub["is_file"] and sub["size"] is None
+
+
+def test_list_files_recursive_with_filters(sample_tree):
+    """测试递归列出及glob过滤"""
+    result = list_files_in_directory(str(sample_tree), recursive=True, include=["*.txt"], exclude=[".git"])
+    paths = {f["path"].replace(os.sep, "/") for f in result["files"]}
+    assert paths == {"file0.txt", "file1.txt", "file2.txt", "file3.txt", "file4.txt", "sub/a.txt", "sub/deep/b.txt"}
+    
+    result = list_files_in_directory(str(sample_tree), max_depth=1, include=["*.txt"])
+    paths = {f["path"].replace(os.sep, "/") for f in result["files"]}
+    assert "sub/a.txt" in paths and "sub/deep/b.txt" not in paths
+
+
+def test_list_files_pagination(sample_tree):
+    """测试按大小降序分页"""
+    seen = []
+    cursor = None
+    while True:
+        result = list_files_in_directory(str(sample_tree), include=["*.txt", "*.docx"], sort_by="-size",
+                                         limit=2, cursor=cursor)
+        assert result["success"]
+        assert result["count"] <= 2
+        seen.extend(f["name"] for f in result["files"])
+        cursor = result["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ["report.docx", "file4.txt", "file3.txt", "file2.txt", "file1.txt", "file0.txt"]
+    
+    # 游标不能用于其他查询
+    first = list_files_in_directory(str(sample_tree), limit=2)
+    result = list_files_in_directory(str(sample_tree), sort_by="size", limit=2, cursor=first["next_cursor"])
+    assert not result["success"]
+
+
+def test_list_files_sorted_pages_cached(sample_tree, monkeypatch):
+    """测试按修改时间分页时后续页使用缓存的排序结果，不再stat；is_file 出错的条目按非文件排序"""
+    for i, path in enumerate(sorted(sample_tree.glob("*.txt"))):
+        os.utime(path, (1000000 + i, 1000000 + i))
+    sort_keys = []
+    original = dir_scanner._sort_key
+    monkeypatch.setattr(dir_scanner, "_sort_key", lambda *args: sort_keys.append(args[1]) or original(*args))
+    
+    seen = []
+    cursor = None
+    while True:
+        result = list_files_in_directory(str(sample_tree), include=["*.txt"], sort_by="modified",
+                                         limit=2, cursor=cursor)
+        assert result["success"]
+        seen.extend(f["name"] for f in result["files"])
+        cursor = result["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [f"file{i}.txt" for i in range(5)]
+    assert len(sort_keys) == 5
+    
+    # 缓存过期后重新扫描
+    monkeypatch.setattr(dir_scanner, "SORTED_CACHE_TTL", 0)
+    first = list_files_in_directory(str(sample_tree), include=["*.txt"], sort_by="-modified", limit=2)
+    result = list_files_in_directory(str(sample_tree), include=["*.txt"], sort_by="-modified", limit=2,
+                                     cursor=first["next_cursor"])
+    assert [f["name"] for f in result["files"]] == ["file2.txt", "file1.txt"]
+    assert len(sort_keys) == 15
+    
+    class BrokenEntry:
+        def stat(self, follow_symlinks=True):
+            return os.stat(sample_tree / "report.docx")
+        
+        def is_file(self):
+            raise PermissionError(errno.EACCES, "denied")
+            
+    assert dir_scanner._sort_key("size", "broken", BrokenEntry()) == [-1, "broken"]
+
+
+def test_read_file_content_lines(tmp_path, monkeypatch):
+    """测试按行区间读取"""
+    # 使用较小的块，使行索引跨越多个块
+    monkeypatch.setattr(ranged_reader, "BLOCK_SIZE", 64)
+    log = tmp_path / "app.log"
+    log.write_text("".join(f"第{i}行\n" for i in range(1, 1001)), encoding="utf-8")
+    
+    result = read_file_content(str(log), line_start=500, line_count=3)
+    assert result["success"]
+    assert result["content"] == "第500行\n第501行\n第502行\n"
+    assert result["next_line"] == 503
+    assert not result["eof"]
+    
+    result = read_file_content(str(log), line_start=999, line_count=10)
+    assert result["content"] == "第999行\n第1000行\n"
+    assert result["line_count"] == 2
+    assert result["eof"]
+    assert result["total_lines"] == 1000
+    
+    result = read_file_content(str(log), line_start=2000)
+    assert result["content"] == "" and result["line_count"] == 0
+
+
+def test_read_file_content_index_invalidation(tmp_path):
+    """测试文件修改后行索引失效"""
+    path = tmp_path / "notes.txt"
+    path.write_text("a\nb\nc\n", encoding="utf-8")
+    assert read_file_content(str(path), line_start=2, line_count=1)["content"] == "b\n"
+    
+    path.write_text("x\ny\nz\nw\n", encoding="utf-8")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    result = read_file_content(str(path), line_start=4, line_count=1)
+    assert result["content"] == "w\n"
+
+
+def test_read_file_content_bytes(tmp_path):
+    """测试按字节区间读取，区间边界对齐到UTF-8字符"""
+    path = tmp_path / "text.md"
+    path.write_text("中文内容", encoding="utf-8")
+    
+    # 偏移1位于第一个字符中间
+    result = read_file_content(str(path), offset=1, length=6)
+    assert result["success"]
+    assert result["encoding"] == "utf-8"
+    assert result["content"] == "文"
+    assert result["offset"] == 3 and result["next_offset"] == 6
+
+
+def test_read_file_content_encoding_and_binary(tmp_path):
+    """测试编码探测与二进制文件区间读取"""
+    gbk = tmp_path / "legacy.txt"
+    gbk.write_bytes("旧系统导出的文本".encode("gb18030"))
+    result = read_file_content(str(gbk))
+    assert result["content"] == "旧系统导出的文本"
+    
+    binary = tmp_path / "blob.bin"
+    binary.write_bytes(bytes(range(256)))
+    result = read_file_content(str(binary))
+    assert result["content"].startswith("二进制文件")
+    result = read_file_content(str(binary), offset=16, length=4)
+    assert result["encoding"] == "base64"
+    assert base64.b64decode(result["content"]) == bytes([16, 17, 18, 19])
+    
+    result = read_file_content(str(binary), line_start=1)
+    assert not result["success"]
+
+
+@pytest.fixture
+def cross_device(monkeypatch):
+    """模拟跨文件系统移动：os.rename 总是返回 EXDEV"""
+    def fake_rename(src, dst):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+    monkeypatch.setattr(file_mover.os, "rename", fake_rename)
+
+
+def test_move_file_cross_device(tmp_path, cross_device):
+    """测试跨文件系统移动文件"""
+    source = tmp_path / "scratch" / "big.bin"
+    source.parent.mkdir()
+    payload = os.urandom(3 * 1024 * 1024 + 17)
+    source.write_bytes(payload)
+    destination = tmp_path / "nas" / "big.bin"
+    
+    result = move_file(str(source), str(destination))
+    assert result["success"]
+    assert result["bytes"] == len(payload)
+    assert result["method"] in ("copy_file_range", "sendfile", "copy")
+    assert not source.exists()
+    assert destination.read_bytes() == payload
+    # 不残留临时文件
+    assert os.listdir(destination.parent) == ["big.bin"]
+
+
+def test_copy_file_data_fallback(tmp_path, monkeypatch):
+    """测试零拷贝不可用时回退到用户态复制"""
+    def unsupported(*args):
+        raise OSError(errno.ENOSYS, "not supported")
+    monkeypatch.setattr(file_mover.os, "copy_file_range", unsupported, raising=False)
+    monkeypatch.setattr(file_mover.os, "sendfile", unsupported, raising=False)
+    
+    source = tmp_path / "a.bin"
+    source.write_bytes(b"0123456789" * 1000)
+    target = tmp_path / "b.bin"
+    with open(source, "rb") as fsrc, open(target, "wb") as fdst:
+        method = file_mover.copy_file_data(fsrc.fileno(), fdst.fileno(), 10000)
+    assert method == "copy"
+    assert target.read_bytes() == source.read_bytes()
+
+
+def test_move_files_batch(tmp_path, cross_device):
+    """测试批量移动文件"""
+    moves = []
+    for i in range(6):
+        source = tmp_path / f"src{i}.txt"
+        source.write_text(f"内容{i}", encoding="utf-8")
+        moves.append({"source_path": str(source), "destination_path": str(tmp_path / "out" / f"dst{i}.txt")})
+    moves.append({"source_path": str(tmp_path / "missing.txt"), "destination_path": str(tmp_path / "out" / "x.txt")})
+    
+    result = move_files(moves, max_workers=3)
+    assert not result["success"]
+    assert result["succeeded"] == 6 and result["failed"] == 1
+    assert [item["source_path"] for item in result["results"]] == [m["source_path"] for m in moves]
+    assert result["total_bytes"] == sum(len(f"内容{i}".encode("utf-8")) for i in range(6))
+    assert (tmp_path / "out" / "dst5.txt").read_text(encoding="utf-8") == "内容5"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
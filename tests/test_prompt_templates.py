@@ -0,0 +1,61 @@
+import sys
+import os
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.llm import LLMManager
+from src.utils.prompt_templates import PromptTemplate, TemplateRegistry
+
+
+def test_prompt_template_render():
+    """测试 {{变量}} 被替换，其他花括号原样保留，缺少变量时抛出 ValueError"""
+    template = PromptTemplate("t", '请按 {"name": str} 输出，问题：{{ question }}，再次：{{question}}，{{ 不是变量 }}')
+    assert template.variables == {"question"}
+    assert template.render(question="Q", extra=1) == '请按 {"name": str} 输出，问题：Q，再次：Q，{{ 不是变量 }}'
+    
+    with pytest.raises(ValueError, match="question"):
+        template.render(other="x")
+
+
+def test_project_templates():
+    """测试项目模板从 config/prompt_templates 加载并正确渲染"""
+    llm = LLMManager()
+    
+    assert "{{question}}" in llm.load_prompt_template("general_template")
+    rendered = llm.render_prompt_template("general_template", question="什么是人工智能？")
+    assert "用户问题：什么是人工智能？" in rendered
+    assert "{" not in rendered
+    
+    with pytest.raises(ValueError):
+        llm.render_prompt_template("code_generation_template")
+    with pytest.raises(FileNotFoundError):
+        llm.load_prompt_template("missing_template")
+
+
+def test_template_registry_reload(tmp_path):
+    """测试模板只编译一次，文件新增、修改、删除后重新加载"""
+    (tmp_path / "a.txt").write_text("A {{x}}", encoding="utf-8")
+    (tmp_path / "notes.md").write_text("不是模板", encoding="utf-8")
+    registry = TemplateRegistry(str(tmp_path), check_interval=0)
+    
+    assert registry.names() == ["a"]
+    for _ in range(5):
+        assert registry.render("a", x=1) == "A 1"
+    assert registry.compiles == 1
+    
+    (tmp_path / "a.txt").write_text("A2 {{x}} {{y}}", encoding="utf-8")
+    os.utime(tmp_path / "a.txt", ns=(0, 10 ** 18))
+    (tmp_path / "b.txt").write_text("B", encoding="utf-8")
+    assert registry.get("a").variables == {"x", "y"}
+    assert registry.render("b") == "B"
+    assert registry.compiles == 3
+    
+    (tmp_path / "b.txt").unlink()
+    with pytest.raises(FileNotFoundError):
+        registry.get("b")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
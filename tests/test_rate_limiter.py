@@ -0,0 +1,141 @@
+import sys
+import os
+import time
+import asyncio
+import threading
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.llm import LLMManager
+from src.utils import llm_config, rate_limiter
+from src.utils.llm_config import ConfigService, RateLimits, parse_config
+from tests.mock_openai_server import MockOpenAIServer
+from src.utils.rate_limiter import DeadlineExceeded, RateLimiter, TokenBucket
+
+CONFIG = """
+rate_limits:
+  mock:
+    rpm: 6000
+    max_concurrency: 16
+    retries: 10
+    models:
+      slow-model:
+        rpm: 60
+"""
+
+
+def test_rate_limits_config():
+    """测试速率限制配置：模型的限制继承提供商的设置，取值不合法时抛出 ConfigError"""
+    import yaml
+    config = parse_config(yaml.safe_load(CONFIG))
+    assert config.rate_limits_for("mock", "mock-model") == RateLimits(rpm=6000, max_concurrency=16, retries=10)
+    assert config.rate_limits_for("mock", "slow-model") == RateLimits(rpm=60, max_concurrency=16, retries=10)
+    assert config.rate_limits_for("qwen", "qwen-plus") is None
+    
+    for limits in ({"rpm": 0}, {"max_concurrency": 0}, {"min_concurrency": 4, "max_concurrency": 2}, {"retries": -1}):
+        with pytest.raises(llm_config.ConfigError):
+            parse_config({"rate_limits": {"mock": limits}})
+
+
+def test_token_bucket():
+    """测试令牌桶按每分钟速率补充，超出容量的请求按容量计算"""
+    bucket = TokenBucket(per_minute=60, capacity=2)
+    now = bucket.updated
+    assert bucket.delay(1, now) == 0
+    bucket.take(2)
+    assert bucket.delay(1, now) == pytest.approx(1.0)
+    assert bucket.delay(5, now + 1) == pytest.approx(1.0)
+    bucket.adjust(-10)
+    assert bucket.tokens == 2
+
+
+def test_deadline_order():
+    """测试排队的请求按截止时间先后获得许可，没有截止时间的排在最后"""
+    limiter = RateLimiter(RateLimits(max_concurrency=1, min_concurrency=1))
+    held = limiter.acquire()
+    order = []
+    
+    def worker(name, deadline):
+        permit = limiter.acquire(deadline=deadline)
+        order.append(name)
+        permit.release()
+    
+    now = time.monotonic()
+    threads = []
+    for name, deadline in (("none", None), ("late", now + 30), ("early", now + 10), ("middle", now + 20)):
+        threads.append(threading.Thread(target=worker, args=(name, deadline)))
+        threads[-1].start()
+        while limiter.stats()["queued"] < len(threads):
+            time.sleep(0.005)
+    held.release()
+    for thread in threads:
+        thread.join()
+    assert order == ["early", "middle", "late", "none"]
+
+
+def test_deadline_exceeded():
+    """测试截止时间前没有获得许可时抛出 DeadlineExceeded，并让出队列"""
+    limiter = RateLimiter(RateLimits(max_concurrency=1, min_concurrency=1))
+    held = limiter.acquire()
+    with pytest.raises(DeadlineExceeded):
+        limiter.acquire(deadline=time.monotonic() + 0.05)
+    
+    async def scenario():
+        with pytest.raises(DeadlineExceeded):
+            await limiter.aacquire(deadline=time.monotonic() + 0.05)
+    
+    asyncio.run(scenario())
+    assert limiter.stats()["expired"] == 2
+    held.release()
+    limiter.acquire().release()
+    assert limiter.stats()["queued"] == 0
+
+
+def test_requests_per_minute():
+    """测试每分钟请求数用完后等待令牌补充"""
+    limiter = RateLimiter(RateLimits(rpm=1200))
+    limiter._requests = TokenBucket(1200, capacity=2)
+    start = time.monotonic()
+    for _ in range(4):
+        limiter.acquire().release()
+    # 前两个请求使用已有的令牌，之后每 0.05 秒补充一个
+    assert time.monotonic() - start >= 0.09
+
+
+@pytest.fixture
+def limited_server(tmp_path, monkeypatch):
+    """配置了速率限制的模拟服务器：同时处理超过4个请求时返回429"""
+    path = tmp_path / "config.yaml"
+    path.write_text(CONFIG, encoding="utf-8")
+    monkeypatch.setattr(llm_config, "_service", ConfigService(str(path)))
+    monkeypatch.setattr(rate_limiter, "_limiters", {})
+    server = MockOpenAIServer(latency=0.05)
+    server.error = lambda request: 429 if server._in_flight > 4 else None
+    with server:
+        monkeypatch.setitem(LLMManager.MODEL_CONFIGS, "mock", {"base_url": server.base_url, "models": ["mock-model"]})
+        yield server
+
+
+def test_aimd_on_429(limited_server):
+    """测试收到429后缩减并发上限并重新排队，所有请求最终成功"""
+    llm = LLMManager(provider="mock", model="mock-model", api_key="test-key")
+    message_sets = [[{"role": "user", "content": f"文档 {i}"}] for i in range(40)]
+    
+    responses = asyncio.run(llm.achat_many(message_sets, concurrency=40))
+    assert [r.choices[0].message.content for r in responses] == [f"echo: 文档 {i}" for i in range(40)]
+    
+    stats = llm._rate_limiter().stats()
+    assert stats["throttled"] > 0
+    assert stats["succeeded"] == 40
+    assert stats["limit"] < 16
+    assert stats["in_flight"] == 0
+    
+    # 同步调用共用同一个限制器
+    assert llm.chat_completion([{"role": "user", "content": "同步"}]).choices[0].message.content == "echo: 同步"
+    assert llm._rate_limiter().stats()["succeeded"] == 41
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,154 @@
+import sys
+import os
+import asyncio
+import threading
+import openai
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.llm import LLMManager
+from src.utils.single_flight import SingleFlight, get_single_flight
+
+
+def _ask(text):
+    return [{"role": "user", "content": text}]
+
+
+def test_single_flight_shares_result_and_error():
+    """测试并发的相同键只执行一次，结果和异常由所有调用共享，执行结束后不再合并"""
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+    
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return "done"
+    
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", work))) for _ in range(5)]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    while flight.stats()["calls"] < 5:
+        pass
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert sorted(results) == [("done", False)] + [("done", True)] * 4
+    assert flight.stats() == {"calls": 5, "executed": 1, "coalesced": 4}
+    
+    def fail():
+        raise ValueError("boom")
+    
+    with pytest.raises(ValueError):
+        flight.do("k", fail)
+    assert flight.do("k", lambda: "again") == ("again", False)
+
+
+def test_single_flight_async_cancellation():
+    """测试取消一个等待者不影响其他等待者，全部取消时执行中的任务也被取消"""
+    flight = SingleFlight()
+    
+    async def scenario():
+        calls = []
+        
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return "done"
+        
+        first = asyncio.ensure_future(flight.ado("k", work))
+        second = asyncio.ensure_future(flight.ado("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == ("done", True)
+        assert len(calls) == 1
+        
+        third = asyncio.ensure_future(flight.ado("k", work))
+        await asyncio.sleep(0.01)
+        third.cancel()
+        await asyncio.sleep(0.15)
+        return calls
+    
+    assert len(asyncio.run(scenario())) == 2
+    assert flight.stats()["coalesced"] == 1
+
+
+def test_llm_manager_coalesces_identical_requests(mock_server):
+    """测试并发的相同确定性请求只发送一次，参数或API密钥不同的请求不合并"""
+    mock_server.latency = 0.2
+    llm = LLMManager(provider="mock", model="mock-model", api_key="test-key")
+    before = get_single_flight().stats()
+    
+    async def scenario():
+        return await asyncio.gather(
+            *(llm.achat_completion(_ask("相同的问题"), temperature=0) for _ in range(8)),
+            llm.achat_completion(_ask("相同的问题"), temperature=0, max_tokens=10),
+            LLMManager(provider="mock", model="mock-model", api_key="other-key").achat_completion(_ask("相同的问题"),
+                                                                                                   temperature=0),
+        )
+    
+    responses = asyncio.run(scenario())
+    assert all(r.choices[0].message.content == "echo: 相同的问题" for r in responses)
+    assert mock_server.requests == 3
+    # 每个调用方得到独立的响应对象
+    assert len({id(r) for r in responses}) == len(responses)
+    after = get_single_flight().stats()
+    assert after["coalesced"] - before["coalesced"] == 7
+    
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(llm.chat_completion(_ask("同步"), temperature=0)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 4
+    assert mock_server.requests == 4
+    
+    uncoalesced = LLMManager(provider="mock", model="mock-model", api_key="test-key", coalesce=False)
+    
+    async def separate():
+        await asyncio.gather(*(uncoalesced.achat_completion(_ask("相同的问题"), temperature=0) for _ in range(3)))
+    
+    asyncio.run(separate())
+    assert mock_server.requests == 7
+
+
+def test_llm_manager_sampled_requests_not_coalesced(mock_server):
+    """测试采样调用和参数无法序列化的调用不合并，各自发送请求"""
+    llm = LLMManager(provider="mock", model="mock-model", api_key="test-key")
+    
+    responses = asyncio.run(llm.achat_many([_ask("采样")] * 5, temperature=1.0))
+    assert len(responses) == 5
+    assert mock_server.requests == 5
+    
+    response = llm.chat_completion(_ask("工具"), temperature=0, tools=openai.NOT_GIVEN)
+    assert response.choices[0].message.content == "echo: 工具"
+    assert mock_server.requests == 6
+
+
+def test_llm_manager_coalesced_error(mock_server):
+    """测试合并的请求失败时所有调用方都收到异常"""
+    mock_server.latency = 0.2
+    mock_server.error = lambda request: 400
+    llm = LLMManager(provider="mock", model="mock-model", api_key="test-key")
+    
+    async def scenario():
+        return await asyncio.gather(*(llm.achat_completion(_ask("bad"), temperature=0) for _ in range(3)),
+                                    return_exceptions=True)
+    
+    errors = asyncio.run(scenario())
+    assert all(isinstance(error, openai.BadRequestError) for error in errors)
+    assert mock_server.requests == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
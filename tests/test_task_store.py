@@ -0,0 +1,405 @@
+import sys
+import os
+import json
+import asyncio
+import sqlite3
+import multiprocessing
+import pytest
+from datetime import date, timedelta
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.office_tools import (
+    add_task_to_list,
+    bulk_import_tasks,
+    convert_task_list,
+    create_task_list,
+    delete_task,
+    get_task_list_summary,
+    query_tasks,
+    update_task,
+)
+from src.utils import task_store
+from src.utils.task_index import index_path, load_index
+from src.utils.task_log import file_version, log_path
+from src.utils.task_store import SqliteTaskStore, open_task_store
+
+SAMPLE_TASKS = [
+    {"title": "完成项目报告", "priority": "high", "due_date": "2025-04-10", "status": "pending"},
+    {"title": "准备会议材料", "priority": "medium", "due_date": "2025-04-08"},
+    {"title": "回复客户邮件", "priority": "high", "due_date": "2025-04-06", "status": "completed"},
+]
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "json"])
+def test_task_list_tools(tmp_path, backend):
+    """测试创建任务列表、添加任务和获取摘要"""
+    result = create_task_list(SAMPLE_TASKS, "tasks", str(tmp_path), backend=backend)
+    assert result["success"]
+    path = result["file_path"]
+    assert path.endswith(".db" if backend == "sqlite" else ".json")
+    
+    result = add_task_to_list(path, {"title": "整理文档", "priority": "low"})
+    assert result["success"]
+    assert result["task_id"] == 4
+    assert result["total_tasks"] == 4
+    
+    summary = get_task_list_summary(path)
+    assert summary["success"]
+    assert summary["summary"]["total_tasks"] == 4
+    assert summary["summary"]["pending_tasks"] == 3
+    assert summary["summary"]["completed_tasks"] == 1
+    assert summary["summary"]["priority_distribution"] == {"high": 2, "medium": 1, "low": 1}
+
+
+def test_sqlite_task_list_indexes(tmp_path):
+    """测试SQLite任务列表为状态、优先级和截止日期建立索引"""
+    path = create_task_list(SAMPLE_TASKS, "tasks.db", str(tmp_path))["file_path"]
+    with sqlite3.connect(path) as conn:
+        indexed = {row[0] for row in conn.execute("SELECT name FROM pragma_index_list('tasks')")}
+        plan = " ".join(row[3] for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM tasks WHERE due_date < '2025-04-09'"))
+    assert {"idx_tasks_status", "idx_tasks_priority", "idx_tasks_due_date"} <= indexed
+    assert "idx_tasks_due_date" in plan
+
+
+def test_legacy_json_task_list(tmp_path):
+    """测试原有格式的JSON任务列表可继续使用，并可导入SQLite后再导出"""
+    legacy_path = tmp_path / "legacy.json"
+    legacy_path.write_text(json.dumps({
+        "tasks": SAMPLE_TASKS,
+        "created_at": "2025-04-05",
+        "total_tasks": 3,
+        "pending_tasks": 2
+    }, ensure_ascii=False), encoding="utf-8")
+    
+    result = add_task_to_list(str(legacy_path), {"title": "整理文档"})
+    assert result["success"]
+    assert result["total_tasks"] == 4
+    # 写入先追加到日志，合并后任务列表文件本身才包含新任务
+    with open_task_store(str(legacy_path)) as store:
+        store.compact()
+    data = json.loads(legacy_path.read_text(encoding="utf-8"))
+    assert data["total_tasks"] == 4
+    assert data["pending_tasks"] == 3
+    assert data["created_at"] == "2025-04-05"
+    
+    db_path = tmp_path / "imported.db"
+    result = convert_task_list(str(legacy_path), str(db_path))
+    assert result["success"]
+    assert result["total_tasks"] == 4
+    assert get_task_list_summary(str(db_path))["summary"]["created_at"] == "2025-04-05"
+    
+    export_path = tmp_path / "export" / "exported.json"
+    assert convert_task_list(str(db_path), str(export_path))["success"]
+    exported = json.loads(export_path.read_text(encoding="utf-8"))
+    assert exported["tasks"] == data["tasks"]
+    assert exported["created_at"] == "2025-04-05"
+
+
+def test_legacy_task_ids_preserved(tmp_path):
+    """测试旧任务列表中的字符串ID和重复ID被重新编号，原ID保留在 source_id 中，合并后不丢任务"""
+    legacy_path = tmp_path / "legacy.json"
+    legacy_path.write_text(json.dumps({"tasks": [
+        {"id": 1, "title": "甲"},
+        {"id": "T-7", "title": "乙"},
+        {"id": 1, "title": "丙"},
+        {"title": "丁"},
+    ]}, ensure_ascii=False), encoding="utf-8")
+    
+    with open_task_store(str(legacy_path)) as store:
+        store.add({"title": "戊"})
+        store.compact()
+    tasks = json.loads(legacy_path.read_text(encoding="utf-8"))["tasks"]
+    assert [(task["id"], task["title"], task.get("source_id")) for task in tasks] == [
+        (1, "甲", None), (2, "乙", "T-7"), (3, "丙", 1), (4, "丁", None), (5, "戊", None),
+    ]
+    
+    db_path = tmp_path / "tasks.db"
+    assert convert_task_list(str(legacy_path), str(db_path))["success"]
+    with open_task_store(str(db_path)) as store:
+        assert [task.get("source_id") for task in store.iter_tasks()] == [None, "T-7", 1, None, None]
+        store.add({"id": "外部-1", "title": "己"})
+        assert list(store.iter_tasks())[-1]["source_id"] == "外部-1"
+        with pytest.raises(ValueError):
+            store.add({"id": 1, "title": "重复"})
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "json"])
+def test_summary_aggregates(tmp_path, backend):
+    """测试增删改后摘要聚合（含最早截止日期和逾期数量）保持正确"""
+    today = date.today()
+    day = lambda offset: (today + timedelta(days=offset)).isoformat()
+    tasks = [
+        {"title": "a", "due_date": day(-3)},
+        {"title": "b", "due_date": day(-1), "priority": "high"},
+        {"title": "c", "due_date": day(-5), "status": "completed"},
+        {"title": "d", "due_date": day(2)},
+    ]
+    path = create_task_list(tasks, "tasks", str(tmp_path), backend=backend)["file_path"]
+    
+    summary = get_task_list_summary(path)["summary"]
+    assert summary["earliest_due_date"] == day(-3)
+    assert summary["overdue_tasks"] == 2
+    
+    assert update_task(path, 1, {"status": "completed"})["task"]["status"] == "completed"
+    assert update_task(path, 4, {"due_date": day(-10), "priority": "low"})["success"]
+    assert add_task_to_list(path, {"title": "e", "due_date": day(-2)})["success"]
+    result = delete_task(path, 2)
+    assert result["success"]
+    assert result["total_tasks"] == 4
+    assert not delete_task(path, 2)["success"]
+    assert not update_task(path, 99, {"status": "completed"})["success"]
+    
+    summary = get_task_list_summary(path)["summary"]
+    assert summary["total_tasks"] == 4
+    assert summary["status_distribution"] == {"completed": 2, "pending": 2}
+    assert summary["priority_distribution"] == {"medium": 3, "low": 1}
+    assert summary["earliest_due_date"] == day(-10)
+    assert summary["overdue_tasks"] == 2
+
+
+def test_sqlite_aggregates_migrated(tmp_path):
+    """测试没有聚合表的旧SQLite任务列表在打开时重新统计"""
+    path = str(tmp_path / "old.db")
+    with sqlite3.connect(path) as conn:
+        conn.executescript("""
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value);
+            CREATE TABLE tasks (id INTEGER PRIMARY KEY, status TEXT NOT NULL, priority TEXT NOT NULL,
+                                due_date TEXT, data TEXT NOT NULL);
+        """)
+        conn.executemany("INSERT INTO tasks (status, priority, due_date, data) VALUES (?, ?, ?, '{}')",
+                         [("pending", "high", "2000-01-01"), ("completed", "low", "2000-01-02"),
+                          ("pending", "high", None)])
+    
+    with SqliteTaskStore(path) as store:
+        summary = store.summary(today="2000-06-01")
+    assert summary["status_distribution"] == {"pending": 2, "completed": 1}
+    assert summary["priority_distribution"] == {"high": 2, "low": 1}
+    assert summary["earliest_due_date"] == "2000-01-01"
+    assert summary["overdue_tasks"] == 1
+
+
+def _query_all(path, **kwargs):
+    ids, cursor = [], None
+    while True:
+        result = query_tasks(path, limit=3, cursor=cursor, **kwargs)
+        assert result["success"], result
+        ids.extend(task["id"] for task in result["tasks"])
+        cursor = result["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "json"])
+def test_query_tasks(tmp_path, backend):
+    """测试按条件查询任务：过滤、排序及游标分页"""
+    tasks = [
+        {"title": "t1", "priority": "low", "due_date": "2025-04-03"},
+        {"title": "t2", "priority": "high", "due_date": "2025-04-01", "status": "completed"},
+        {"title": "t3", "priority": "high"},
+        {"title": "t4", "priority": "urgent", "due_date": "2025-04-03"},
+        {"title": "t5", "priority": "medium", "due_date": "2025-04-09"},
+        {"title": "t6", "priority": "high", "due_date": "2025-04-02"},
+        {"title": "t7", "priority": "low"},
+    ]
+    path = create_task_list(tasks, "tasks", str(tmp_path), backend=backend)["file_path"]
+    
+    assert _query_all(path) == [2, 6, 1, 4, 5, 3, 7]
+    assert _query_all(path, sort_by="-due_date") == [7, 3, 5, 4, 1, 6, 2]
+    assert _query_all(path, sort_by="priority") == [4, 2, 3, 6, 5, 1, 7]
+    assert _query_all(path, status=["pending"], priority=["high", "urgent"]) == [6, 4, 3]
+    assert _query_all(path, due_from="2025-04-02", due_to="2025-04-03", sort_by="-id") == [6, 4, 1]
+    
+    # 修改后索引同步更新
+    update_task(path, 5, {"due_date": "2025-03-30"})
+    delete_task(path, 6)
+    add_task_to_list(path, {"title": "t8", "due_date": "2025-04-02", "priority": "high"})
+    assert _query_all(path, priority="high") == [2, 8, 3]
+    assert _query_all(path) == [5, 2, 8, 1, 4, 3, 7]
+    
+    first = query_tasks(path, limit=2)
+    assert not query_tasks(path, limit=2, sort_by="id", cursor=first["next_cursor"])["success"]
+    assert not query_tasks(path, sort_by="title")["success"]
+
+
+def test_query_tasks_large_ids(tmp_path):
+    """测试很大的任务ID不会让JSON索引按ID分配空间"""
+    big = 2 * 10 ** 9
+    tasks = [{"id": big, "title": "大ID", "priority": "high"}, {"id": 3, "title": "小ID", "due_date": "2025-04-01"}]
+    path = create_task_list(tasks, "tasks", str(tmp_path), backend="json")["file_path"]
+    add_task_to_list(path, {"title": "新任务", "priority": "high"})
+    
+    assert _query_all(path, sort_by="id") == [3, big, big + 1]
+    assert _query_all(path, sort_by="-id", priority=["high"]) == [big + 1, big]
+    assert _query_all(path, sort_by="priority") == [big, big + 1, 3]
+    assert os.path.getsize(index_path(path)) < 1024
+
+
+def test_json_task_index_persisted(tmp_path):
+    """测试JSON任务列表的索引保存在列表旁边，文件被外部修改后重建"""
+    path = create_task_list(SAMPLE_TASKS, "tasks", str(tmp_path), backend="json")["file_path"]
+    add_task_to_list(path, {"title": "整理文档", "due_date": "2025-04-07"})
+    with open_task_store(path) as store:
+        store.compact()
+    index = load_index(path, file_version(os.stat(path)))
+    assert index is not None
+    assert [task_id for _, task_id in index.due] == [3, 4, 2, 1]
+    
+    # 外部修改任务列表后，旧索引失效
+    data = json.loads(open(path, encoding="utf-8").read())
+    data["tasks"].append({"id": 9, "title": "手工添加", "due_date": "2025-04-01"})
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    assert _query_all(path) == [9, 3, 4, 2, 1]
+    assert load_index(path, file_version(os.stat(path))) is not None
+    assert os.path.exists(index_path(path))
+
+
+def _write_tasks(path, worker, count):
+    # 子进程：添加任务，并把其中一半标记为完成
+    for i in range(count):
+        result = add_task_to_list(path, {"title": f"w{worker}-{i}", "due_date": f"2025-05-{i % 28 + 1:02d}"})
+        if not result["success"]:
+            sys.exit(f"添加失败: {result}")
+        if i % 2 == 0 and not update_task(path, result["task_id"], {"status": "completed"})["success"]:
+            sys.exit("更新失败")
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "json"])
+def test_concurrent_writers(tmp_path, monkeypatch, backend):
+    """测试多个进程同时写入同一个任务列表时不丢失、不重复写入"""
+    # 调小合并阈值，让写入过程中多次合并日志
+    monkeypatch.setattr(task_store, "COMPACT_MIN_BYTES", 2048)
+    path = create_task_list([], "tasks", str(tmp_path), backend=backend)["file_path"]
+    workers, count = 4, 60
+    
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_write_tasks, args=(path, worker, count)) for worker in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert [process.exitcode for process in processes] == [0] * workers
+    
+    total = workers * count
+    with open_task_store(path) as store:
+        tasks = list(store.iter_tasks())
+        assert store.version() == 1 + total + total // 2
+    assert [task["id"] for task in tasks] == list(range(1, total + 1))
+    assert sorted(task["title"] for task in tasks) == sorted(f"w{w}-{i}" for w in range(workers) for i in range(count))
+    summary = get_task_list_summary(path)["summary"]
+    assert summary["total_tasks"] == total
+    assert summary["completed_tasks"] == total // 2
+    if backend == "json":
+        # 日志已多次合并回快照，快照与日志重放的结果一致
+        assert os.path.getsize(log_path(path)) < 2048 + os.path.getsize(path)
+        task_store._json_states.clear()
+        assert get_task_list_summary(path)["summary"] == summary
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "json"])
+def test_expected_version(tmp_path, backend):
+    """测试写入时的乐观并发检查"""
+    result = create_task_list(SAMPLE_TASKS, "tasks", str(tmp_path), backend=backend)
+    path = result["file_path"]
+    assert result["version"] == 1
+    
+    result = add_task_to_list(path, {"title": "整理文档"}, expected_version=1)
+    assert result["success"]
+    assert result["version"] == 2
+    
+    # 基于旧版本的写入被拒绝，并返回当前版本
+    result = add_task_to_list(path, {"title": "重复提交"}, expected_version=1)
+    assert not result["success"]
+    assert result["version"] == 2
+    assert not delete_task(path, 1, expected_version=1)["success"]
+    
+    result = update_task(path, 1, {"status": "completed"}, expected_version=2)
+    assert result["success"]
+    assert result["version"] == 3
+    summary = get_task_list_summary(path)["summary"]
+    assert summary["version"] == 3
+    assert summary["total_tasks"] == 4
+    assert summary["completed_tasks"] == 2
+
+
+class FakeContext:
+    """记录进度通知的MCP上下文"""
+
+    def __init__(self):
+        self.progress = []
+
+    async def report_progress(self, progress, total=None, message=None):
+        self.progress.append((progress, total))
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "json"])
+def test_bulk_import_tasks(tmp_path, backend):
+    """测试从CSV和NDJSON流式导入任务：逐行校验、拒绝不合格的行并分批写入"""
+    csv_path = tmp_path / "tracker.csv"
+    csv_path.write_text(
+        "ID,Title,Priority,Status,due_date,owner\n"
+        "101,完成项目报告,High,Pending,2025/04/10,张三\n"
+        "102,,low,pending,,李四\n"
+        "103,准备会议材料,,completed,2025-04-08T09:30:00,\n"
+        "104,回复客户邮件,critical,pending,,\n"
+        "105,整理文档,medium,pending,明天,\n"
+        "106,提交报销,low,pending,20250412,王五\n",
+        encoding="utf-8",
+    )
+    path = str(tmp_path / "lists" / f"tasks.{'db' if backend == 'sqlite' else 'json'}")
+    ctx = FakeContext()
+    
+    result = asyncio.run(bulk_import_tasks(path, str(csv_path), batch_size=2, ctx=ctx))
+    assert result["success"], result
+    assert result["imported"] == 3
+    assert result["rejected"] == 3
+    assert [row["line"] for row in result["rejected_rows"]] == [3, 5, 6]
+    assert result["rows_per_second"] > 0
+    assert ctx.progress[-1][0] == ctx.progress[-1][1] == csv_path.stat().st_size
+    
+    tasks = _query_all(path, sort_by="id")
+    with open_task_store(path) as store:
+        imported = list(store.iter_tasks())
+    assert [task["id"] for task in imported] == tasks == [1, 2, 3]
+    assert imported[0] == {"id": 1, "title": "完成项目报告", "priority": "high", "status": "pending",
+                           "due_date": "2025-04-10", "owner": "张三", "source_id": "101"}
+    assert [task["due_date"] for task in imported] == ["2025-04-10", "2025-04-08", "2025-04-12"]
+    
+    # 追加导入NDJSON，非法JSON行计入拒绝数
+    ndjson_path = tmp_path / "more.ndjson"
+    ndjson_path.write_text(
+        '{"title": "t1", "priority": "urgent"}\n{"title": \n\n[1, 2]\n{"title": "t2", "tags": ["a"]}\n',
+        encoding="utf-8",
+    )
+    result = asyncio.run(bulk_import_tasks(path, str(ndjson_path)))
+    assert result["success"], result
+    assert (result["imported"], result["rejected"], result["total_tasks"]) == (2, 2, 5)
+    assert [row["line"] for row in result["rejected_rows"]] == [2, 4]
+    
+    assert not asyncio.run(bulk_import_tasks(path, str(tmp_path / "missing.csv")))["success"]
+
+
+def test_task_list_backend_from_filename(tmp_path):
+    """测试未指定后端时默认保存为JSON，文件名带扩展名时按扩展名选择后端"""
+    assert create_task_list(SAMPLE_TASKS, "plain", str(tmp_path))["file_path"].endswith("plain.json")
+    assert create_task_list(SAMPLE_TASKS, "big.db", str(tmp_path))["file_path"].endswith("big.db")
+    assert create_task_list(SAMPLE_TASKS, "big", str(tmp_path), backend="sqlite")["file_path"].endswith("big.db")
+    with sqlite3.connect(str(tmp_path / "big.db")) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0] == len(SAMPLE_TASKS)
+    assert json.loads((tmp_path / "plain.json").read_text(encoding="utf-8"))["tasks"]
+    assert not create_task_list(SAMPLE_TASKS, "mixed.json", str(tmp_path), backend="sqlite")["success"]
+
+
+def test_unknown_task_list_format(tmp_path):
+    """测试不支持的后端和扩展名"""
+    assert not create_task_list(SAMPLE_TASKS, "tasks", str(tmp_path), backend="xml")["success"]
+    path = tmp_path / "tasks.txt"
+    path.write_text("")
+    assert not add_task_to_list(str(path), {"title": "x"})["success"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])